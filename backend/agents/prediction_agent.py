@@ -3,6 +3,8 @@ from typing import Dict, Any, Optional
 import logging
 import random
 import asyncio
+from backend.utils.metrics import timed, AGENT_STAGE_SECONDS
+from backend.utils.tracing import traced
 
 log = logging.getLogger(__name__)
 
@@ -12,6 +14,8 @@ class PredictionAgent:
         log.info("PredictionAgent initialized (placeholder logic).")
         # Load ML model and preprocessor here in real version
 
+    @traced("agent.prediction")
+    @timed(AGENT_STAGE_SECONDS, stage="prediction")
     async def predict_resolution_time(self, ticket_data: Dict[str, Any]) -> int:
         """
         Predicts the resolution time for a new ticket based on its features. Placeholder logic.
@@ -37,5 +41,5 @@ class PredictionAgent:
 
         # --- End Placeholder ---
 
-        log.debug(f"Placeholder predicted resolution time: {mock_prediction} minutes")
+        log.debug("Placeholder predicted resolution time: %s minutes", mock_prediction)
         return mock_prediction
\ No newline at end of file
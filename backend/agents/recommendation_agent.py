@@ -1,58 +1,78 @@
 # backend/agents/recommendation_agent.py
 from typing import Dict, List, Optional, Any
 import logging
-import asyncio
-# from backend.utils.ollama_integration import get_ollama_embeddings, calculate_similarity # Import later
-# from backend.database.database_manager import get_all_kb_entries_with_embeddings # Import later
+import numpy as np
+
+from backend.database.storage import get_storage
+from backend.utils.ollama_integration import get_ollama_embeddings, EMBEDDING_MODEL
+from backend.utils.kb_index import mmr_select
+from backend.utils.kb_embedding_pipeline import build_kb_embedding_text
+from backend.utils.kb_feedback import feedback_aggregator
+from backend.utils.metrics import timed, AGENT_STAGE_SECONDS
+from backend.utils.tracing import traced
 
 log = logging.getLogger(__name__)
 
+# Ranking: similarity dominates, the KB entry's historical success rate breaks near-ties
+SIMILARITY_WEIGHT = 0.8
+# Similarity candidates considered before re-ranking by combined score
+MIN_CANDIDATES = 20
+# MMR relevance/diversity trade-off: 1.0 ranks purely by score, lower values spread results across different solutions
+DEFAULT_MMR_LAMBDA = 0.7
+
 class RecommendationAgent:
-    def __init__(self, embedding_model: str = "nomic-embed-text"): # Keep model name
+    def __init__(self, embedding_model: str = EMBEDDING_MODEL):
         self.embedding_model = embedding_model
-        log.info(f"RecommendationAgent initialized with embedding model {self.embedding_model} (placeholder logic).")
+        log.info(f"RecommendationAgent initialized with embedding model {self.embedding_model}.")
 
-    async def recommend_resolutions(self, ticket_subject: str, ticket_body: str, top_n: int = 3) -> List[Dict[str, Any]]:
+    @traced("agent.recommendation")
+    @timed(AGENT_STAGE_SECONDS, stage="recommendation")
+    async def recommend_resolutions(self, ticket_subject: str, ticket_body: str, top_n: int = 3,
+                                    mmr_lambda: float = DEFAULT_MMR_LAMBDA) -> List[Dict[str, Any]]:
         """
-        Recommends relevant knowledge base articles or past resolutions. Placeholder logic.
+        Recommends relevant knowledge base articles or past resolutions by embedding similarity.
+        Only KB vectors produced by this agent's embedding model are searched; entries still waiting
+        for re-embedding after a model change are simply not candidates yet.
+        The top candidates are re-ranked with MMR (`mmr_lambda`) so near-identical solutions don't fill every slot.
         """
-        log.warning(f"RecommendationAgent.recommend_resolutions called for subject '{ticket_subject[:50]}...' (placeholder implementation).")
-        await asyncio.sleep(0.1) # Simulate async work
+        log.info("RecommendationAgent: recommending for subject '%.50s...' (top_n=%s, mmr_lambda=%s)", ticket_subject, top_n, mmr_lambda)
 
-        # --- Placeholder Logic ---
-        # Return fixed mock recommendations matching the Recommendation model structure
-        mock_recs = [
-            {
-                'id': 1, # Use actual ID from sample_data KB if possible
-                'title': '[Mock KB] Password Reset Procedure',
-                'content': 'Go to login page, click Forgot Password...',
-                'similarity': 0.85, # Mock value
-                'score': 0.90 # Mock combined score
-            },
+        query_text = build_kb_embedding_text({'title': ticket_subject, 'content': ticket_body})
+        query_embedding = await get_ollama_embeddings(query_text, model=self.embedding_model)
+        if query_embedding is None:
+            log.error("Could not embed ticket text; returning no recommendations.")
+            return []
+
+        storage = await get_storage()
+        candidates = await storage.search_kb(query_embedding, self.embedding_model, max(top_n * 4, MIN_CANDIDATES), with_embeddings=True)
+        if not candidates: # Also when the stored vectors have another dimension: never compared
+            log.warning(f"No KB embeddings available for model '{self.embedding_model}'. Run 'backend/scripts/generate_kb_embeddings.py'.")
+            return []
+
+        similarities = np.array([c['similarity'] for c in candidates], dtype=np.float32)
+        success_rates = np.array([c['success_rate'] for c in candidates], dtype=np.float32)
+        scores = SIMILARITY_WEIGHT * similarities + (1.0 - SIMILARITY_WEIGHT) * success_rates
+        vectors = np.array([c['embedding'] for c in candidates], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        order = mmr_select(vectors, scores, top_n, mmr_lambda)
+
+        recommendations = [
             {
-                'id': 2, # Use actual ID from sample_data KB if possible
-                'title': '[Mock KB] Troubleshooting 500 API Errors',
-                'content': 'Check API logs, verify payload...',
-                'similarity': 0.75, # Mock value
-                'score': 0.80 # Mock combined score
-            },
-             {
-                'id': 3, # Use actual ID from sample_data KB if possible
-                'title': '[Mock KB] Checking Billing History',
-                'content': 'Navigate to Account > Billing > History page...',
-                'similarity': 0.65, # Mock value
-                'score': 0.70 # Mock combined score
-            },
+                'id': candidates[i]['id'],
+                'title': candidates[i]['title'],
+                'content': candidates[i]['content'],
+                'similarity': float(similarities[i]),
+                'score': float(scores[i]),
+            }
+            for i in order
         ]
-        # --- End Placeholder ---
-
-        log.debug(f"Returning {min(top_n, len(mock_recs))} mock recommendations.")
-        return mock_recs[:top_n] # Return top_n mock items
+        log.debug("Returning %d recommendations.", len(recommendations))
+        return recommendations
 
     async def record_feedback(self, recommendation_id: int, was_helpful: bool):
         """
-        Records agent feedback on a recommendation. Placeholder.
+        Records agent feedback on a recommendation. The ranking prior of the KB entry changes immediately;
+        usage_count/success_rate in the database are updated by the aggregator's next batched flush.
         """
-        log.warning(f"RecommendationAgent.record_feedback called for KB ID {recommendation_id}, Helpful: {was_helpful} (placeholder - no action taken).")
-        await asyncio.sleep(0.05)
-        # In real implementation, update DB success_rate/usage_count for the KB entry
\ No newline at end of file
+        log.info("RecommendationAgent: feedback for KB ID %s, helpful=%s", recommendation_id, was_helpful)
+        feedback_aggregator.record(recommendation_id, was_helpful)
@@ -3,6 +3,8 @@ from typing import Dict, List, Optional, Tuple, Any
 import logging
 import asyncio
 import random # Added for placeholder agent assignment variability
+from backend.utils.metrics import timed, AGENT_STAGE_SECONDS
+from backend.utils.tracing import traced
 
 # --- Imports for potential real implementation (keep commented for now) ---
 # from backend.utils.ollama_integration import get_ollama_embeddings
@@ -19,6 +21,8 @@ class RoutingAgent:
         self.embedding_model = embedding_model
         log.info(f"RoutingAgent initialized with embedding model {self.embedding_model} (using PLACEHOLDER routing logic).")
 
+    @traced("agent.routing")
+    @timed(AGENT_STAGE_SECONDS, stage="routing")
     async def determine_route(self, ticket_id: int, ticket_subject: str, ticket_body: str, ticket_priority: str) -> Dict[str, Any]:
         """
         Determines the best route (team or agent) for a ticket.
@@ -91,5 +95,5 @@ class RoutingAgent:
         }
         # --- End of Placeholder Logic ---
 
-        log.debug(f"Placeholder routing decision for ticket {ticket_id}: {decision}")
+        log.debug("Placeholder routing decision for ticket %s: %s", ticket_id, decision)
         return decision
\ No newline at end of file
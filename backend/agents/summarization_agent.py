@@ -1,112 +1,216 @@
 # backend/agents/summarization_agent.py
 
-from typing import Dict, List, Tuple
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
 import logging
 import asyncio
-import re # Import regular expressions for parsing
+import os
 
 # Import the real Ollama call function
 from backend.utils.ollama_integration import call_ollama_llm
+from backend.utils.metrics import timed, AGENT_STAGE_SECONDS
+from backend.utils.extractive_summary import EXAMPLE_ACTIONS, VAGUE_PROBLEM_ACTIONS, extractive_summary, rule_based_actions
+from backend.utils.text_parsing import clean_summary, dedup_ordered, parse_bullets, reply_lines
+from backend.utils.text_chunking import CHUNK_FILL, estimate_tokens, split_into_chunks, truncate_middle
+from backend.utils.tracing import traced, set_span_attributes
 
 log = logging.getLogger(__name__)
 
+# --- Configuration (environment) ---
+# Both prompts below share one static system message, so Ollama can reuse its KV cache for the instructions
+# across tickets, and for the instructions + conversation between the summary and action calls of a ticket.
+# Only the conversation and the short task line after it are prefilled per call.
+SUMMARIZATION_KEEP_ALIVE = os.getenv("SUMMARIZATION_KEEP_ALIVE", "30m") # Keep the model (and its cache) loaded between bursts
+# Fixed per model: Ollama reloads the model when num_ctx changes between calls. Fits the prefix + a long ticket.
+SUMMARIZATION_NUM_CTX = int(os.getenv("SUMMARIZATION_NUM_CTX", "4096"))
+# Longer conversations are summarized map-reduce: chunks are summarized concurrently, then both tasks run on the
+# joined chunk summaries. Token counts are estimates (backend/utils/text_chunking.py).
+SUMMARIZATION_DIRECT_MAX_TOKENS = int(os.getenv("SUMMARIZATION_DIRECT_MAX_TOKENS", "2500")) # Fast path: no chunking
+SUMMARIZATION_CHUNK_TOKENS = int(os.getenv("SUMMARIZATION_CHUNK_TOKENS", "1500"))
+# Bounds latency: input beyond MAX_CHUNKS chunks is cut from the middle (~54k characters by default)
+SUMMARIZATION_MAX_CHUNKS = int(os.getenv("SUMMARIZATION_MAX_CHUNKS", "10"))
+SUMMARIZATION_MAP_CONCURRENCY = int(os.getenv("SUMMARIZATION_MAP_CONCURRENCY", "4"))
+# 'llm': LLM only (failures are reported as such); 'extractive': local TextRank summary + rule-based actions,
+# no model calls; 'tiered': extractive result first, upgraded by the LLM result in the background
+# (summarize_tiered), and LLM failures filled in with the extractive result.
+SUMMARIZATION_STRATEGY = os.getenv("SUMMARIZATION_STRATEGY", "llm").lower()
+# --- End Configuration ---
+
+SUMMARY_HEADER = "Concise Customer Problem Summary:"
+ACTIONS_HEADER = "Agent's Initial Troubleshooting Steps/Questions:"
+
+EXAMPLE_BULLETS = "\n".join(f"* {action}" for action in EXAMPLE_ACTIONS)
+VAGUE_BULLETS = " and ".join(f"'* {action}'" for action in VAGUE_PROBLEM_ACTIONS)
+
+# Static prefix: never put per-ticket text (ids, dates, names) in here, or the cached prefix stops matching
+SYSTEM_PROMPT = f"""You help customer support agents triage tickets. Each message contains a customer support conversation
+followed by one TASK line. Answer only that task.
+
+TASK SUMMARY:
+Provide a very concise, one or two sentence summary of the CUSTOMER'S main problem or question ONLY.
+Focus ONLY on what the customer reported. DO NOT include agent actions or solutions.
+Start your answer with "{SUMMARY_HEADER}"
+
+TASK ACTIONS:
+List 4-6 distinct, concise troubleshooting questions the SUPPORT AGENT should ask or checks the AGENT should perform initially.
+Focus on gathering key information or common first steps for the described issue.
+Format as a bulleted list (using '*'). Each point should be a short question or check.
+
+Examples for various issues:
+{EXAMPLE_BULLETS}
+
+If the problem is too vague, list actions like {VAGUE_BULLETS}
+DO NOT write a long paragraph. List only short bullet points for the AGENT.
+Start your answer with "{ACTIONS_HEADER}" on its own line."""
+
+
+def build_task_prompt(conversation: str, task: str) -> str:
+    """Dynamic suffix sent after SYSTEM_PROMPT: the conversation first (shared by both tasks), then the task line."""
+    header = SUMMARY_HEADER if task == "SUMMARY" else ACTIONS_HEADER
+    return f'Conversation:\n"""\n{conversation}\n"""\n\nTASK {task}\n{header}'
+
+
+# Map step of long conversations; static as well, so it is cached across chunks
+CHUNK_SYSTEM_PROMPT = """You are given one part of a long customer support conversation.
+Summarize it in at most three sentences. Keep the customer's problem, exact error messages, product and
+device names, and the steps already tried with their results. Leave out greetings and small talk."""
+
+
+def build_chunk_prompt(chunk: str, index: int, count: int) -> str:
+    return f'Part {index} of {count}:\n"""\n{chunk}\n"""\n\nSummary of this part:'
+
+
+# Background LLM upgrades started by summarize_tiered; referenced here so they are not garbage-collected mid-run
+_pending_upgrades: Set[asyncio.Task] = set()
+
+
+# Generic action items that are dropped from the LLM's list (lowercase)
+FILLER_PHRASES = ("no further action needed", "ask for more specific details")
+
+
 class SummarizationAgent:
     # --- Using qwen:1.8b - If results poor, switch to phi3:mini ---
-    def __init__(self, llm_model: str = "qwen:1.8b"):
-        """Initializes the agent with the specified LLM model."""
+    def __init__(self, llm_model: str = "qwen:1.8b", keep_alive: str = SUMMARIZATION_KEEP_ALIVE,
+                 num_ctx: int = SUMMARIZATION_NUM_CTX, strategy: str = SUMMARIZATION_STRATEGY):
+        """Initializes the agent with the specified LLM model, the Ollama keep_alive/num_ctx used for its calls and the strategy."""
+        if strategy not in ("llm", "extractive", "tiered"):
+            raise ValueError(f"Unknown summarization strategy '{strategy}' (expected llm, extractive or tiered)")
         self.llm_model = llm_model
+        self.strategy = strategy
+        self.keep_alive = keep_alive
+        self.llm_options = {"num_ctx": num_ctx}
         log.info(f"SummarizationAgent initialized with real LLM model: {self.llm_model}")
 
+    async def _ask(self, conversation: str, task: str) -> str:
+        return await call_ollama_llm(prompt=build_task_prompt(conversation, task), model=self.llm_model,
+                                     context=SYSTEM_PROMPT, options=self.llm_options, keep_alive=self.keep_alive)
+
+    async def _summarize_chunk(self, chunk: str, index: int, count: int, slots: asyncio.Semaphore) -> str:
+        async with slots:
+            partial = await call_ollama_llm(prompt=build_chunk_prompt(chunk, index, count), model=self.llm_model,
+                                            context=CHUNK_SYSTEM_PROMPT, options=self.llm_options, keep_alive=self.keep_alive)
+        return clean_summary(partial, "Summary of this part:")
+
+    @traced("agent.summarization.map")
+    async def _condense(self, conversation: str) -> str:
+        """
+        Map step for conversations over SUMMARIZATION_DIRECT_MAX_TOKENS: returns the chunk summaries joined in order,
+        which then stand in for the conversation. Chunks whose call failed are left out; if all fail, a
+        middle-truncated conversation that fits the direct path is returned instead.
+        """
+        text = truncate_middle(conversation, int(SUMMARIZATION_CHUNK_TOKENS * CHUNK_FILL) * SUMMARIZATION_MAX_CHUNKS)
+        chunks = split_into_chunks(text, SUMMARIZATION_CHUNK_TOKENS)
+        set_span_attributes(chunks=len(chunks), estimated_tokens=estimate_tokens(conversation))
+        slots = asyncio.Semaphore(SUMMARIZATION_MAP_CONCURRENCY)
+        partials = await asyncio.gather(*(self._summarize_chunk(chunk, i + 1, len(chunks), slots) for i, chunk in enumerate(chunks)))
+        usable = [(i, p) for i, p in enumerate(partials, 1) if p and not p.startswith("[Error:")]
+        log.debug("Condensed conversation into %d/%d chunk summaries", len(usable), len(chunks))
+        if not usable:
+            return truncate_middle(conversation, SUMMARIZATION_DIRECT_MAX_TOKENS)
+        return "\n".join(f"[Part {i} of {len(chunks)}] {partial}" for i, partial in usable)
+
+    @timed(AGENT_STAGE_SECONDS, stage="summarization.extractive")
+    def summarize_extractive(self, conversation: str) -> Tuple[str, List[str]]:
+        """Local tier: TextRank summary and rule-based actions, no model calls (~1 ms per ticket)."""
+        if not conversation or not conversation.strip():
+            return "Conversation text was empty.", ["No actions required."]
+        return extractive_summary(conversation) or conversation.strip()[:200], rule_based_actions(conversation)
+
+    def summarize_tiered(self, conversation: str,
+                         on_upgrade: Callable[[str, List[str]], Awaitable[None]]) -> Tuple[str, List[str]]:
+        """
+        Returns the extractive result immediately and runs the LLM in a background task. When the LLM produces
+        a usable summary or action list, on_upgrade(summary, actions) is awaited with it (failed parts keep the
+        extractive result). The task inherits the caller's LLM lane and deadline.
+        """
+        fallback = self.summarize_extractive(conversation)
+        if conversation and conversation.strip():
+            task = asyncio.create_task(self._upgrade(conversation, fallback, on_upgrade))
+            _pending_upgrades.add(task)
+            task.add_done_callback(_pending_upgrades.discard)
+        return fallback
+
+    async def _upgrade(self, conversation: str, fallback: Tuple[str, List[str]],
+                       on_upgrade: Callable[[str, List[str]], Awaitable[None]]) -> None:
+        try:
+            summary, actions = await self._summarize_llm(conversation)
+            merged = _merge_with_fallback(summary, actions, fallback)
+            if merged != fallback:
+                await on_upgrade(*merged)
+        except Exception as e:
+            log.error(f"Background LLM summarization upgrade failed: {e}", exc_info=True)
+
+    @traced("agent.summarization")
+    @timed(AGENT_STAGE_SECONDS, stage="summarization")
     async def summarize_and_extract(self, conversation: str) -> Tuple[str, List[str]]:
         """
         Generates a concise summary of the customer's problem and extracts
         a list of initial troubleshooting checks/questions for the support agent.
+        Uses the agent's strategy: LLM, extractive, or LLM with extractive fill-in for failed parts (tiered).
         """
-        log.info(f"SummarizationAgent: Processing conversation (length: {len(conversation)}) using model {self.llm_model}")
+        if self.strategy == "extractive":
+            return self.summarize_extractive(conversation)
+        summary, actions = await self._summarize_llm(conversation)
+        if self.strategy == "tiered":
+            return _merge_with_fallback(summary, actions, self.summarize_extractive(conversation))
+        return summary, actions
+
+    async def _summarize_llm(self, conversation: str) -> Tuple[str, List[str]]:
+        """LLM tier; failed parts come back as '[AI summary generation failed]' / ['[AI action extraction failed]']."""
+        log.info("SummarizationAgent: Processing conversation (length: %d) using model %s", len(conversation), self.llm_model)
 
         if not conversation or not conversation.strip():
             log.warning("Summarization attempt on empty conversation text.")
             return "Conversation text was empty.", ["No actions required."]
 
-        # --- 1. Generate Summary (Keep Improved Prompt) ---
-        summary_prompt = f"""
-        Analyze the following customer support conversation.
-        Provide a very concise, one or two sentence summary of the CUSTOMER'S main problem or question ONLY.
-        Focus ONLY on what the customer reported. DO NOT include agent actions or solutions.
-
-        Conversation:
-        \"\"\"
-        {conversation}
-        \"\"\"
+        if estimate_tokens(conversation) > SUMMARIZATION_DIRECT_MAX_TOKENS:
+            # Long transcript: reduce over chunk summaries so the prompts stay within num_ctx
+            conversation = await self._condense(conversation)
 
-        Concise Customer Problem Summary:
-        """
+        # --- 1. Generate Summary ---
         log.debug("Generating summary...")
-        summary = await call_ollama_llm(prompt=summary_prompt, model=self.llm_model)
-        # Cleanup
-        summary = summary.split("Concise Customer Problem Summary:")[-1].strip()
-        summary = re.sub(r"^(Here's|The customer's problem is|Summary:)\s*", "", summary, flags=re.IGNORECASE).strip()
+        summary = await self._ask(conversation, "SUMMARY")
+        summary = clean_summary(summary, SUMMARY_HEADER)
         if not summary or summary.startswith("[Error:"):
              log.warning(f"Summary generation failed or returned error: {summary}")
              summary = "[AI summary generation failed]"
-        log.info(f"Summary generated: '{summary[:100]}...'")
-
-
-        # --- 2. Extract Agent Troubleshooting Steps/Checks (Revised Prompt for 4-6 Steps) ---
-        # Ask for a slightly smaller number of items (4-6)
-        action_prompt = f"""
-        Analyze the customer's problem described below. List 4-6 distinct, concise troubleshooting questions the SUPPORT AGENT should ask or checks the AGENT should perform initially.
-        Focus on gathering key information or common first steps for the described issue.
-        Format as a bulleted list (using '*'). Each point should be a short question or check.
-
-        Examples for various issues:
-        * Ask for the specific error code/message.
-        * When did the issue start? After any updates/changes?
-        * What are the steps to reproduce the problem?
-        * Which operating system/device/browser is used?
-        * Ask user to restart the device/router.
-        * Check user's subscription/account status.
-        * Verify payment method details.
-        * Check server logs for related errors around [time].
-        * Ask for a screenshot of the problem area.
-
-        If the problem is too vague, list actions like '* Ask for specific error messages displayed.' and '* Ask for steps to reproduce the issue.'
+        log.debug("Summary generated: '%.100s...'", summary)
 
-        DO NOT write a long paragraph. List only short bullet points for the AGENT.
 
-        Conversation:
-        \"\"\"
-        {conversation}
-        \"\"\"
-
-        Agent's Initial Troubleshooting Steps/Questions:
-        """
+        # --- 2. Extract Agent Troubleshooting Steps/Checks (4-6 items) ---
+        # Runs after the summary on purpose: the system prompt + conversation are already in the KV cache
         log.debug("Extracting agent troubleshooting steps (requesting 4-6)...") # Log update
-        action_response = await call_ollama_llm(prompt=action_prompt, model=self.llm_model)
-
-        # --- 3. Parse Actions (Keep Improved Parsing for Bullets) ---
-        actions = []
-        # Get text after the explicit prompt header
-        cleaned_response = action_response.split("Agent's Initial Troubleshooting Steps/Questions:")[-1]
-
-        # Look for lines starting with '*' or '-'
-        action_matches = re.findall(r"^\s*[\*\-]\s+(.*)", cleaned_response, re.MULTILINE)
-
-        if action_matches:
-             for action_text in action_matches:
-                 cleaned_action = action_text.strip()
-                 # Add if it's not empty and not just a generic filler (unless it's the *only* thing)
-                 if cleaned_action and "no further action needed" not in cleaned_action.lower() and "ask for more specific details" not in cleaned_action.lower():
-                     # Optional: Simple de-duplication
-                     if cleaned_action not in actions:
-                          actions.append(cleaned_action)
-        else:
-            # Fallback if no bullet points found
-            fallback_text = cleaned_response.strip()
-            # Check fallback isn't an error or generic filler
-            if fallback_text and not fallback_text.startswith("[Error:") and "ask for more specific details" not in fallback_text.lower() and "no further action needed" not in fallback_text.lower():
-                 log.warning(f"Could not parse bulleted actions from response: '{action_response}'. Using non-empty lines as fallback.")
-                 actions = [line.strip() for line in fallback_text.split('\n') if line.strip() and line.strip() not in actions] # Add unique lines
+        action_response = await self._ask(conversation, "ACTIONS")
+
+        # --- 3. Parse Actions (bullets after the echoed header, de-duplicated in order) ---
+        # Generic filler items are dropped (they only count when they are the *only* thing, see below)
+        actions = parse_bullets(action_response, ACTIONS_HEADER, skip_phrases=FILLER_PHRASES)
+        if actions is None:
+            actions = []
+            if not action_response.startswith("[Error:") and not any(phrase in action_response.lower() for phrase in FILLER_PHRASES):
+                # Fallback if no bullet points found: the reply's non-empty lines
+                actions = dedup_ordered(reply_lines(action_response, ACTIONS_HEADER))
+                if actions:
+                    log.warning(f"Could not parse bulleted actions from response: '{action_response}'. Using non-empty lines as fallback.")
 
         # Ensure a default message if list is still empty after parsing
         if not actions:
@@ -116,5 +220,14 @@ class SummarizationAgent:
                  # If the model didn't provide specific steps, default to asking for details
                  actions.append("Ask customer for more specific details about the issue.")
 
-        log.info(f"Extracted agent steps/checks ({len(actions)}): {actions}")
-        return summary, actions
\ No newline at end of file
+        log.debug("Extracted agent steps/checks (%d): %s", len(actions), actions)
+        return summary, actions
+
+
+def _merge_with_fallback(summary: str, actions: List[str], fallback: Tuple[str, List[str]]) -> Tuple[str, List[str]]:
+    """LLM result with failed parts replaced by the extractive result."""
+    if summary.startswith("[AI "):
+        summary = fallback[0]
+    if not actions or actions[0].startswith("[AI "):
+        actions = fallback[1]
+    return summary, actions
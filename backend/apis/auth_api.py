@@ -8,7 +8,7 @@ from typing import Optional, Dict # Ensure Optional and Dict are imported
 
 # Import auth functions and models
 from backend import auth # Use absolute import from backend package root
-from backend.database import database_manager as db
+from backend.database.storage import get_storage
 # Import relevant models from apis.models
 from backend.apis.models import OrmBaseModel, Token, UserCreate, UserPublic
 
@@ -28,7 +28,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     Takes username and password in form data, returns JWT access token.
     """
     log.info(f"Login attempt for username: {form_data.username}")
-    user = db.get_user_by_username(form_data.username)
+    user = await (await get_storage()).get_user_by_username(form_data.username)
     if not user:
         log.warning(f"Login failed: User '{form_data.username}' not found.")
         raise HTTPException(
@@ -65,8 +65,9 @@ async def register_user(user_data: UserCreate):
     """
     log.info(f"Registration attempt for username: {user_data.username}")
 
+    storage = await get_storage()
     # 1. Check if username already exists
-    existing_user_by_name = db.get_user_by_username(user_data.username)
+    existing_user_by_name = await storage.get_user_by_username(user_data.username)
     if existing_user_by_name:
         log.warning(f"Registration failed: Username '{user_data.username}' already exists.")
         raise HTTPException(
@@ -76,7 +77,7 @@ async def register_user(user_data: UserCreate):
 
     # 2. Check if email already exists (using the function added to db_manager)
     if user_data.email:
-        existing_user_by_email = db.get_user_by_email(user_data.email)
+        existing_user_by_email = await storage.get_user_by_email(user_data.email)
         if existing_user_by_email:
             log.warning(f"Registration failed: Email '{user_data.email}' already exists.")
             raise HTTPException(
@@ -88,8 +89,8 @@ async def register_user(user_data: UserCreate):
     hashed_password = auth.get_password_hash(user_data.password)
 
     # 4. Add user to database
-    # db.add_user handles potential DB-level UNIQUE constraint errors as a fallback
-    user_id = db.add_user(
+    # add_user handles potential DB-level UNIQUE constraint errors as a fallback
+    user_id = await storage.add_user(
         username=user_data.username,
         hashed_password=hashed_password,
         email=user_data.email,
@@ -108,7 +109,7 @@ async def register_user(user_data: UserCreate):
 
     # 5. Return created user data (excluding password)
     # Fetch the newly created user to return consistent data defined by UserPublic model
-    new_user = db.get_user_by_username(user_data.username)
+    new_user = await storage.get_user_by_username(user_data.username)
     if not new_user:
          log.error(f"Failed to retrieve newly created user '{user_data.username}'.")
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error retrieving user after creation.")
@@ -0,0 +1,152 @@
+# backend/apis/events_api.py
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+
+from .responses import dumps_json, ticket_row_to_api
+from backend import auth
+from backend.database.storage import get_storage
+from backend.utils.event_bus import EventBus, RESYNC, Subscription
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+AUTH_TIMEOUT_SECONDS = 10.0 # The first client message must carry the token
+# --- End Configuration ---
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Ticket changes, published by tickets_api; one DB read and one JSON encoding per change, whatever the viewer count
+ticket_events = EventBus("tickets")
+RESYNC_MESSAGE = '{"type":"resync"}'
+
+
+class TicketEvent(NamedTuple):
+    kind: str # created / updated / enriched
+    ticket_id: int
+    statuses: FrozenSet[str] # Current and previous status, so filtered views also see tickets leaving them; empty = unknown
+    teams: FrozenSet[Optional[str]]
+    message: str # Encoded once for all subscribers
+
+
+class TicketEventFilter:
+    """Per-connection filter; an empty criterion matches everything."""
+    def __init__(self, statuses: Optional[List[str]] = None, teams: Optional[List[str]] = None, ticket_ids: Optional[List[int]] = None):
+        self.statuses = frozenset(statuses or ())
+        self.teams = frozenset(teams or ())
+        self.ticket_ids = frozenset(ticket_ids or ())
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "TicketEventFilter":
+        """Raises ValueError unless each criterion is a list of strings (ints for ticket_id), a single one, or null."""
+        if not isinstance(message, dict):
+            raise ValueError("filter message must be an object")
+        return cls(_criterion(message, "status", str), _criterion(message, "team", str), _criterion(message, "ticket_id", int))
+
+    def as_dict(self) -> Dict[str, List[Any]]:
+        return {"status": sorted(self.statuses), "team": sorted(self.teams), "ticket_id": sorted(self.ticket_ids)}
+
+    def __call__(self, event: TicketEvent) -> bool:
+        # An event without statuses/teams (previous row unknown) may be leaving any filtered view: it matches
+        return ((not self.statuses or not event.statuses or not self.statuses.isdisjoint(event.statuses))
+                and (not self.teams or not event.teams or not self.teams.isdisjoint(event.teams))
+                and (not self.ticket_ids or event.ticket_id in self.ticket_ids))
+
+
+def _criterion(message: Dict[str, Any], key: str, type_: type) -> List[Any]:
+    value = message.get(key)
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value] # A bare scalar: one value, not its characters
+    if not all(isinstance(v, type_) and not isinstance(v, bool) for v in values):
+        raise ValueError(f"'{key}' must be a list of {type_.__name__} values")
+    return values
+
+
+async def publish_ticket_event(kind: str, ticket_id: int, ticket: Optional[Dict[str, Any]] = None,
+                               previous: Optional[Dict[str, Any]] = None, previous_unknown: bool = False) -> None:
+    """
+    Publishes ticket.<kind> with the ticket as GET /tickets/{id} returns it. `ticket` is the current row (read
+    here when not given); `previous` the row before the change. previous_unknown (changes made by another worker
+    process) delivers the event to every filter, since the ticket may have left any view.
+    Nothing is read or encoded without subscribers.
+    """
+    if not ticket_events:
+        return
+    if ticket is None:
+        ticket = await (await get_storage()).get_ticket(ticket_id)
+        if not ticket:
+            return
+    previous = previous or ticket
+    message = dumps_json({"type": f"ticket.{kind}", "ticket": ticket_row_to_api(ticket)}).decode("utf-8")
+    ticket_events.publish(TicketEvent(
+        kind, ticket_id,
+        frozenset() if previous_unknown else frozenset((ticket.get("status"), previous.get("status"))),
+        frozenset() if previous_unknown else frozenset((ticket.get("assigned_team"), previous.get("assigned_team"))),
+        message,
+    ), kind=kind)
+
+
+async def _authenticate(websocket: WebSocket) -> Dict[str, Any]:
+    # Browsers cannot set headers on a WebSocket, and tokens in URLs end up in access logs: the first message
+    # is {"token": "<access token>"}
+    message = json.loads(await asyncio.wait_for(websocket.receive_text(), timeout=AUTH_TIMEOUT_SECONDS))
+    return await auth.get_current_user(token=str(message.get("token", "")))
+
+
+async def _forward(websocket: WebSocket, subscription: Subscription) -> None:
+    while True:
+        event = await subscription.get()
+        await websocket.send_text(RESYNC_MESSAGE if event is RESYNC else event.message)
+
+
+@router.websocket("/tickets")
+async def ticket_events_socket(
+    websocket: WebSocket,
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    team: Optional[List[str]] = Query(None),
+    ticket_id: Optional[List[int]] = Query(None),
+):
+    """
+    Pushes ticket.created / ticket.updated / ticket.enriched events ({"type", "ticket"}) matching the filters,
+    instead of clients polling GET /tickets. Protocol:
+    - first client message: {"token": "<access token>"}; the server answers {"type": "subscribed", "filters": ...};
+    - later client messages {"status": [...], "team": [...], "ticket_id": [...]} replace the filters (a malformed
+      one is answered with {"type": "error", "detail"} and changes nothing);
+    - {"type": "resync"} means events were dropped because the client fell behind: refetch, then carry on.
+    """
+    await websocket.accept()
+    try:
+        user = await _authenticate(websocket)
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, ValueError, AttributeError, HTTPException) as e:
+        log.info(f"Ticket event socket rejected: {e!r}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    event_filter = TicketEventFilter(status_filter, team, ticket_id)
+    with ticket_events.subscribe(event_filter) as subscription:
+        log.info("User '%s' subscribed to ticket events (%d subscribers).", user.get("username"), len(ticket_events))
+        await websocket.send_text(dumps_json({"type": "subscribed", "filters": event_filter.as_dict()}).decode("utf-8"))
+        sender = asyncio.create_task(_forward(websocket, subscription))
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    event_filter = TicketEventFilter.from_message(json.loads(text))
+                except ValueError as e: # Includes invalid JSON; the current filters stay in place
+                    log.debug("Rejecting malformed ticket event filter: %.100s", text)
+                    await websocket.send_text(dumps_json({"type": "error", "detail": f"Malformed filter: {e}"}).decode("utf-8"))
+                    continue
+                subscription.accepts = event_filter
+                await websocket.send_text(dumps_json({"type": "subscribed", "filters": event_filter.as_dict()}).decode("utf-8"))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
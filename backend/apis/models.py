@@ -1,6 +1,6 @@
 # backend/apis/models.py
 
-from pydantic import BaseModel, Field, EmailStr, validator, root_validator
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
@@ -11,13 +11,7 @@ log = logging.getLogger(__name__)
 # --- Base Model Configuration ---
 class OrmBaseModel(BaseModel):
     """ Base model configuration for compatibility """
-    class Config:
-        # Updated for Pydantic v2
-        from_attributes = True # Replaces orm_mode=True
-        # Optional: Configure how datetimes are encoded in JSON responses
-        # json_encoders = {
-        #     datetime: lambda dt: dt.isoformat().replace('+00:00', 'Z') # Example: ISO format with Z for UTC
-        # }
+    model_config = ConfigDict(from_attributes=True) # Replaces orm_mode=True
 
 # --- Ticket Models ---
 class TicketBase(OrmBaseModel):
@@ -28,10 +22,8 @@ class TicketBase(OrmBaseModel):
     body: str = Field(..., min_length=10, example="I cannot log into my account using my usual credentials.", description="Detailed description of the issue.")
     priority: str = Field("Medium", example="High", description="Priority level (e.g., Low, Medium, High, Urgent).")
 
-    # Pydantic v2 uses field validators attached via decorators differently,
-    # but the core @validator logic often still works for simple cases,
-    # though FunctionValidators are preferred in v2. Keep simple validator for now.
-    @validator('priority')
+    @field_validator('priority')
+    @classmethod
     def priority_must_be_valid(cls, v):
         valid_priorities = ['Low', 'Medium', 'High', 'Urgent']
         if v not in valid_priorities:
@@ -60,33 +52,40 @@ class Ticket(TicketBase):
     feedback_comment: Optional[str] = Field(None, example="Very helpful support!", description="Text feedback provided for the resolution.")
 
     # Validator to parse JSON string from DB back into a list for extracted_actions
-    # Using pre=True means it runs before standard Pydantic validation on the field.
-    @validator('extracted_actions', pre=True, allow_reuse=True)
+    # mode='before' means it runs before standard Pydantic validation on the field.
+    @field_validator('extracted_actions', mode='before')
+    @classmethod
     def parse_json_string(cls, value):
-        if isinstance(value, str):
-            if not value.strip(): # Handle empty strings
-                return []
-            try:
-                parsed_value = json.loads(value)
-                # Ensure it's actually a list after parsing
-                return parsed_value if isinstance(parsed_value, list) else []
-            except json.JSONDecodeError:
-                log.warning(f"Could not parse extracted_actions JSON string: '{value}'. Returning empty list.")
-                return [] # Return empty list if JSON is invalid
-        elif value is None:
-            return [] # Return empty list if DB value is NULL
-        elif isinstance(value, list):
-             return value # Return as is if already a list
-        else:
-             log.warning(f"Unexpected type for extracted_actions: {type(value)}. Returning empty list.")
-             return [] # Handle other unexpected types
+        return parse_actions_json(value)
+
+
+def parse_actions_json(value: Any) -> List[str]:
+    """extracted_actions as stored in the DB (JSON text, NULL, or already a list) -> list; invalid data -> []."""
+    if isinstance(value, str):
+        if not value.strip(): # Handle empty strings
+            return []
+        try:
+            parsed_value = json.loads(value)
+            # Ensure it's actually a list after parsing
+            return parsed_value if isinstance(parsed_value, list) else []
+        except json.JSONDecodeError:
+            log.warning(f"Could not parse extracted_actions JSON string: '{value}'. Returning empty list.")
+            return [] # Return empty list if JSON is invalid
+    elif value is None:
+        return [] # Return empty list if DB value is NULL
+    elif isinstance(value, list):
+         return value # Return as is if already a list
+    else:
+         log.warning(f"Unexpected type for extracted_actions: {type(value)}. Returning empty list.")
+         return [] # Handle other unexpected types
 
 
 class TicketUpdateStatus(OrmBaseModel):
     """Model for updating only the status of a ticket."""
     status: str = Field(..., example="In Progress", description="The new status for the ticket.")
 
-    @validator('status')
+    @field_validator('status')
+    @classmethod
     def status_must_be_valid(cls, v):
         valid_statuses = ['Open', 'In Progress', 'Resolved', 'Closed', 'Escalated'] # Add any other valid statuses
         if v not in valid_statuses:
@@ -99,6 +98,22 @@ class TicketUpdateAssignment(OrmBaseModel):
     team: Optional[str] = Field(None, max_length=100, description="Name of the team to assign. Set to null to unassign team.")
 
 
+class HourlyTicketStats(OrmBaseModel):
+    hour: datetime = Field(..., description="Start of the hour (UTC).")
+    created: int = Field(..., description="Tickets created in this hour.")
+    resolved: int = Field(..., description="Tickets resolved in this hour.")
+    avg_resolution_minutes: Optional[float] = Field(None, description="Mean created -> resolved time of the tickets resolved in this hour.")
+
+class TicketStats(OrmBaseModel):
+    """Dashboard aggregates, read from the trigger-maintained ticket_stats table."""
+    total: int
+    by_status: Dict[str, int] = Field(..., example={"Open": 12, "Closed": 40})
+    by_team: Dict[str, int] = Field(..., example={"Technical": 30, "Unassigned": 4})
+    by_priority: Dict[str, int] = Field(..., example={"High": 9, "Medium": 31})
+    resolved: int
+    avg_resolution_minutes: Optional[float] = None
+    hourly: List[HourlyTicketStats] = Field(..., description="One entry per hour, oldest first, ending with the current hour.")
+
 # --- Models for Agent Inputs/Outputs ---
 
 class SummarizationInput(OrmBaseModel):
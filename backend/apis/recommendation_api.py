@@ -2,12 +2,14 @@
 
 import logging
 # <<<--- Add Depends import ---<<<
-from fastapi import APIRouter, HTTPException, Depends, Body, status, Path, Query
+from fastapi import APIRouter, HTTPException, Depends, Body, status, Path, Query, Request
 from typing import List, Dict # Import Dict if needed later for user
 
 from .models import RecommendationResult, RecommendationFeedbackInput, Recommendation
-from backend.agents.recommendation_agent import RecommendationAgent
-from backend.database import database_manager as db
+from .responses import cached_json_response, dumps_json
+from backend.agents.recommendation_agent import RecommendationAgent, DEFAULT_MMR_LAMBDA
+from backend.database.storage import get_storage
+from backend.utils.read_cache import ReadCache
 # <<<--- Import auth dependency ---<<<
 from backend import auth
 
@@ -27,19 +29,33 @@ router = APIRouter(
 def get_recommendation_agent():
     return RecommendationAgent()
 
+# Rendered results per (ticket_id, top_n, mmr_lambda, embedding model), valid for one KB state (Storage.kb_version).
+# A ticket's subject/body never change after creation, so its own version is not part of the key.
+_recommendation_cache = ReadCache("recommendations")
+
 @router.get("/{ticket_id}", response_model=RecommendationResult, summary="Get Recommendations for a Ticket")
 async def get_recommendations(
+    request: Request,
     ticket_id: int = Path(..., title="The ID of the ticket...", ge=1),
     top_n: int = Query(3, ge=1, le=10, description="Number of recommendations..."),
+    mmr_lambda: float = Query(DEFAULT_MMR_LAMBDA, ge=0.0, le=1.0, description="Relevance/diversity trade-off: 1.0 = pure relevance, lower = more diverse."),
     agent: RecommendationAgent = Depends(get_recommendation_agent)
     # current_user: Dict = Depends(auth.get_current_active_user) # Already covered
 ):
     """
     Gets resolution recommendations for a specific ticket.
+    Results are cached until the KB changes (reload or feedback), where the storage backend can tell; ETag/304 as for tickets.
     (Requires Authentication)
     """
-    log.info(f"Recommendation GET endpoint called for ticket_id={ticket_id}, top_n={top_n}")
-    ticket = db.get_ticket(ticket_id)
+    log.info("Recommendation GET endpoint called for ticket_id=%s, top_n=%s, mmr_lambda=%s", ticket_id, top_n, mmr_lambda)
+    key = (ticket_id, top_n, mmr_lambda, agent.embedding_model)
+    storage = await get_storage()
+    snapshot = await storage.kb_version(agent.embedding_model)
+    if snapshot is not None:
+        cached = _recommendation_cache.get(key, snapshot)
+        if cached is not None:
+            return cached_json_response(request, cached)
+    ticket = await storage.get_ticket(ticket_id)
     if not ticket:
          log.error(f"Ticket {ticket_id} not found when attempting to get recommendations.")
          raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket {ticket_id} not found.")
@@ -47,11 +63,15 @@ async def get_recommendations(
         recommendations_data = await agent.recommend_resolutions(
             ticket_subject=ticket['subject'],
             ticket_body=ticket['body'],
-            top_n=top_n
+            top_n=top_n,
+            mmr_lambda=mmr_lambda
         )
         response_data = RecommendationResult(ticket_id=ticket_id, recommendations=recommendations_data)
-        log.info(f"Returning {len(recommendations_data)} recommendations for ticket {ticket_id}.")
-        return response_data
+        log.info("Returning %d recommendations for ticket %s.", len(recommendations_data), ticket_id)
+        if not recommendations_data or snapshot is None: # Empty KB or embedding failure: not worth pinning until the next snapshot
+            return response_data
+        body = dumps_json(response_data.model_dump(mode="json"))
+        return cached_json_response(request, _recommendation_cache.put(key, snapshot, body))
     except Exception as e:
         log.error(f"Error getting recommendations for ticket {ticket_id}: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"...")
@@ -66,7 +86,7 @@ async def post_feedback(
     Records user feedback on a recommendation.
     (Requires Authentication)
     """
-    log.info(f"Recommendation feedback received for recommendation_id={feedback_data.recommendation_id}...")
+    log.info("Recommendation feedback received for recommendation_id=%s...", feedback_data.recommendation_id)
     try:
         await agent.record_feedback(
             recommendation_id=feedback_data.recommendation_id,
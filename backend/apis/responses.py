@@ -0,0 +1,130 @@
+# backend/apis/responses.py
+
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, status
+from fastapi.responses import Response
+
+from .models import Ticket, parse_actions_json
+from backend.utils.read_cache import CachedBody
+
+try:
+    import orjson
+except ImportError: # Optional: without it the standard library encoder is used
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# Ticket fields in model order (matches the response_model output) and the ones holding timestamps
+TICKET_FIELDS = tuple(Ticket.model_fields)
+_TICKET_DATETIME_FIELDS = frozenset(name for name, field in Ticket.model_fields.items()
+                                    if field.annotation in (datetime, Optional[datetime]))
+
+
+def _iso_timestamp(value: Any) -> Any:
+    # SQLite CURRENT_TIMESTAMP text ('2025-03-17 10:00:00') -> the ISO form Pydantic emits for datetime fields
+    if isinstance(value, str):
+        if len(value) == 19 and value[10] == " ":
+            return f"{value[:10]}T{value[11:]}"
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return value
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ticket_row_to_api(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Trusted construct for a tickets row: the Ticket JSON shape without running validation. The DB schema
+    already guarantees the field types; only extracted_actions (JSON text) and timestamps need converting.
+    """
+    item = {name: row.get(name) for name in TICKET_FIELDS}
+    item["extracted_actions"] = parse_actions_json(item["extracted_actions"])
+    for name in _TICKET_DATETIME_FIELDS:
+        item[name] = _iso_timestamp(item[name])
+    return item
+
+
+def _minutes(seconds: float, count: int) -> Optional[float]:
+    return round(seconds / count / 60.0, 1) if count else None
+
+
+def ticket_stats_to_api(rows: Iterable[Dict[str, Any]], hours: List[str], all_bucket: str) -> Dict[str, Any]:
+    """
+    ticket_stats rows (database_manager.get_ticket_stats) -> the TicketStats JSON shape. `hours` are the hourly
+    bucket keys to report, oldest first; hours without rows are reported as zeros.
+    """
+    totals: Dict[str, Dict[str, int]] = {"status": {}, "team": {}, "priority": {}}
+    resolved: Tuple[int, float] = (0, 0.0)
+    hourly = {hour: [0, 0, 0.0] for hour in hours} # created, resolved, resolution seconds
+    for row in rows:
+        dimension, count = row["dimension"], row["ticket_count"]
+        if row["bucket"] == all_bucket:
+            if dimension == "resolved":
+                resolved = (count, row["resolution_seconds"])
+            else:
+                totals[dimension][row["value"] or "Unassigned"] = count
+        elif row["bucket"] in hourly:
+            entry = hourly[row["bucket"]]
+            if dimension == "status": # Every ticket has exactly one status: these rows sum to the tickets created
+                entry[0] += count
+            elif dimension == "resolved":
+                entry[1] += count
+                entry[2] += row["resolution_seconds"]
+    return {
+        "total": sum(totals["status"].values()),
+        "by_status": totals["status"], "by_team": totals["team"], "by_priority": totals["priority"],
+        "resolved": resolved[0], "avg_resolution_minutes": _minutes(resolved[1], resolved[0]),
+        "hourly": [{"hour": _iso_timestamp(hour), "created": created, "resolved": resolved_count,
+                    "avg_resolution_minutes": _minutes(seconds, resolved_count)}
+                   for hour, (created, resolved_count, seconds) in hourly.items()],
+    }
+
+
+def stats_hours(now: datetime, hours: int) -> List[str]:
+    """Keys of the `hours` hourly ticket_stats buckets ending with the one containing `now` (UTC), oldest first."""
+    current = now.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [(current - timedelta(hours=i)).strftime("%Y-%m-%d %H:00:00") for i in range(hours - 1, -1, -1)]
+
+
+# --- Conditional requests (ETag / Last-Modified) for bodies from backend/utils/read_cache.py ---
+
+def is_not_modified(request: Request, cached: CachedBody) -> bool:
+    """
+    RFC 9110 revalidation: If-None-Match (weak comparison) when present, otherwise If-Modified-Since.
+    Last-Modified has one-second resolution, so the ETag is the validator that matters.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or cached.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return cached.last_modified <= since
+
+
+def cached_json_response(request: Request, cached: CachedBody) -> Response:
+    """The cached body with its validators, or an empty 304 when the client's copy is current."""
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": format_datetime(cached.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache", # Per-user (authenticated) data; always revalidate
+    }
+    if is_not_modified(request, cached):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
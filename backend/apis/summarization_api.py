@@ -32,7 +32,7 @@ async def get_summary_and_actions(
     Generates a summary and extracts actions from the provided text.
     (Requires Authentication)
     """
-    log.info(f"Summarization endpoint called for text length {len(data.text)}.")
+    log.info("Summarization endpoint called for text length %d.", len(data.text))
     try:
         summary, actions = await agent.summarize_and_extract(data.text)
         log.info("Summarization API call successful.")
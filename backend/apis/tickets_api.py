@@ -1,18 +1,25 @@
 # backend/apis/tickets_api.py
 
-from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
 from typing import List, Optional, Dict # Import Dict
+from datetime import datetime, timezone
+import functools
 import logging
 import time
 
 # Import Pydantic models
-from .models import Ticket, TicketCreate, TicketUpdateStatus, TicketUpdateAssignment
-# Import database manager
+from .models import Ticket, TicketCreate, TicketStats, TicketUpdateStatus, TicketUpdateAssignment
+from .responses import cached_json_response, dumps_json, stats_hours, ticket_row_to_api, ticket_stats_to_api
+from .events_api import publish_ticket_event
+# Import database manager (change versions, stats) and the ticket storage (STORAGE_BACKEND)
 from backend.database import database_manager as db
+from backend.database.storage import get_storage
 # Import agents for dependency injection
 from backend.agents.summarization_agent import SummarizationAgent
 from backend.agents.routing_agent import RoutingAgent
 from backend.agents.prediction_agent import PredictionAgent
+from backend.utils.llm_gateway import llm_lane, Lane
+from backend.utils.read_cache import ReadCache
 # <<<--- Import the authentication dependency ---<<<
 from backend import auth # Import the auth module to get the dependency function
 
@@ -44,24 +51,44 @@ def get_prediction_agent():
     return PredictionAgent()
 # --- End Dependency Injection ---
 
+# Rendered GET responses, valid while db.tickets_list_version() / db.ticket_version(id) are unchanged
+_list_cache = ReadCache("tickets_list")
+_ticket_cache = ReadCache("ticket")
+_stats_cache = ReadCache("ticket_stats", max_entries=32)
+
+
+async def _store_upgraded_summary(ticket_id: int, summary: str, actions: List[str]) -> None:
+    # Called by SummarizationAgent.summarize_tiered once the LLM result is available
+    storage = await get_storage()
+    if await storage.update_ticket_summary(ticket_id, summary, actions):
+        log.debug("Ticket %s summary upgraded with the LLM result.", ticket_id)
+        await publish_ticket_event("enriched", ticket_id)
+
 
 # == GET Endpoints ==
 
 @router.get("/", response_model=List[Ticket])
 async def get_tickets(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter tickets by status (e.g., Open, In Progress)"),
     limit: int = Query(50, ge=1, le=200, description="Maximum number of tickets to return."),
     offset: int = Query(0, ge=0, description="Number of tickets to skip (for pagination).")
 ):
     """
     Retrieves a list of tickets, optionally filtered by status, with pagination.
+    Responses carry an ETag/Last-Modified; a matching If-None-Match gets 304 Not Modified.
     """
-    log.info(f"Request received for GET /tickets with status={status}, limit={limit}, offset={offset}")
+    log.info("Request received for GET /tickets with status=%s, limit=%s, offset=%s", status, limit, offset)
+    key = (status, limit, offset)
+    version = db.tickets_list_version() # Read before querying; see database_manager's change versions
     try:
-        tickets_data = db.get_all_tickets(status=status, limit=limit, offset=offset)
-        # Pydantic automatically handles validation and conversion using from_attributes=True
-        # It will also handle parsing the 'extracted_actions' JSON string due to the validator in models.py
-        return tickets_data
+        cached = _list_cache.get(key, version)
+        if cached is None:
+            tickets_data = await (await get_storage()).get_all_tickets(status=status, limit=limit, offset=offset)
+            # Rows come straight from our own schema, so they are shaped into the Ticket JSON without per-row
+            # validation (response_model still documents the shape); see responses.ticket_row_to_api
+            cached = _list_cache.put(key, version, dumps_json([ticket_row_to_api(row) for row in tickets_data]))
+        return cached_json_response(request, cached)
     except Exception as e:
         log.error(f"Error fetching tickets: {e}", exc_info=True) # Log traceback
         raise HTTPException(
@@ -69,18 +96,40 @@ async def get_tickets(
             detail="An error occurred while retrieving tickets."
         )
 
+@router.get("/stats", response_model=TicketStats)
+async def get_ticket_stats(
+    request: Request,
+    hours: int = Query(24, ge=1, le=168, description="Hourly buckets to return, ending with the current hour (UTC).")
+):
+    """
+    Dashboard statistics: ticket counts by status, team and priority, resolution times, and hourly activity.
+    Reads only the trigger-maintained ticket_stats aggregates, so the cost does not grow with the number of tickets.
+    """
+    log.info("Request received for GET /tickets/stats with hours=%s", hours)
+    buckets = stats_hours(datetime.now(timezone.utc), hours)
+    key = (hours, buckets[-1]) # The window moves every hour
+    version = db.tickets_list_version()
+    cached = _stats_cache.get(key, version)
+    if cached is None:
+        rows = db.get_ticket_stats(since_hour=buckets[0])
+        cached = _stats_cache.put(key, version, dumps_json(ticket_stats_to_api(rows, buckets, db.TICKET_STATS_ALL)))
+    return cached_json_response(request, cached)
+
 @router.get("/{ticket_id}", response_model=Ticket)
-async def get_ticket_by_id(ticket_id: int):
+async def get_ticket_by_id(ticket_id: int, request: Request):
     """
-    Retrieves a single ticket by its unique ID.
+    Retrieves a single ticket by its unique ID (ETag/Last-Modified, 304 on revalidation).
     """
-    log.info(f"Request received for GET /tickets/{ticket_id}")
-    ticket_data = db.get_ticket(ticket_id)
-    if not ticket_data:
-        log.warning(f"Ticket with ID {ticket_id} not found.")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket with ID {ticket_id} not found")
-    # Pydantic validates/converts the dict from the DB, including parsing JSON fields
-    return ticket_data
+    log.info("Request received for GET /tickets/%s", ticket_id)
+    version = db.ticket_version(ticket_id)
+    cached = _ticket_cache.get(ticket_id, version)
+    if cached is None:
+        ticket_data = await (await get_storage()).get_ticket(ticket_id)
+        if not ticket_data:
+            log.warning(f"Ticket with ID {ticket_id} not found.")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket with ID {ticket_id} not found")
+        cached = _ticket_cache.put(ticket_id, version, dumps_json(ticket_row_to_api(ticket_data)))
+    return cached_json_response(request, cached)
 
 # == POST Endpoint ==
 
@@ -98,11 +147,14 @@ async def create_ticket(
     Creates a new ticket, triggers summarization, prediction (placeholder),
     and initial routing (placeholder).
     """
-    log.info(f"Request received for POST /tickets with data: {ticket_data.dict()} by user '{current_user.get('username')}'")
+    log.info("Request received for POST /tickets (priority %s) by user '%s'", ticket_data.priority, current_user.get('username'))
+    if log.isEnabledFor(logging.DEBUG): # The payload is only serialized when it will actually be logged
+        log.debug("POST /tickets payload: %s", ticket_data.model_dump())
     start_time = time.time() # Start timing
 
     # --- 1. Basic Ticket Creation in DB ---
-    ticket_id = db.add_ticket(
+    storage = await get_storage()
+    ticket_id = await storage.add_ticket(
         customer_name=ticket_data.customer_name,
         customer_email=ticket_data.customer_email,
         subject=ticket_data.subject,
@@ -113,8 +165,8 @@ async def create_ticket(
         log.error("Failed to create ticket entry in database.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create ticket in database")
 
-    log.info(f"Ticket {ticket_id} created in database.")
-    db_creation_time = time.time()
+    log.info("Ticket %s created in database.", ticket_id)
+    await publish_ticket_event("created", ticket_id) # Viewers see it now; "enriched" follows with the AI results
 
     # --- 2. Trigger AI Agent Processing ---
     full_text = f"Subject: {ticket_data.subject}\n\nBody:\n{ticket_data.body}"
@@ -128,14 +180,19 @@ async def create_ticket(
     ai_processing_error = None
     try:
         # --- Call Summarization Agent (Real Call) ---
-        log.info(f"Calling SummarizationAgent for ticket {ticket_id}...")
-        summary, actions = await summarizer.summarize_and_extract(full_text)
-        db.update_ticket_summary(ticket_id, summary, actions)
-        log.info(f"Summarization complete for ticket {ticket_id}.")
-        summarization_time = time.time()
+        log.debug("Calling SummarizationAgent for ticket %s...", ticket_id)
+        # Urgent tickets jump every LLM queue (including batch/background work already waiting)
+        with llm_lane(Lane.URGENT if ticket_data.priority == 'Urgent' else Lane.INTERACTIVE):
+            if summarizer.strategy == "tiered":
+                # Instant extractive summary now; the LLM result overwrites it when it arrives
+                summary, actions = summarizer.summarize_tiered(full_text, on_upgrade=functools.partial(_store_upgraded_summary, ticket_id))
+            else:
+                summary, actions = await summarizer.summarize_and_extract(full_text)
+        await storage.update_ticket_summary(ticket_id, summary, actions)
+        log.debug("Summarization complete for ticket %s.", ticket_id)
 
         # --- Call Prediction Agent (Placeholder Call) ---
-        log.info(f"Calling PredictionAgent for ticket {ticket_id}...")
+        log.debug("Calling PredictionAgent for ticket %s...", ticket_id)
         prediction_features = {
             'ticket_id': ticket_id, # Pass ID for context if needed
             'priority': ticket_data.priority,
@@ -143,12 +200,11 @@ async def create_ticket(
             # Add more features here later based on your model
         }
         predicted_time = await predictor.predict_resolution_time(prediction_features)
-        db.update_ticket_prediction(ticket_id, predicted_time)
-        log.info(f"Prediction complete for ticket {ticket_id}. Predicted time: {predicted_time} mins.")
-        prediction_time = time.time()
+        await storage.update_ticket_prediction(ticket_id, predicted_time)
+        log.debug("Prediction complete for ticket %s. Predicted time: %s mins.", ticket_id, predicted_time)
 
         # --- Call Routing Agent (Placeholder Call) ---
-        log.info(f"Calling RoutingAgent for ticket {ticket_id}...")
+        log.debug("Calling RoutingAgent for ticket %s...", ticket_id)
         routing_decision = await router_agent.determine_route(
              ticket_id=ticket_id,
              ticket_subject=ticket_data.subject,
@@ -158,27 +214,27 @@ async def create_ticket(
         # Ensure keys exist before accessing, provide defaults
         assigned_agent_id = routing_decision.get('assigned_agent_id')
         assigned_team = routing_decision.get('assigned_team')
-        db.update_ticket_assignment(ticket_id, assigned_agent_id, assigned_team)
-        log.info(f"Routing complete for ticket {ticket_id}. Decision: {routing_decision}")
-        routing_time = time.time()
+        await storage.update_ticket_assignment(ticket_id, assigned_agent_id, assigned_team)
+        log.debug("Routing complete for ticket %s. Decision: %s", ticket_id, routing_decision)
 
     except Exception as e:
         ai_processing_error = e # Store error
         log.error(f"Error during AI processing for ticket {ticket_id}: {e}", exc_info=True)
         # Update ticket with error indicators if desired
-        db.update_ticket_summary(ticket_id, summary, actions) # Save default error messages
-        db.update_ticket_assignment(ticket_id, None, "[Routing Failed]") # Indicate routing failure
+        await storage.update_ticket_summary(ticket_id, summary, actions) # Save default error messages
+        await storage.update_ticket_assignment(ticket_id, None, "[Routing Failed]") # Indicate routing failure
 
     # --- 3. Fetch and return the created/updated ticket ---
     # Retrieve the final state of the ticket from the DB
-    created_ticket_data = db.get_ticket(ticket_id)
+    created_ticket_data = await storage.get_ticket(ticket_id)
     if not created_ticket_data:
          log.error(f"Failed to retrieve ticket {ticket_id} from database after processing.")
          # Even if AI failed, the ticket should exist. This indicates a deeper DB issue.
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve created ticket after saving.")
 
+    await publish_ticket_event("enriched", ticket_id, ticket=created_ticket_data)
     total_duration = time.time() - start_time
-    log.info(f"Ticket {ticket_id} creation and initial processing finished. Total time: {total_duration:.2f}s")
+    log.info("Ticket %s creation and initial processing finished. Total time: %.2fs", ticket_id, total_duration)
     if ai_processing_error:
         log.warning(f"Note: AI processing for ticket {ticket_id} encountered an error.")
         # Optionally add a header or field to the response indicating partial success?
@@ -189,40 +245,56 @@ async def create_ticket(
 
 # == PATCH Endpoints ==
 
+async def _raise_update_failed(ticket_id: int, detail: str) -> None:
+    """An UPDATE that changed nothing: the ticket was archived (409) or deleted (404) after the endpoint's check."""
+    current = await (await get_storage()).get_ticket(ticket_id)
+    if not current:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket with ID {ticket_id} not found")
+    if current.get('archived_at'):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Ticket with ID {ticket_id} is archived and read-only")
+    log.error(f"Database update failed for ticket {ticket_id}: {detail}")
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detail)
+
 @router.patch("/{ticket_id}/status", response_model=Ticket)
 async def update_ticket_status_endpoint(ticket_id: int, status_update: TicketUpdateStatus):
     """Updates the status of a specific ticket."""
-    log.info(f"Request received for PATCH /tickets/{ticket_id}/status with status: {status_update.status}")
-    # Check if ticket exists first using the DB function directly for efficiency
-    existing_ticket_data = db.get_ticket(ticket_id)
+    log.info("Request received for PATCH /tickets/%s/status with status: %s", ticket_id, status_update.status)
+    # Check if ticket exists first
+    storage = await get_storage()
+    existing_ticket_data = await storage.get_ticket(ticket_id)
     if not existing_ticket_data:
         log.warning(f"Update status failed: Ticket {ticket_id} not found.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket with ID {ticket_id} not found")
+    if existing_ticket_data.get('archived_at'):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Ticket with ID {ticket_id} is archived and read-only")
 
     # Update status in DB
-    success = db.update_ticket_status(ticket_id, status_update.status)
+    success = await storage.update_ticket_status(ticket_id, status_update.status)
     if not success:
-        log.error(f"Failed to update status for ticket {ticket_id} in database.")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update ticket status.")
+        await _raise_update_failed(ticket_id, "Failed to update ticket status.")
 
     # Return the updated ticket by fetching it again
-    updated_ticket = db.get_ticket(ticket_id)
+    updated_ticket = await storage.get_ticket(ticket_id)
     if not updated_ticket: # Should not happen if update succeeded, but check defensively
          log.error(f"Failed to retrieve ticket {ticket_id} after status update.")
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve ticket after update.")
 
-    log.info(f"Ticket {ticket_id} status updated successfully to {status_update.status}.")
+    log.info("Ticket %s status updated successfully to %s.", ticket_id, status_update.status)
+    await publish_ticket_event("updated", ticket_id, ticket=updated_ticket, previous=existing_ticket_data)
     return updated_ticket
 
 @router.patch("/{ticket_id}/assignment", response_model=Ticket)
 async def assign_ticket_endpoint(ticket_id: int, assignment: TicketUpdateAssignment):
     """Manually assigns or re-assigns a ticket to an agent or team."""
-    log.info(f"Request received for PATCH /tickets/{ticket_id}/assignment with data: {assignment.dict()}")
+    log.info("Request received for PATCH /tickets/%s/assignment with data: %s", ticket_id, assignment)
     # Check if ticket exists first
-    existing_ticket_data = db.get_ticket(ticket_id)
+    storage = await get_storage()
+    existing_ticket_data = await storage.get_ticket(ticket_id)
     if not existing_ticket_data:
         log.warning(f"Assignment failed: Ticket {ticket_id} not found.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ticket with ID {ticket_id} not found")
+    if existing_ticket_data.get('archived_at'):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Ticket with ID {ticket_id} is archived and read-only")
 
     # Add validation if needed (e.g., check if agent_id exists in the agents table)
     # if assignment.agent_id:
@@ -230,16 +302,16 @@ async def assign_ticket_endpoint(ticket_id: int, assignment: TicketUpdateAssignm
     #     if not agent:
     #         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Agent with ID {assignment.agent_id} not found")
 
-    success = db.update_ticket_assignment(ticket_id, assignment.agent_id, assignment.team)
+    success = await storage.update_ticket_assignment(ticket_id, assignment.agent_id, assignment.team)
     if not success:
-         log.error(f"Failed to update assignment for ticket {ticket_id} in database.")
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to assign ticket.")
+        await _raise_update_failed(ticket_id, "Failed to assign ticket.")
 
     # Return the updated ticket
-    updated_ticket = db.get_ticket(ticket_id)
+    updated_ticket = await storage.get_ticket(ticket_id)
     if not updated_ticket:
          log.error(f"Failed to retrieve ticket {ticket_id} after assignment update.")
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve ticket after update.")
 
-    log.info(f"Ticket {ticket_id} assignment updated successfully.")
+    log.info("Ticket %s assignment updated successfully.", ticket_id)
+    await publish_ticket_event("updated", ticket_id, ticket=updated_ticket, previous=existing_ticket_data)
     return updated_ticket
\ No newline at end of file
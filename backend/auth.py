@@ -10,7 +10,7 @@ from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 import logging
 
-from backend.database import database_manager as db # Import DB manager
+from backend.database.storage import get_storage # Users live in the configured storage backend
 
 log = logging.getLogger(__name__)
 load_dotenv() # Load environment variables from .env file
@@ -96,7 +96,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
         raise credentials_exception from e
 
     # Fetch user from database using the username extracted from token
-    user = db.get_user_by_username(username=token_data.username)
+    user = await (await get_storage()).get_user_by_username(username=token_data.username)
     if user is None:
         log.warning(f"User '{token_data.username}' from token not found in database.")
         raise credentials_exception
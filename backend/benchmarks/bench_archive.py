@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_archive.py
+"""
+Hot-table size and read latency as ticket history grows, with and without archival
+(database_manager.archive_tickets). Simulates --months of traffic, --per-month tickets each, with a constant
+open backlog. After every month the archived database moves tickets resolved more than
+--archive-after-days before the simulated "now" into the archive. Reported per month: hot rows, database file
+size, and the best-of --repeat latency of dashboard-style reads (open ticket page, COUNT per status,
+full-table COUNT) plus get_ticket for an old (archived) id.
+
+    python backend/benchmarks/bench_archive.py [--months 12] [--per-month 20000] [--archive-after-days 90]
+"""
+
+import sys
+import os
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+# --- Configuration ---
+DAYS_PER_MONTH = 30
+OPEN_WINDOW_DAYS = 14 # Tickets younger than this (at the simulated now) may still be open
+PRIORITIES = ["Low", "Medium", "High", "Urgent"]
+TEAMS = [None, "Technical", "Billing", "AccountSupport"]
+READS = {
+    "open page": "SELECT * FROM tickets WHERE status = 'Open' ORDER BY created_at DESC, id DESC LIMIT 50",
+    "per status": "SELECT status, COUNT(*) FROM tickets GROUP BY status",
+    "count all": "SELECT COUNT(*) FROM tickets",
+}
+# --- End Configuration ---
+
+
+def month_start(month: int, months: int) -> datetime:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - timedelta(days=(months - month + 1) * DAYS_PER_MONTH)
+
+
+def month_rows(month: int, months: int, per_month: int, rng: random.Random) -> List[tuple]:
+    """
+    Tickets created in `month` (1-based) of a history ending now; resolved unless within OPEN_WINDOW_DAYS of its
+    end (those get resolved early the next month, so the open backlog stays constant).
+    """
+    start = month_start(month, months)
+    month_end = start + timedelta(days=DAYS_PER_MONTH)
+    rows = []
+    for i in range(per_month):
+        created = start + timedelta(minutes=rng.randint(0, DAYS_PER_MONTH * 24 * 60 - 1))
+        still_open = created > month_end - timedelta(days=OPEN_WINDOW_DAYS) and rng.random() < 0.5
+        resolved = None if still_open else min(created + timedelta(minutes=rng.randint(10, 5000)), month_end)
+        rows.append((f"Customer {month}-{i}", f"Support request {month}-{i}", "The installer stops with an error.",
+                     "Open" if still_open else rng.choice(["Resolved", "Closed"]), rng.choice(PRIORITIES), rng.choice(TEAMS),
+                     created.strftime("%Y-%m-%d %H:%M:%S"), resolved.strftime("%Y-%m-%d %H:%M:%S") if resolved else None))
+    return rows
+
+
+def best_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hot-table size and read latency with and without ticket archival.")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--per-month", type=int, default=20000)
+    parser.add_argument("--archive-after-days", type=float, default=90)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-archive-")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "plain.db")
+    from backend.database import database_manager as db
+
+    paths = {"plain": os.path.join(workdir, "plain.db"), "archived": os.path.join(workdir, "archived.db")}
+    for path in paths.values():
+        db.DATABASE_PATH = path
+        db.init_db()
+    rng = random.Random(args.seed)
+    try:
+        header = " ".join(f"{name + ' ms':>15}" for name in READS)
+        print(f"{'month':>5} {'db':>9} {'hot rows':>9} {'file MB':>8} {header} {'get old id ms':>14}")
+        for month in range(1, args.months + 1):
+            rows = month_rows(month, args.months, args.per_month, rng)
+            backlog_resolved_at = (month_start(month, args.months) + timedelta(days=2)).strftime("%Y-%m-%d %H:%M:%S")
+            # Days between the simulated now (end of this month) and the real now
+            days_ahead = (args.months - month) * DAYS_PER_MONTH
+            for name, path in paths.items():
+                with sqlite3.connect(path) as conn:
+                    conn.execute("UPDATE tickets SET status = 'Resolved', resolved_at = ? WHERE status = 'Open'", (backlog_resolved_at,))
+                    conn.executemany(
+                        "INSERT INTO tickets (customer_name, subject, body, status, priority, assigned_team, created_at, resolved_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                db.DATABASE_PATH = path
+                if name == "archived":
+                    db.archive_tickets(args.archive_after_days + days_ahead, batch_size=5000)
+                conn = sqlite3.connect(path)
+                try:
+                    hot_rows = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+                    timings = [best_ms(lambda q=query: conn.execute(q).fetchall(), args.repeat) for query in READS.values()]
+                finally:
+                    conn.close()
+                get_old = best_ms(lambda: db.get_ticket(1), args.repeat)
+                print(f"{month:>5} {name:>9} {hot_rows:>9} {os.path.getsize(path) / 1e6:>8.1f} "
+                      + " ".join(f"{ms:>15.2f}" for ms in timings) + f" {get_old:>14.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
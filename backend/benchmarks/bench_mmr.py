@@ -0,0 +1,88 @@
+# backend/benchmarks/bench_mmr.py
+"""
+Latency benchmark for MMR re-ranking of recommendations on a synthetic KB index.
+
+Measures KBIndex.search alone and the extra time KBIndex.mmr adds for the API's largest request
+(top_n=10, i.e. 40 candidates) and fails (exit code 1) if the MMR p95 exceeds the budget.
+
+    python backend/benchmarks/bench_mmr.py [--sizes 1000 10000 50000] [--dim 768] [--budget-ms 1.0]
+"""
+
+import sys
+import os
+import argparse
+import time
+
+import numpy as np
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+from backend.utils.kb_index import KBIndex
+from backend.agents.recommendation_agent import DEFAULT_MMR_LAMBDA, MIN_CANDIDATES, SIMILARITY_WEIGHT
+
+# --- Configuration ---
+MMR_BUDGET_MS = 1.0 # p95 time MMR may add to a request
+TOP_N = 10 # Largest top_n the API accepts
+CLUSTER_SIZE = 8 # Synthetic near-duplicates per solution, so plain top-k is dominated by copies
+ITERATIONS = 300
+# --- End Configuration ---
+
+
+def build_index(size: int, dim: int, rng: np.random.Generator) -> KBIndex:
+    centers = rng.standard_normal((size // CLUSTER_SIZE + 1, dim)).astype(np.float32)
+    matrix = np.repeat(centers, CLUSTER_SIZE, axis=0)[:size]
+    matrix += 0.15 * rng.standard_normal(matrix.shape).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return KBIndex(
+        "benchmark", ids=np.arange(size, dtype=np.int64), matrix=matrix, titles=[""] * size, contents=[""] * size,
+        success_rates=rng.uniform(0.3, 0.9, size).astype(np.float32), usage_counts=np.zeros(size, dtype=np.int64),
+    )
+
+
+def percentiles(samples_ms):
+    return np.percentile(samples_ms, 50), np.percentile(samples_ms, 95), np.percentile(samples_ms, 99)
+
+
+def run(size: int, dim: int, budget_ms: float, rng: np.random.Generator) -> bool:
+    index = build_index(size, dim, rng)
+    search_ms, mmr_ms, distinct_plain, distinct_mmr = [], [], [], []
+    for _ in range(ITERATIONS):
+        query = index.matrix[rng.integers(size)] + 0.3 * rng.standard_normal(dim).astype(np.float32)
+
+        start = time.perf_counter()
+        rows, similarities = index.search(query, max(TOP_N * 4, MIN_CANDIDATES))
+        scores = SIMILARITY_WEIGHT * similarities + (1.0 - SIMILARITY_WEIGHT) * index.success_rates[rows]
+        search_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        picked = index.mmr(rows, scores, TOP_N, DEFAULT_MMR_LAMBDA)
+        mmr_ms.append((time.perf_counter() - start) * 1000)
+
+        plain = np.argsort(-scores)[:TOP_N]
+        distinct_plain.append(len(set(rows[plain] // CLUSTER_SIZE)))
+        distinct_mmr.append(len(set(rows[picked] // CLUSTER_SIZE)))
+
+    s50, s95, _ = percentiles(search_ms)
+    m50, m95, m99 = percentiles(mmr_ms)
+    ok = m95 <= budget_ms
+    print(f"KB size {size:>7} dim {dim}: search p50 {s50:.3f}ms p95 {s95:.3f}ms | "
+          f"MMR p50 {m50:.3f}ms p95 {m95:.3f}ms p99 {m99:.3f}ms [{'OK' if ok else 'OVER BUDGET'}] | "
+          f"distinct solutions in top {TOP_N}: plain {np.mean(distinct_plain):.1f}, MMR {np.mean(distinct_mmr):.1f}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MMR re-ranking latency.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Synthetic KB sizes.")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension (nomic-embed-text: 768).")
+    parser.add_argument("--budget-ms", type=float, default=MMR_BUDGET_MS, help="Allowed MMR p95 in milliseconds.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = [run(size, args.dim, args.budget_ms, rng) for size in args.sizes]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,146 @@
+# backend/benchmarks/bench_parsing.py
+"""
+Microbenchmark for LLM reply parsing (backend/utils/text_parsing.py) against the previous inline parsing
+of SummarizationAgent: split on the header, re.findall with an uncompiled pattern and `not in list` dedup.
+
+Replies come from --corpus (JSON lines, each a string or an object with a "response" field, e.g. captured
+from the ollama.chat span logs) or are generated: header echoes, '*'/'-'/numbered bullets, duplicates that
+differ in case/punctuation, filler items, preambles and unbulleted answers, with 4-40 items each.
+
+    python backend/benchmarks/bench_parsing.py [--replies 5000] [--corpus captured.jsonl] [--repeat 5]
+"""
+
+import sys
+import os
+import argparse
+import json
+import random
+import re
+import time
+from typing import List
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+from backend.agents.summarization_agent import ACTIONS_HEADER, FILLER_PHRASES
+from backend.utils.extractive_summary import EXAMPLE_ACTIONS, VAGUE_PROBLEM_ACTIONS
+from backend.utils.kb_ingest import extract_info_from_transcript
+from backend.utils.text_parsing import dedup_ordered, parse_bullets, reply_lines
+
+# --- Configuration ---
+FILLERS = ["No further action needed.", "Ask for more specific details about the problem."]
+TRANSCRIPT_FILES = ["Account Synchronization Bug.txt", "Device Compatibility Error.txt", "Network Connectivity Issue.txt",
+                    "Payment Gateway Integration Failure.txt", "Software Installation Failure.txt"]
+# --- End Configuration ---
+
+
+def legacy_parse_actions(action_response: str) -> List[str]:
+    """SummarizationAgent's action parsing before the shared parsing module (kept here as the baseline)."""
+    actions = []
+    cleaned_response = action_response.split(ACTIONS_HEADER)[-1]
+    action_matches = re.findall(r"^\s*[\*\-]\s+(.*)", cleaned_response, re.MULTILINE)
+    if action_matches:
+        for action_text in action_matches:
+            cleaned_action = action_text.strip()
+            if cleaned_action and "no further action needed" not in cleaned_action.lower() and "ask for more specific details" not in cleaned_action.lower():
+                if cleaned_action not in actions:
+                    actions.append(cleaned_action)
+    else:
+        fallback_text = cleaned_response.strip()
+        if fallback_text and not fallback_text.startswith("[Error:") and "ask for more specific details" not in fallback_text.lower() and "no further action needed" not in fallback_text.lower():
+            actions = [line.strip() for line in fallback_text.split('\n') if line.strip() and line.strip() not in actions]
+    return actions
+
+
+def parse_actions(action_response: str) -> List[str]:
+    """The agent's current parsing (summarization_agent._summarize_llm, step 3)."""
+    actions = parse_bullets(action_response, ACTIONS_HEADER, skip_phrases=FILLER_PHRASES)
+    if actions is not None:
+        return actions
+    if not action_response.startswith("[Error:") and not any(phrase in action_response.lower() for phrase in FILLER_PHRASES):
+        return dedup_ordered(reply_lines(action_response, ACTIONS_HEADER))
+    return []
+
+
+def synthetic_reply(rng: random.Random, min_items: int, max_items: int, numbered_share: float = 0.2) -> str:
+    catalogue = EXAMPLE_ACTIONS + VAGUE_PROBLEM_ACTIONS
+    items = [rng.choice(catalogue) for _ in range(rng.randint(min_items, max_items))]
+    items = [item.lower() if rng.random() < 0.1 else item.rstrip(".") if rng.random() < 0.1 else item for item in items]
+    if rng.random() < 0.3:
+        items.insert(rng.randrange(len(items)), rng.choice(FILLERS))
+    style = rng.random()
+    if style < 0.1: # Unbulleted answer
+        body = "\n".join(items)
+    else:
+        markers = ["*", "-"] if style < 1 - numbered_share else [f"{i}." for i in range(1, len(items) + 1)]
+        body = "\n".join(f"{'  ' if rng.random() < 0.2 else ''}{markers[i % len(markers)]} {item}" for i, item in enumerate(items))
+    preamble = rng.choice(["", "Sure! Here are the steps:\n", f"{ACTIONS_HEADER}\n", f"Task received.\n{ACTIONS_HEADER}\n\n"])
+    return preamble + body + rng.choice(["", "\n", "\n\nLet me know if you need anything else."])
+
+
+def runaway_reply(rng: random.Random, items: int) -> str:
+    # A small model stuck in a loop: the same few bullets repeated until num_predict runs out
+    return ACTIONS_HEADER + "\n" + "\n".join(f"* {rng.choice(EXAMPLE_ACTIONS)} ({i % 7})" for i in range(items))
+
+
+def load_corpus(path: str) -> List[str]:
+    replies = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                replies.append(item["response"] if isinstance(item, dict) else str(item))
+    return replies
+
+
+def best_of(repeat: int, func, items) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark LLM reply and transcript parsing.")
+    parser.add_argument("--replies", type=int, default=5000, help="Synthetic replies to generate (ignored with --corpus).")
+    parser.add_argument("--corpus", help="JSON lines file of captured replies.")
+    parser.add_argument("--transcripts", type=int, default=5000, help="Transcript parses to time.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.corpus:
+        scenarios = {"captured": load_corpus(args.corpus)}
+    else:
+        scenarios = {
+            "typical (4-8 items)": [synthetic_reply(rng, 4, 8) for _ in range(args.replies)],
+            "'*'/'-' bullets only": [synthetic_reply(rng, 4, 8, numbered_share=0) for _ in range(args.replies)],
+            "long (20-40 items)": [synthetic_reply(rng, 20, 40) for _ in range(args.replies)],
+            "runaway (400 items)": [runaway_reply(rng, 400) for _ in range(max(1, args.replies // 50))],
+        }
+    print(f"{'Action parsing':<24} {'replies':>7} {'chars':>6} {'legacy us':>10} {'current us':>10} {'speedup':>8} {'differ':>7}")
+    for name, replies in scenarios.items():
+        legacy_s = best_of(args.repeat, legacy_parse_actions, replies) / len(replies)
+        current_s = best_of(args.repeat, parse_actions, replies) / len(replies)
+        # Expected differences: numbered bullets and duplicates differing in case/trailing punctuation
+        differing = sum(legacy_parse_actions(reply) != parse_actions(reply) for reply in replies)
+        print(f"{name:<24} {len(replies):>7} {sum(map(len, replies)) // len(replies):>6} {legacy_s * 1e6:>10.2f} "
+              f"{current_s * 1e6:>10.2f} {legacy_s / current_s:>7.2f}x {differing:>7}")
+
+    data_dir = os.path.join(backend_dir, "data")
+    contents = [open(os.path.join(data_dir, name), encoding="utf-8").read() for name in TRANSCRIPT_FILES]
+    transcripts = [contents[i % len(contents)] for i in range(args.transcripts)]
+    transcript_s = best_of(args.repeat, extract_info_from_transcript, transcripts)
+    print(f"Transcript parsing, {len(transcripts)} files: {transcript_s / len(transcripts) * 1e6:.2f} us/file")
+
+
+if __name__ == "__main__":
+    main()
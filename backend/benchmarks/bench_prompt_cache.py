@@ -0,0 +1,143 @@
+# backend/benchmarks/bench_prompt_cache.py
+"""
+Prefill/load time per ticket for the SummarizationAgent prompts under different prompt layouts and
+Ollama keep_alive / num_ctx settings.
+
+Each configuration starts with the model unloaded and runs the agent's two calls (summary, then actions)
+for every ticket in sequence, summing what Ollama reports for them: load_duration, prompt_eval_duration
+(prefill) and prompt_eval_count (prompt tokens not served from the KV cache).
+
+Layouts:
+  inline    the previous prompts: task instructions, conversation and header in one user message, with a
+            different instruction block per call (so the two calls of a ticket share no prefix)
+  prefixed  SYSTEM_PROMPT (static, shared by both calls) + conversation + task line (the current agent)
+
+Without --host a stub server (fake_ollama.py) simulating model loads and the prompt cache is used, which
+shows the mechanics; point --host at a real Ollama to measure actual times:
+
+    python backend/benchmarks/bench_prompt_cache.py
+    python backend/benchmarks/bench_prompt_cache.py --host http://127.0.0.1:11434 --tickets 10 --num-ctx 2048 4096
+"""
+
+import sys
+import os
+import argparse
+import json
+import threading
+from typing import Dict, List, Optional
+
+import ollama
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+from backend.agents.summarization_agent import SYSTEM_PROMPT, SUMMARY_HEADER, ACTIONS_HEADER, build_task_prompt
+from backend.benchmarks.fake_ollama import make_server
+from backend.benchmarks.load_test import TICKET_BODIES
+
+# --- Configuration ---
+DEFAULT_MODEL = "qwen:1.8b"
+# Stub server settings: roughly a 1.8B model on a small GPU
+FAKE_PREFILL_TOKENS_PER_SECOND = 800.0
+FAKE_LOAD_MS = 1500.0
+# Instruction blocks of the previous inline prompts (the baseline layout)
+LEGACY_SUMMARY_INSTRUCTIONS = """Analyze the following customer support conversation.
+Provide a very concise, one or two sentence summary of the CUSTOMER'S main problem or question ONLY.
+Focus ONLY on what the customer reported. DO NOT include agent actions or solutions."""
+LEGACY_ACTION_INSTRUCTIONS = SYSTEM_PROMPT.split("TASK ACTIONS:\n", 1)[1].rsplit("\nStart your answer", 1)[0]
+# --- End Configuration ---
+
+
+def ticket_conversations(count: int) -> List[str]:
+    return [f"Subject: Support request {i + 1}\n\nBody:\n{TICKET_BODIES[i % len(TICKET_BODIES)]}" for i in range(count)]
+
+
+def build_messages(layout: str, conversation: str, task: str) -> List[Dict[str, str]]:
+    if layout == "prefixed":
+        return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": build_task_prompt(conversation, task)}]
+    instructions, header = ((LEGACY_SUMMARY_INSTRUCTIONS, SUMMARY_HEADER) if task == "SUMMARY"
+                            else (LEGACY_ACTION_INSTRUCTIONS, ACTIONS_HEADER))
+    return [{"role": "user", "content": f'{instructions}\n\nConversation:\n"""\n{conversation}\n"""\n\n{header}'}]
+
+
+def unload(client: ollama.Client, model: str) -> None:
+    # An empty chat with keep_alive=0 unloads the model, so every configuration starts cold
+    client.chat(model=model, messages=[], keep_alive=0)
+
+
+def run_config(client: ollama.Client, model: str, conversations: List[str], layout: str,
+               keep_alive: Optional[str], num_ctx: Optional[int]) -> Dict[str, float]:
+    unload(client, model)
+    options = {"num_ctx": num_ctx, "num_predict": 64} if num_ctx else {"num_predict": 64}
+    load_ns = prefill_ns = prompt_tokens = 0
+    for conversation in conversations:
+        for task in ("SUMMARY", "ACTIONS"):
+            response = client.chat(model=model, messages=build_messages(layout, conversation, task),
+                                   options=options, keep_alive=keep_alive)
+            load_ns += response.get("load_duration") or 0
+            prefill_ns += response.get("prompt_eval_duration") or 0
+            prompt_tokens += response.get("prompt_eval_count") or 0
+    tickets = len(conversations)
+    return {
+        "layout": layout, "keep_alive": keep_alive, "num_ctx": num_ctx,
+        "load_ms_per_ticket": round(load_ns / 1e6 / tickets, 1),
+        "prefill_ms_per_ticket": round(prefill_ns / 1e6 / tickets, 1),
+        "prompt_tokens_per_ticket": round(prompt_tokens / tickets, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep prompt layout, keep_alive and num_ctx; report prefill time per ticket.")
+    parser.add_argument("--host", help="Ollama URL. Default: start a stub server that simulates the prompt cache.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--tickets", type=int, default=20)
+    parser.add_argument("--layouts", nargs="+", default=["inline", "prefixed"], choices=["inline", "prefixed"])
+    parser.add_argument("--keep-alive", nargs="+", default=["0", "30m"], help="keep_alive values; 'default' sends none.")
+    parser.add_argument("--num-ctx", nargs="+", type=int, default=[4096])
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    server = None
+    host = args.host
+    if not host:
+        server = make_server(port=0, latency_ms=1, tokens_per_second=5000, completion_tokens=20,
+                             prefill_tokens_per_second=FAKE_PREFILL_TOKENS_PER_SECOND, load_ms=FAKE_LOAD_MS)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"Using stub Ollama ({FAKE_PREFILL_TOKENS_PER_SECOND:.0f} prefill tokens/s, {FAKE_LOAD_MS:.0f} ms load) at {host}")
+
+    client = ollama.Client(host=host)
+    conversations = ticket_conversations(args.tickets)
+    results = []
+    try:
+        for layout in args.layouts:
+            for keep_alive in args.keep_alive:
+                for num_ctx in args.num_ctx:
+                    results.append(run_config(client, args.model, conversations, layout,
+                                              None if keep_alive == "default" else keep_alive, num_ctx))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    baseline = results[0]
+    baseline_ms = baseline["load_ms_per_ticket"] + baseline["prefill_ms_per_ticket"]
+    print(f"\n{args.tickets} tickets, 2 calls each, model {args.model}; saved = vs first row\n")
+    print(f"{'layout':<9} {'keep_alive':>10} {'num_ctx':>7} {'load ms':>9} {'prefill ms':>10} {'prompt tok':>10} {'saved ms':>9}")
+    for row in results:
+        row["saved_ms_per_ticket"] = round(baseline_ms - row["load_ms_per_ticket"] - row["prefill_ms_per_ticket"], 1)
+        print(f"{row['layout']:<9} {str(row['keep_alive']):>10} {str(row['num_ctx']):>7} {row['load_ms_per_ticket']:>9.1f} "
+              f"{row['prefill_ms_per_ticket']:>10.1f} {row['prompt_tokens_per_ticket']:>10.1f} {row['saved_ms_per_ticket']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"host": args.host or "stub", "model": args.model, "tickets": args.tickets, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Rows/sec serialized for GET /tickets pages (200 rows by default): the response_model path (FastAPI validates
+every row against Ticket, incl. EmailStr and the extracted_actions validator, then dumps JSON via Pydantic)
+against the trusted-row path GET /tickets serves (responses.ticket_row_to_api + dumps_json: shape + orjson, no
+validation; the ReadCache in front of it is left out).
+
+Measured twice: the serialization step alone, and end to end through a FastAPI app in-process (TestClient).
+Both paths must produce the same JSON; the benchmark exits with code 1 if they differ.
+
+    python backend/benchmarks/bench_serialization.py [--rows 200] [--iterations 200]
+"""
+
+import sys
+import os
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+from backend.apis.models import Ticket
+from backend.apis.responses import dumps_json, orjson, ticket_row_to_api
+from backend.benchmarks.load_test import TICKET_BODIES
+
+# --- Configuration ---
+STATUSES = ["Open", "In Progress", "Resolved", "Closed", "Escalated"]
+PRIORITIES = ["Low", "Medium", "High", "Urgent"]
+ACTIONS = ["Ask for the specific error code/message.", "Which operating system/device/browser is used?",
+           "Ask user to restart the device/router.", "Check user's subscription/account status."]
+# --- End Configuration ---
+
+
+def ticket_rows(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Rows as database_manager.get_all_tickets returns them (sqlite3.Row -> dict, timestamps as text)."""
+    start = datetime(2025, 3, 1, 8, 0, 0)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(minutes=17 * i)
+        status = rng.choice(STATUSES)
+        rows.append({
+            "id": i + 1, "customer_name": f"Customer {i}", "customer_email": f"customer{i}@example.com",
+            "subject": f"Support request {i}", "body": rng.choice(TICKET_BODIES), "status": status,
+            "priority": rng.choice(PRIORITIES), "assigned_agent_id": rng.choice([None, 1, 2, 3]),
+            "assigned_team": rng.choice([None, "Technical", "Billing"]),
+            "created_at": created.strftime("%Y-%m-%d %H:%M:%S"),
+            "updated_at": (created + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"),
+            "resolved_at": (created + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S") if status in ("Resolved", "Closed") else None,
+            "summary": "The customer cannot complete the installation.",
+            "extracted_actions": json.dumps(rng.sample(ACTIONS, 3)), "predicted_resolution_time": rng.randint(30, 600),
+            "resolution_details": None, "feedback_rating": rng.choice([None, 4, 5]), "feedback_comment": None,
+        })
+    return rows
+
+
+def rows_per_second(func: Callable[[], Any], rows: int, iterations: int) -> float:
+    func() # Warm-up (schema/adapter caches)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return rows * iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ticket list serialization paths.")
+    parser.add_argument("--rows", type=int, default=200, help="Rows per page (GET /tickets allows up to 200).")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = ticket_rows(args.rows, random.Random(args.seed))
+    adapter = TypeAdapter(List[Ticket]) # What FastAPI does for response_model=List[Ticket]
+
+    def model_path() -> bytes:
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    def lean_path() -> bytes:
+        return dumps_json([ticket_row_to_api(row) for row in rows])
+
+    if json.loads(model_path()) != json.loads(lean_path()):
+        print("ERROR: the trusted-row path produces different JSON than the response_model path")
+        sys.exit(1)
+
+    app = FastAPI()
+    app.get("/model", response_model=List[Ticket])(lambda: rows)
+    app.get("/lean", response_model=List[Ticket])(lambda: Response(lean_path(), media_type="application/json"))
+    client = TestClient(app)
+    if client.get("/model").json() != client.get("/lean").json():
+        print("ERROR: endpoint responses differ")
+        sys.exit(1)
+
+    print(f"{args.rows}-row pages, {args.iterations} iterations, orjson {'installed' if orjson else 'not installed'}\n")
+    print(f"{'path':<34} {'serialize rows/s':>17} {'end-to-end rows/s':>18}")
+    results = {}
+    for name, func, route in (("response_model (validate + dump)", model_path, "/model"),
+                              ("trusted rows + orjson", lean_path, "/lean")):
+        serialize = rows_per_second(func, args.rows, args.iterations)
+        end_to_end = rows_per_second(lambda: client.get(route), args.rows, max(1, args.iterations // 4))
+        results[name] = (serialize, end_to_end)
+        print(f"{name:<34} {serialize:>17,.0f} {end_to_end:>18,.0f}")
+    (model_serialize, model_e2e), (lean_serialize, lean_e2e) = results.values()
+    print(f"\nspeedup: {lean_serialize / model_serialize:.1f}x serialization, {lean_e2e / model_e2e:.1f}x end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_ticket_stats.py
+"""
+Dashboard statistics at growing ticket volumes: the full-table GROUP BY queries the dashboard would need
+against database_manager.get_ticket_stats (trigger-maintained ticket_stats rows), plus what the triggers
+cost on writes (bulk insert rate with and without them).
+
+    python backend/benchmarks/bench_ticket_stats.py [--sizes 1000 10000 100000] [--repeat 20]
+"""
+
+import sys
+import os
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+# --- Configuration ---
+STATUSES = ["Open", "In Progress", "Resolved", "Closed", "Escalated"]
+PRIORITIES = ["Low", "Medium", "High", "Urgent"]
+TEAMS = [None, "Technical", "Billing", "AccountSupport"]
+# The per-dimension scans the dashboard needs without ticket_stats
+GROUP_BY_QUERIES = [
+    "SELECT status, COUNT(*) FROM tickets GROUP BY status",
+    "SELECT assigned_team, COUNT(*) FROM tickets GROUP BY assigned_team",
+    "SELECT priority, COUNT(*) FROM tickets GROUP BY priority",
+    "SELECT COUNT(*), AVG((julianday(resolved_at) - julianday(created_at)) * 1440) FROM tickets WHERE resolved_at IS NOT NULL",
+    "SELECT strftime('%Y-%m-%d %H:00:00', created_at) AS hour, COUNT(*) FROM tickets WHERE created_at >= ? GROUP BY hour",
+]
+# --- End Configuration ---
+
+
+def ticket_rows(count: int, rng: random.Random) -> List[tuple]:
+    # Spread over the last 90 days, like a live system's history
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+        status = rng.choice(STATUSES)
+        resolved = created + timedelta(minutes=rng.randint(10, 5000)) if status in ("Resolved", "Closed") else None
+        rows.append((f"Customer {i}", f"Support request {i}", "The installer stops with an error.", status,
+                     rng.choice(PRIORITIES), rng.choice(TEAMS), created.strftime("%Y-%m-%d %H:%M:%S"),
+                     resolved.strftime("%Y-%m-%d %H:%M:%S") if resolved else None))
+    return rows
+
+
+def insert_seconds(path: str, rows: List[tuple]) -> float:
+    start = time.perf_counter()
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO tickets (customer_name, subject, body, status, priority, assigned_team, created_at, resolved_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return time.perf_counter() - start
+
+
+def best_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dashboard statistics: GROUP BY scans vs ticket_stats.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-stats-")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "stats.db")
+    from backend.database import database_manager as db
+    from backend.apis.responses import stats_hours
+
+    try:
+        print(f"{'tickets':>8} {'insert/s (triggers)':>20} {'insert/s (none)':>16} {'GROUP BY ms':>12} {'ticket_stats ms':>16}")
+        for size in args.sizes:
+            rows = ticket_rows(size, random.Random(args.seed))
+            for name in ("stats.db", "plain.db"):
+                if os.path.exists(os.path.join(workdir, name)):
+                    os.remove(os.path.join(workdir, name))
+            db.DATABASE_PATH = os.path.join(workdir, "plain.db")
+            db.init_db()
+            with sqlite3.connect(db.DATABASE_PATH) as conn:
+                for (trigger,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'ticket_stats_%'").fetchall():
+                    conn.execute(f"DROP TRIGGER {trigger}")
+            plain_seconds = insert_seconds(db.DATABASE_PATH, rows)
+            db.DATABASE_PATH = os.path.join(workdir, "stats.db")
+            db.init_db()
+            stats_seconds = insert_seconds(db.DATABASE_PATH, rows)
+
+            since = stats_hours(datetime.now(timezone.utc), 24)[0]
+            with sqlite3.connect(db.DATABASE_PATH) as conn:
+                group_by_ms = best_ms(lambda: [conn.execute(q, (since,) if "?" in q else ()).fetchall() for q in GROUP_BY_QUERIES], args.repeat)
+            stats_ms = best_ms(lambda: db.get_ticket_stats(since), args.repeat)
+            print(f"{size:>8} {size / stats_seconds:>20,.0f} {size / plain_seconds:>16,.0f} {group_by_ms:>12.2f} {stats_ms:>16.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# backend/benchmarks/bench_workers.py
+"""
+Throughput scaling of the multi-process launcher (backend/scripts/run_server.py) with the worker count.
+
+Seeds a temporary database and stub Ollama server like load_test.py, then for each worker count starts the
+launcher, drives it with the same request mix from several client processes (so the load generator is not the
+bottleneck) and reports requests/s, speedup over one worker and scaling efficiency (speedup / workers).
+Near-linear scaling needs at least workers + client processes free cores; the default worker counts stop at
+the machine's CPU count.
+
+    python backend/benchmarks/bench_workers.py [--workers 1 2 4 8] [--clients 2] [--concurrency 32] [--duration 15]
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import subprocess
+import tempfile
+from typing import Dict, List, Tuple
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+from backend.benchmarks.load_test import (
+    LoadDriver, SEED_TICKETS, bench_token, free_port, seed_database, summarize_latencies, wait_for_http,
+)
+
+# --- Configuration ---
+# CPU-bound operations only (no LLM waits), so throughput is limited by server cores
+DEFAULT_MIX = "list=45,recommend=40,create=15"
+SEED_KB_ENTRIES = 2000
+# --- End Configuration ---
+
+
+def drive(job: Tuple[str, Dict[str, float], List[int], str, int, float, int]) -> Tuple[List[float], int]:
+    """One client process: returns (latencies, errors)."""
+    base_url, mix, ticket_ids, token, concurrency, duration, seed = job
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    random.seed(seed)
+    run = asyncio.run(LoadDriver(base_url, mix, ticket_ids, token).run(concurrency, duration))
+    return [latency for samples in run["samples"].values() for latency in samples], sum(run["errors"].values())
+
+
+def default_worker_counts() -> List[int]:
+    cpus, counts = os.cpu_count() or 1, [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark throughput scaling across server worker processes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_worker_counts())
+    parser.add_argument("--clients", type=int, default=2, help="Load generator processes.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests per client process.")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per worker count.")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--kb-size", type=int, default=SEED_KB_ENTRIES)
+    args = parser.parse_args()
+
+    mix = {op: float(weight) for op, weight in (item.split("=") for item in args.mix.split(","))}
+    workdir = tempfile.mkdtemp(prefix="bench-workers-")
+    ollama_port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_PATH": os.path.join(workdir, "workers.db"),
+        "OLLAMA_HOST": f"http://127.0.0.1:{ollama_port}",
+        "KB_BACKGROUND_REEMBED": "false",
+        "TRACE_EXPORT": "none",
+        "PYTHONPATH": project_root,
+    })
+    os.environ.update(env)
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(benchmarks_dir, "fake_ollama.py"), "--port", str(ollama_port), "--latency-ms", "0"],
+            env=env, stdout=subprocess.DEVNULL,
+        ))
+        wait_for_http(f"http://127.0.0.1:{ollama_port}/api/tags")
+        print(f"Seeding {workdir} ({SEED_TICKETS} tickets, {args.kb_size} KB entries)...")
+        if not seed_database(args.kb_size, SEED_TICKETS):
+            mix.pop("login", None)
+        token = bench_token()
+
+        print(f"{os.cpu_count()} CPUs, {args.clients} client processes x {args.concurrency} concurrent requests, mix {mix}\n")
+        print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>10} {'p95 ms':>8} {'errors':>7}")
+        single_rps = None
+        for workers in args.workers:
+            app_port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(backend_dir, "scripts", "run_server.py"), "--workers", str(workers),
+                 "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning", "--no-access-log"],
+                env=env, cwd=project_root, stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, f"server-{workers}.log"), "w"),
+            )
+            processes.append(server)
+            base_url = f"http://127.0.0.1:{app_port}"
+            try:
+                wait_for_http(base_url + "/", timeout=60.0)
+                jobs = [(base_url, mix, list(range(1, SEED_TICKETS + 1)), token, args.concurrency, args.duration, seed)
+                        for seed in range(args.clients)]
+                with multiprocessing.Pool(args.clients) as pool:
+                    results = pool.map(drive, jobs)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+                processes.remove(server)
+            latencies = [latency for samples, _ in results for latency in samples]
+            errors = sum(errors for _, errors in results)
+            rps = len(latencies) / args.duration
+            single_rps = single_rps or rps / workers # Per-worker baseline if the first run is not 1 worker
+            speedup = rps / single_rps
+            print(f"{workers:>7} {rps:>9.1f} {speedup:>7.2f}x {speedup / workers:>9.0%} "
+                  f"{summarize_latencies(latencies).get('p95_ms', 0):>8.1f} {errors:>7}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
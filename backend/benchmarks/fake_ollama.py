@@ -0,0 +1,221 @@
+# backend/benchmarks/fake_ollama.py
+"""
+Stub Ollama HTTP server for benchmarks: answers /api/chat, /api/embed, /api/embeddings, /api/show and
+/api/tags with canned content after a configurable latency, so the backend can be load-tested without a GPU.
+
+Chat replies take `latency + completion_tokens / tokens_per_second` seconds and report matching
+eval_count/eval_duration. Embeddings are deterministic per text (same text -> same vector).
+--stall-seconds/--stall-every make every Nth chat call hang first, to exercise deadlines and failover.
+
+With --prefill-tokens-per-second the stub also models Ollama's model residency and prompt cache (one slot per
+model): a call pays --load-ms when the model is not loaded (never loaded, keep_alive expired, or num_ctx
+changed), and prefill time only for the prompt tokens (~4 chars each) after the prefix it shares with the
+previous prompt for that model. keep_alive=0 unloads the model after the call.
+
+    python backend/benchmarks/fake_ollama.py [--port 11499] [--latency-ms 50] [--tokens-per-second 80]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_PORT = 11499
+EMBEDDING_DIM = 768
+SUMMARY_TEXT = "The customer cannot complete the software installation because the installer fails with an error."
+ACTION_BULLETS = [
+    "Ask for the exact error message shown by the installer.",
+    "Check whether antivirus software is blocking the installation.",
+    "Ask which operating system version is used.",
+    "Ask the customer to retry with the direct download link.",
+    "Verify available disk space on the device.",
+]
+DEFAULT_KEEP_ALIVE_SECONDS = 300 # Ollama's default keep_alive (5m)
+CHARS_PER_TOKEN = 4
+# --- End Configuration ---
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def fake_reply(prompt: str, completion_tokens: int) -> str:
+    if "Troubleshooting Steps" in prompt or "bulleted list" in prompt:
+        text = "\n".join(f"* {bullet}" for bullet in ACTION_BULLETS)
+    else:
+        text = SUMMARY_TEXT
+    words = text.split(" ")
+    # Pad/cut to roughly the configured completion length (~1 token per word here)
+    if len(words) < completion_tokens and "*" not in text:
+        words += ["(details)"] * (completion_tokens - len(words))
+    return " ".join(words)
+
+
+def keep_alive_seconds(value) -> float:
+    """Ollama keep_alive: a number of seconds or a duration string like '30m'; negative keeps the model loaded forever."""
+    if value is None or value == "":
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"(-?[\d.]+)\s*(ms|s|m|h)?", str(value).strip())
+        if not match:
+            return DEFAULT_KEEP_ALIVE_SECONDS
+        seconds = float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+def render_prompt(messages: list) -> str:
+    # Stand-in for the model's chat template: messages in order, so a shared system message is a shared prefix
+    return "".join(f"<|{m.get('role', 'user')}|>\n{m.get('content', '')}\n" for m in messages) + "<|assistant|>\n"
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_s = 0.05
+    tokens_per_second = 80.0
+    completion_tokens = 60
+    embed_ms_per_text = 2.0
+    stall_seconds = 0.0
+    stall_every = 1
+    prefill_tokens_per_second = 0.0 # 0: no load/prefill model, prompt processing is part of latency_s
+    load_s = 0.0
+    chat_requests = 0 # Counted per configured handler class
+    # Per configured handler class: model -> {"expires", "num_ctx", "prompt"} (the one cached prompt per model)
+    loaded_models: dict = {}
+    models_lock = threading.Lock()
+
+    def _prompt_cost(self, model: str, prompt: str, options: dict, keep_alive) -> tuple:
+        """(load seconds, prompt tokens to evaluate, prefill seconds) for this call, updating the model's cache."""
+        cls = type(self)
+        total_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        if not self.prefill_tokens_per_second:
+            return 0.0, total_tokens, self.latency_s
+        num_ctx = (options or {}).get("num_ctx")
+        with cls.models_lock:
+            now = time.monotonic()
+            state = cls.loaded_models.get(model)
+            reload = state is None or state["expires"] < now or state["num_ctx"] != num_ctx
+            cached = "" if reload else state["prompt"]
+            reused_tokens = len(os.path.commonprefix([cached, prompt])) // CHARS_PER_TOKEN
+            evaluated = max(1, total_tokens - reused_tokens)
+            load_s = self.load_s if reload else 0.0
+            prefill_s = evaluated / self.prefill_tokens_per_second
+            keep = keep_alive_seconds(keep_alive)
+            if keep > 0:
+                cls.loaded_models[model] = {"expires": now + load_s + prefill_s + keep, "num_ctx": num_ctx, "prompt": prompt}
+            else:
+                cls.loaded_models.pop(model, None)
+        return load_s, evaluated, prefill_s
+
+    def _send(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            self._send({"models": []})
+        elif self.path.startswith("/api/version"):
+            self._send({"version": "0.0.0-fake"})
+        else:
+            self._send({"error": "not found"}, 404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        request = self._read_json()
+        model = request.get("model", "fake")
+        now = datetime.now(timezone.utc).isoformat()
+        if self.path == "/api/chat":
+            messages = request.get("messages", [])
+            prompt = render_prompt(messages)
+            cls = type(self)
+            cls.chat_requests += 1
+            if self.stall_seconds and cls.chat_requests % self.stall_every == 0:
+                time.sleep(self.stall_seconds)
+            load_s, prompt_tokens, prefill_s = self._prompt_cost(model, prompt, request.get("options"), request.get("keep_alive"))
+            eval_seconds = self.completion_tokens / self.tokens_per_second
+            extra_s = load_s + prefill_s if self.prefill_tokens_per_second else 0.0
+            time.sleep(self.latency_s + extra_s + eval_seconds)
+            # The task is in the last message; a shared system prompt may describe several tasks
+            content = fake_reply(messages[-1].get("content", "") if messages else "", self.completion_tokens)
+            if request.get("format") == "json":
+                content = json.dumps({"category": "Software Installation Failure", "problem": SUMMARY_TEXT,
+                                      "solution": ACTION_BULLETS[1], "keywords": ["install", "antivirus"]})
+            self._send({
+                "model": model, "created_at": now, "done": True, "done_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+                "total_duration": int((self.latency_s + extra_s + eval_seconds) * 1e9), "load_duration": int(load_s * 1e9),
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": self.completion_tokens, "eval_duration": int(eval_seconds * 1e9),
+            })
+        elif self.path == "/api/embed":
+            inputs = request.get("input") or []
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            time.sleep(self.latency_s + self.embed_ms_per_text * len(inputs) / 1000)
+            self._send({"model": model, "embeddings": [fake_embedding(text) for text in inputs]})
+        elif self.path == "/api/embeddings":
+            time.sleep(self.latency_s + self.embed_ms_per_text / 1000)
+            self._send({"embedding": fake_embedding(request.get("prompt", ""))})
+        elif self.path == "/api/show":
+            self._send({"modelfile": "", "parameters": "", "template": "", "details": {"format": "gguf"}, "model_info": {}})
+        else:
+            self._send({"error": f"unsupported endpoint {self.path}"}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port: int = DEFAULT_PORT, latency_ms: float = 50.0, tokens_per_second: float = 80.0,
+                completion_tokens: int = 60, embed_ms_per_text: float = 2.0, stall_seconds: float = 0.0,
+                stall_every: int = 1, prefill_tokens_per_second: float = 0.0, load_ms: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("ConfiguredFakeOllamaHandler", (FakeOllamaHandler,), {
+        "latency_s": latency_ms / 1000, "tokens_per_second": tokens_per_second,
+        "completion_tokens": completion_tokens, "embed_ms_per_text": embed_ms_per_text,
+        "stall_seconds": stall_seconds, "stall_every": max(1, stall_every), "chat_requests": 0,
+        "prefill_tokens_per_second": prefill_tokens_per_second, "load_s": load_ms / 1000,
+        "loaded_models": {}, "models_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama server with configurable latency and token rate.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fixed latency added to every call (prompt processing).")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Simulated generation speed for chat calls.")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="Tokens generated per chat reply.")
+    parser.add_argument("--embed-ms-per-text", type=float, default=2.0, help="Extra embedding time per input text.")
+    parser.add_argument("--stall-seconds", type=float, default=0.0, help="Extra delay injected into stalled chat calls.")
+    parser.add_argument("--stall-every", type=int, default=1, help="Stall every Nth chat call (with --stall-seconds).")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0,
+                        help="Simulate prompt processing and the prompt cache at this speed (0: off, part of --latency-ms).")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Model load time when simulating the prompt cache.")
+    args = parser.parse_args()
+    server = make_server(args.port, args.latency_ms, args.tokens_per_second, args.completion_tokens, args.embed_ms_per_text,
+                         args.stall_seconds, args.stall_every, args.prefill_tokens_per_second, args.load_ms)
+    print(f"Fake Ollama listening on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
@@ -0,0 +1,320 @@
+# backend/benchmarks/load_test.py
+"""
+Load test for the FastAPI backend.
+
+Starts a stub Ollama server (fake_ollama.py) and the app (uvicorn, one worker) against a temporary SQLite
+database seeded with a user, tickets and an embedded knowledge base. It then drives a weighted mix of
+login / ticket list / ticket create / summarize / recommend requests at fixed concurrency levels and
+reports throughput, p50/p95/p99 latency and server CPU per request for each level.
+
+Results are written as JSON (default: backend/benchmarks/baseline.json); pass --compare to diff a run
+against a previous file:
+
+    python backend/benchmarks/load_test.py --concurrency 1 8 32 --duration 20
+    python backend/benchmarks/load_test.py --output /tmp/pr.json --compare backend/benchmarks/baseline.json
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# --- Path Setup ---
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(benchmarks_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+# --- Configuration ---
+DEFAULT_OUTPUT = os.path.join(benchmarks_dir, 'baseline.json')
+DEFAULT_MIX = "list=40,recommend=25,summarize=15,create=10,login=10"
+BENCH_USER = "loadtest"
+BENCH_PASSWORD = "loadtest-password"
+SEED_TICKETS = 300
+SEED_KB_ENTRIES = 2000
+WARMUP_SECONDS = 2.0
+TICKET_BODIES = [
+    "The installer stops at 80% with error 0x80070005 and rolls back. I already restarted twice.",
+    "Since the latest update the app cannot find my thermostat on the local network anymore.",
+    "Payments fail at checkout with a gateway timeout, customers are complaining since this morning.",
+    "My account data is not syncing between my phone and laptop, changes on one never show on the other.",
+    "The app crashes on launch on my tablet after upgrading to version 5.0.",
+]
+# --- End Configuration ---
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """User+system CPU time of a process (Linux /proc); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def seed_database(kb_entries: int, tickets: int) -> bool:
+    """
+    Runs in this process with DATABASE_PATH/OLLAMA_HOST already pointing at the temp DB and stub server.
+    Returns False when the bench user has no usable password (bcrypt backend unavailable), i.e. login can't be tested.
+    """
+    from backend.database import database_manager as db
+    from backend.auth import get_password_hash
+    from backend.utils.kb_embedding_pipeline import run_embedding_pipeline
+    from backend.utils.kb_ingest import ingest_kb_records, iter_csv_kb_records
+
+    db.init_db()
+    try:
+        hashed_password, login_available = get_password_hash(BENCH_PASSWORD), True
+    except ValueError as e: # passlib 1.7 cannot load bcrypt >= 4.1
+        print(f"Password hashing unavailable ({e}); the 'login' operation is skipped.")
+        hashed_password, login_available = "!", False
+    db.add_user(BENCH_USER, hashed_password, email="loadtest@example.com")
+    rng = random.Random(7)
+    for i in range(tickets):
+        db.add_ticket(f"Customer {i}", f"Issue report {i}", rng.choice(TICKET_BODIES), priority=rng.choice(["Low", "Medium", "High"]))
+
+    csv_path = os.path.join(backend_dir, 'data', 'Historical_ticket_data.csv')
+    synthetic = ({
+        'source_key': f"bench:{i}",
+        'title': f"{rng.choice(['Installation', 'Network', 'Payment', 'Sync', 'Compatibility'])} issue #{i}",
+        'content': f"Problem Summary:\n{rng.choice(TICKET_BODIES)}\n\nSuccessful Solution:\nStep {i}: apply fix variant {i % 97}.",
+        'keywords': "bench",
+    } for i in range(kb_entries))
+
+    async def load_kb():
+        await ingest_kb_records(iter_csv_kb_records(csv_path))
+        await ingest_kb_records(synthetic)
+        await run_embedding_pipeline(resume=False, checkpoint_path=os.path.join(os.path.dirname(db.DATABASE_PATH), 'bench.checkpoint.json'))
+    asyncio.run(load_kb())
+    return login_available
+
+
+def bench_token() -> str:
+    """Signs a bearer token for the bench user directly, so the run does not depend on the login mix."""
+    from backend.auth import create_access_token
+    return create_access_token(data={"sub": BENCH_USER})
+
+
+class LoadDriver:
+    def __init__(self, base_url: str, mix: Dict[str, float], ticket_ids: List[int], token: str):
+        self.base_url = base_url
+        self.token = token
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.ticket_ids = ticket_ids
+
+    async def _request(self, client: httpx.AsyncClient, op: str, headers: Dict[str, str], rng: random.Random) -> httpx.Response:
+        if op == "login":
+            return await client.post("/auth/token", data={"username": BENCH_USER, "password": BENCH_PASSWORD})
+        if op == "list":
+            return await client.get("/tickets/", params={"limit": 50}, headers=headers)
+        if op == "create":
+            return await client.post("/tickets/", headers=headers, json={
+                "customer_name": "Load Test", "customer_email": "customer@example.com",
+                "subject": "Problem during load test", "body": rng.choice(TICKET_BODIES), "priority": "Medium",
+            })
+        if op == "summarize":
+            return await client.post("/summarize/", headers=headers, json={"text": rng.choice(TICKET_BODIES)})
+        if op == "recommend":
+            return await client.get(f"/recommend/{rng.choice(self.ticket_ids)}", params={"top_n": 5}, headers=headers)
+        raise ValueError(f"Unknown operation '{op}'")
+
+    async def run(self, concurrency: int, duration: float) -> Dict[str, List]:
+        samples: Dict[str, List] = {op: [] for op in self.ops}
+        errors: Dict[str, int] = {op: 0 for op in self.ops}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=300.0, limits=limits) as client:
+            headers = {"Authorization": f"Bearer {self.token}"}
+            measure_from = time.monotonic() + WARMUP_SECONDS
+            deadline = measure_from + duration
+
+            async def worker(seed: int):
+                rng = random.Random(seed)
+                while time.monotonic() < deadline:
+                    op = rng.choices(self.ops, self.weights)[0]
+                    started = time.monotonic()
+                    try:
+                        response = await self._request(client, op, headers, rng)
+                        ok = response.status_code < 400
+                    except httpx.HTTPError:
+                        ok = False
+                    if started >= measure_from:
+                        samples[op].append(time.monotonic() - started)
+                        if not ok:
+                            errors[op] += 1
+
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return {"samples": samples, "errors": errors}
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": int(len(ms)), "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2), "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n--- Compared with {baseline_path} ({baseline.get('meta', {}).get('timestamp', '?')}) ---")
+    for level, result in current["results"].items():
+        base = baseline.get("results", {}).get(level)
+        if not base:
+            continue
+        def delta(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{level}: throughput {result['throughput_rps']:.1f} rps ({delta(result['throughput_rps'], base['throughput_rps'])}), "
+              f"p95 {result['overall'].get('p95_ms', 0):.1f}ms ({delta(result['overall'].get('p95_ms', 0), base['overall'].get('p95_ms', 0))})")
+        for op, stats in result["ops"].items():
+            old = base.get("ops", {}).get(op, {})
+            if stats.get("count") and old.get("count"):
+                print(f"    {op:<10} p50 {delta(stats['p50_ms'], old['p50_ms']):>8}  p95 {delta(stats['p95_ms'], old['p95_ms']):>8}  p99 {delta(stats['p99_ms'], old['p99_ms']):>8}")
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING) # One INFO line per request otherwise
+    parser = argparse.ArgumentParser(description="Load-test the backend against a stub Ollama server.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels to run.")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per level (after a short warm-up).")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, e.g. 'list=40,recommend=25,summarize=15,create=10,login=10'.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub Ollama fixed latency per call.")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Stub Ollama generation speed.")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="Tokens per stub chat reply.")
+    parser.add_argument("--kb-size", type=int, default=SEED_KB_ENTRIES, help="Synthetic KB entries to seed (plus the CSV).")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results.")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mix = {op: float(weight) for op, weight in (item.split("=") for item in args.mix.split(","))}
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    ollama_port, app_port = free_port(), free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_PATH": os.path.join(workdir, "loadtest.db"),
+        "STORAGE_BACKEND": "sqlite", # seed_database writes through database_manager
+        "OLLAMA_HOST": f"http://127.0.0.1:{ollama_port}",
+        "KB_BACKGROUND_REEMBED": "false",
+        "TRACE_EXPORT": "none",
+        "PYTHONPATH": project_root,
+    })
+    os.environ.update(env)
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(benchmarks_dir, "fake_ollama.py"), "--port", str(ollama_port),
+             "--latency-ms", str(args.latency_ms), "--tokens-per-second", str(args.tokens_per_second),
+             "--completion-tokens", str(args.completion_tokens)],
+            env=env, stdout=subprocess.DEVNULL,
+        ))
+        wait_for_http(f"http://127.0.0.1:{ollama_port}/api/tags")
+
+        print(f"Seeding {workdir} ({SEED_TICKETS} tickets, {args.kb_size} KB entries)...")
+        if not seed_database(args.kb_size, SEED_TICKETS):
+            mix.pop("login", None)
+
+        app_log = open(os.path.join(workdir, "app.log"), "w")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--log-level", "warning", "--no-access-log"],
+            env=env, cwd=project_root, stdout=app_log, stderr=subprocess.STDOUT,
+        )
+        processes.append(server)
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for_http(base_url + "/")
+
+        driver = LoadDriver(base_url, mix, ticket_ids=list(range(1, SEED_TICKETS + 1)), token=bench_token())
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                                         capture_output=True, text=True).stdout.strip() or None,
+                "config": {"duration_s": args.duration, "mix": mix, "ollama_latency_ms": args.latency_ms,
+                           "tokens_per_second": args.tokens_per_second, "completion_tokens": args.completion_tokens,
+                           "kb_size": args.kb_size, "seed_tickets": SEED_TICKETS},
+            },
+            "results": {},
+        }
+        random.seed(args.seed)
+        for concurrency in args.concurrency:
+            cpu_before = process_cpu_seconds(server.pid)
+            run = asyncio.run(driver.run(concurrency, args.duration))
+            cpu_after = process_cpu_seconds(server.pid)
+            all_latencies = [latency for samples in run["samples"].values() for latency in samples]
+            total_errors = sum(run["errors"].values())
+            # CPU covers the warm-up too, so it is divided by every request sent in the window (approximation)
+            requests_incl_warmup = len(all_latencies) * (args.duration + WARMUP_SECONDS) / args.duration
+            result = {
+                "concurrency": concurrency,
+                "requests": len(all_latencies),
+                "errors": total_errors,
+                "throughput_rps": round(len(all_latencies) / args.duration, 2),
+                "server_cpu_ms_per_request": round((cpu_after - cpu_before) * 1000 / requests_incl_warmup, 3)
+                if cpu_before is not None and cpu_after is not None and all_latencies else None,
+                "overall": summarize_latencies(all_latencies),
+                "ops": {op: dict(summarize_latencies(samples), errors=run["errors"][op]) for op, samples in run["samples"].items()},
+            }
+            report["results"][f"c{concurrency}"] = result
+            overall = result["overall"]
+            print(f"concurrency {concurrency:>3}: {result['throughput_rps']:>7.1f} req/s  p50 {overall.get('p50_ms', 0):>8.1f}ms  "
+                  f"p95 {overall.get('p95_ms', 0):>8.1f}ms  p99 {overall.get('p99_ms', 0):>8.1f}ms  errors {total_errors}  "
+                  f"cpu/req {result['server_cpu_ms_per_request']}ms")
+            for op, stats in result["ops"].items():
+                if stats.get("count"):
+                    print(f"    {op:<10} n={stats['count']:<6} p50 {stats['p50_ms']:>8.1f}ms  p95 {stats['p95_ms']:>8.1f}ms  p99 {stats['p99_ms']:>8.1f}ms  errors {stats['errors']}")
+
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+        if args.compare:
+            compare(report, args.compare)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
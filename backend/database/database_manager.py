@@ -3,9 +3,14 @@
 import sqlite3
 import os
 import json
+import hashlib
+import itertools
 import logging
-from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+import socket
+from contextlib import closing, contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+log = logging.getLogger(__name__)
 
 # Import serialization functions from utils if not already done
 try:
@@ -14,14 +19,106 @@ except ImportError:
     # Handle case where ollama_integration might not be fully ready yet during init
     serialize_embedding = lambda x: None
     deserialize_embedding = lambda x: None
-    logging.warning("Could not import embedding utils in database_manager.")
+    log.warning("Could not import embedding utils in database_manager.")
+from backend.utils.metrics import timed, DB_QUERY_SECONDS
+from backend.utils.tracing import traced
+
+
+# Define the path to the database file relative to this script's location (DATABASE_PATH env var overrides it, e.g. for benchmarks)
+DATABASE_PATH = os.getenv("DATABASE_PATH") or os.path.join(os.path.dirname(__file__), 'support_system.db')
+# Archived tickets (archive_tickets) live in a second database file; default: <database>_archive.db next to it
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH", "")
+
+# Columns added to existing tables after their first release: (table, column, column definition).
+# schema.sql already contains them for new databases; init_db adds any that are missing.
+SCHEMA_COLUMN_MIGRATIONS = [
+    ("knowledge_base", "content_hash", "TEXT"),
+    ("knowledge_base", "embedding_model", "TEXT"),
+    ("knowledge_base", "embedding_dim", "INTEGER"),
+    ("knowledge_base", "source_key", "TEXT"),
+    ("knowledge_base", "canonical_id", "INTEGER REFERENCES knowledge_base(id)"),
+    ("knowledge_base", "duplicate_count", "INTEGER DEFAULT 0"),
+    ("knowledge_base", "helpful_count", "INTEGER DEFAULT 0"),
+]
+SCHEMA_MIGRATION_STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS idx_kb_embedding_model ON knowledge_base(embedding_model)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_kb_source_key ON knowledge_base(source_key)",
+    "CREATE INDEX IF NOT EXISTS idx_kb_canonical_id ON knowledge_base(canonical_id)",
+    "CREATE TABLE IF NOT EXISTS kb_minhash (kb_id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, signature BLOB NOT NULL, "
+    "FOREIGN KEY (kb_id) REFERENCES knowledge_base(id))",
+    "CREATE TABLE IF NOT EXISTS kb_lsh_buckets (bucket INTEGER NOT NULL, kb_id INTEGER NOT NULL, PRIMARY KEY (bucket, kb_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_kb_lsh_kb_id ON kb_lsh_buckets(kb_id)",
+    "CREATE TABLE IF NOT EXISTS ticket_stats (bucket TEXT NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL, "
+    "ticket_count INTEGER NOT NULL DEFAULT 0, resolution_seconds REAL NOT NULL DEFAULT 0, PRIMARY KEY (bucket, dimension, value)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS ticket_archive_batch (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS change_log (seq INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, entity_id INTEGER, "
+    "kind TEXT, origin TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+]
+
+# --- ticket_stats maintenance (see schema.sql) ---
+# ticket_stats dimension -> tickets column
+TICKET_STATS_DIMENSIONS = {"status": "status", "team": "assigned_team", "priority": "priority"}
+TICKET_STATS_ALL = "all"
+
+def _hour(timestamp: str) -> str:
+    return f"strftime('%Y-%m-%d %H:00:00', {timestamp})"
 
+def _stats_upsert(select: str) -> str:
+    # `select` yields (bucket, dimension, value, ticket_count, resolution_seconds) rows to add
+    return (
+        f"INSERT INTO ticket_stats (bucket, dimension, value, ticket_count, resolution_seconds) {select} "
+        "ON CONFLICT(bucket, dimension, value) DO UPDATE SET ticket_count = ticket_count + excluded.ticket_count, "
+        "resolution_seconds = resolution_seconds + excluded.resolution_seconds;"
+    )
 
-# Configure basic logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+def _dimension_rows(row: str, sign: int, columns: Dict[str, str] = TICKET_STATS_DIMENSIONS, source: str = "") -> str:
+    # `row` is NEW/OLD inside a trigger, or a tickets alias named in `source` ("FROM tickets t")
+    return " UNION ALL ".join(
+        f"SELECT {bucket}, '{dimension}', COALESCE({row}.{column}, ''), {sign}, 0 {source}"
+        for dimension, column in columns.items() for bucket in (_hour(f"{row}.created_at"), f"'{TICKET_STATS_ALL}'")
+    )
 
-# Define the path to the database file relative to this script's location
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'support_system.db')
+def _resolved_rows(row: str, sign: int, source: str = "") -> str:
+    seconds = f"{sign} * (julianday({row}.resolved_at) - julianday({row}.created_at)) * 86400.0"
+    return " UNION ALL ".join(
+        f"SELECT {bucket}, 'resolved', '', {sign}, {seconds} {source} WHERE {row}.resolved_at IS NOT NULL"
+        for bucket in (_hour(f"{row}.resolved_at"), f"'{TICKET_STATS_ALL}'")
+    )
+
+def _ticket_stats_triggers() -> List[str]:
+    # UPDATE OF <column> keeps the update_ticket_timestamp trigger's own UPDATE (updated_at only) from firing these
+    triggers = [
+        f"CREATE TRIGGER IF NOT EXISTS ticket_stats_insert AFTER INSERT ON tickets BEGIN "
+        f"{_stats_upsert(_dimension_rows('NEW', 1))} {_stats_upsert(_resolved_rows('NEW', 1))} END",
+        # Recreated on every start: databases from before archival have it without the WHEN clause
+        "DROP TRIGGER IF EXISTS ticket_stats_delete",
+        # Archived tickets still count: deletes that archive_tickets makes leave the statistics alone
+        f"CREATE TRIGGER ticket_stats_delete AFTER DELETE ON tickets "
+        f"WHEN OLD.id NOT IN (SELECT id FROM ticket_archive_batch) BEGIN "
+        f"{_stats_upsert(_dimension_rows('OLD', -1))} {_stats_upsert(_resolved_rows('OLD', -1))} END",
+        f"CREATE TRIGGER IF NOT EXISTS ticket_stats_resolved AFTER UPDATE OF resolved_at, created_at ON tickets "
+        f"WHEN OLD.resolved_at IS NOT NEW.resolved_at OR OLD.created_at IS NOT NEW.created_at BEGIN "
+        f"{_stats_upsert(_resolved_rows('OLD', -1))} {_stats_upsert(_resolved_rows('NEW', 1))} END",
+    ]
+    for dimension, column in TICKET_STATS_DIMENSIONS.items():
+        changed = {dimension: column}
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS ticket_stats_{dimension} AFTER UPDATE OF {column}, created_at ON tickets "
+            f"WHEN OLD.{column} IS NOT NEW.{column} OR OLD.created_at IS NOT NEW.created_at BEGIN "
+            f"{_stats_upsert(_dimension_rows('OLD', -1, changed))} {_stats_upsert(_dimension_rows('NEW', 1, changed))} END"
+        )
+    return triggers
+
+SCHEMA_MIGRATION_STATEMENTS += _ticket_stats_triggers()
+# Model that produced embeddings stored before embedding_model was tracked
+LEGACY_EMBEDDING_MODEL = "nomic-embed-text"
+
+def _observed(func):
+    """
+    Records the call's latency in the db_query_duration_seconds histogram (labelled with the function name)
+    and wraps it in a 'db.<function>' trace span.
+    """
+    return traced(f"db.{func.__name__}")(timed(DB_QUERY_SECONDS, operation=func.__name__)(func))
 
 @contextmanager
 def get_db_connection():
@@ -30,30 +127,33 @@ def get_db_connection():
     try:
         conn = sqlite3.connect(DATABASE_PATH)
         conn.row_factory = sqlite3.Row
-        logging.debug("Database connection established.")
+        log.debug("Database connection established.")
         yield conn
     except sqlite3.Error as e:
-        logging.error(f"Database connection error: {e}")
+        log.error("Database connection error: %s", e)
+        if conn:
+            # A logged exception's traceback keeps the failed statement alive, which defers close(): end the transaction now
+            conn.rollback()
         raise
     finally:
         if conn:
             conn.close()
-            logging.debug("Database connection closed.")
+            log.debug("Database connection closed.")
 
 def init_db(force_recreate=False):
     """Initializes the database using the schema.sql file."""
     schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
     if force_recreate and os.path.exists(DATABASE_PATH):
-        logging.warning(f"Force recreate: Removing existing database at {DATABASE_PATH}")
+        log.warning(f"Force recreate: Removing existing database at {DATABASE_PATH}")
         try:
             os.remove(DATABASE_PATH)
         except OSError as e:
-            logging.error(f"Error removing existing database: {e}")
+            log.error(f"Error removing existing database: {e}")
             # Decide if you want to proceed or stop
             return 
 
     if not os.path.exists(DATABASE_PATH):
-        logging.info(f"Database not found at {DATABASE_PATH}. Initializing...")
+        log.info(f"Database not found at {DATABASE_PATH}. Initializing...")
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -61,19 +161,78 @@ def init_db(force_recreate=False):
                     sql_script = f.read()
                 cursor.executescript(sql_script)
                 conn.commit()
-                logging.info("Database initialized successfully from schema.sql.")
+                log.info("Database initialized successfully from schema.sql.")
         except sqlite3.Error as e:
-            logging.error(f"Failed to initialize database: {e}")
+            log.error(f"Failed to initialize database: {e}")
             if os.path.exists(DATABASE_PATH): # Clean up partial file
                 try:
                     os.remove(DATABASE_PATH)
                 except OSError: pass
             raise
         except IOError as e:
-             logging.error(f"Failed to read schema file {schema_path}: {e}")
+             log.error(f"Failed to read schema file {schema_path}: {e}")
              raise
     else:
-         logging.info(f"Database already exists at {DATABASE_PATH}.")
+         log.info(f"Database already exists at {DATABASE_PATH}.")
+
+    with get_db_connection() as conn:
+        _migrate_schema(conn)
+
+def _migrate_schema(conn: sqlite3.Connection):
+    """Brings an existing database up to the current schema (idempotent)."""
+    cursor = conn.cursor()
+    table_columns: Dict[str, set] = {}
+    for table, column, definition in SCHEMA_COLUMN_MIGRATIONS:
+        if table not in table_columns:
+            table_columns[table] = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if column not in table_columns[table]:
+            log.info(f"Migrating schema: adding column {table}.{column}")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            table_columns[table].add(column)
+    for statement in SCHEMA_MIGRATION_STATEMENTS:
+        cursor.execute(statement)
+
+    # Stamp embeddings written before model/hash tracking so they stay usable instead of being re-embedded
+    legacy_rows = cursor.execute(
+        "SELECT id, title, content, embedding FROM knowledge_base WHERE embedding IS NOT NULL AND embedding_model IS NULL"
+    ).fetchall()
+    if legacy_rows:
+        stamped = []
+        for row in legacy_rows:
+            embedding = deserialize_embedding(row['embedding'])
+            if embedding:
+                stamped.append((kb_content_hash(row['title'], row['content']), LEGACY_EMBEDDING_MODEL, len(embedding), row['id']))
+        cursor.executemany("UPDATE knowledge_base SET content_hash = ?, embedding_model = ?, embedding_dim = ? WHERE id = ?", stamped)
+        log.info(f"Migrating schema: stamped {len(stamped)} legacy KB embeddings as model '{LEGACY_EMBEDDING_MODEL}'")
+
+    # Tickets written before the ticket_stats triggers existed
+    if cursor.execute("SELECT 1 FROM tickets").fetchone() and not cursor.execute("SELECT 1 FROM ticket_stats").fetchone():
+        _rebuild_ticket_stats(cursor)
+        log.info("Migrating schema: built ticket_stats from existing tickets")
+    conn.commit()
+
+def _rebuild_ticket_stats(cursor: sqlite3.Cursor, with_archive: bool = False) -> None:
+    # The rows the triggers would have added for every existing ticket (incl. archived ones, when attached)
+    cursor.execute("DELETE FROM ticket_stats")
+    source = "FROM tickets t"
+    if with_archive:
+        columns = "created_at, resolved_at, " + ", ".join(TICKET_STATS_DIMENSIONS.values())
+        source = f"FROM (SELECT {columns} FROM main.tickets UNION ALL SELECT {columns} FROM archive.tickets) t"
+    cursor.execute(_stats_upsert(f"{_dimension_rows('t', 1, source=source)} UNION ALL {_resolved_rows('t', 1, source=source)}"))
+
+def rebuild_ticket_stats() -> bool:
+    """Recomputes ticket_stats from the tickets and archived tickets (repair tool; the triggers keep it current)."""
+    try:
+        with get_db_connection() as conn:
+            with_archive = os.path.exists(archive_database_path())
+            if with_archive:
+                _attach_archive(conn)
+            _rebuild_ticket_stats(conn.cursor(), with_archive)
+            conn.commit()
+            return True
+    except sqlite3.Error as e:
+        log.error(f"Database error rebuilding ticket_stats: {e}")
+        return False
 
 
 def execute_query(query: str, params: tuple = ()) -> Optional[int]:
@@ -81,14 +240,14 @@ def execute_query(query: str, params: tuple = ()) -> Optional[int]:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            logging.debug(f"Executing query: {query} with params: {params}")
+            log.debug("Executing query: %s with params: %s", query, params)
             cursor.execute(query, params)
             conn.commit()
             last_id = cursor.lastrowid
-            # logging.debug(f"Query executed successfully. Last row ID: {last_id}, Rows affected: {cursor.rowcount}")
+            # log.debug("Query executed successfully. Last row ID: %s, Rows affected: %s", last_id, cursor.rowcount)
             return last_id
     except sqlite3.Error as e:
-        logging.error(f"Database query error executing '{query}' with params {params}: {e}")
+        log.error(f"Database query error executing '{query}' with params {params}: {e}")
         return None # Indicate failure
 
 def fetch_one(query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
@@ -96,12 +255,12 @@ def fetch_one(query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            # logging.debug(f"Fetching one: {query} with params: {params}")
+            # log.debug("Fetching one: %s with params: %s", query, params)
             cursor.execute(query, params)
             row = cursor.fetchone()
             return dict(row) if row else None
     except sqlite3.Error as e:
-        logging.error(f"Database query error fetching one '{query}' with params {params}: {e}")
+        log.error(f"Database query error fetching one '{query}' with params {params}: {e}")
         return None
 
 def fetch_all(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
@@ -109,23 +268,110 @@ def fetch_all(query: str, params: tuple = ()) -> List[Dict[str, Any]]:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            # logging.debug(f"Fetching all: {query} with params: {params}")
+            # log.debug("Fetching all: %s with params: %s", query, params)
             cursor.execute(query, params)
             rows = cursor.fetchall()
-            # logging.debug(f"Fetched {len(rows)} rows.")
+            # log.debug("Fetched %d rows.", len(rows))
             return [dict(row) for row in rows]
     except sqlite3.Error as e:
-        logging.error(f"Database query error fetching all '{query}' with params {params}: {e}")
+        log.error(f"Database query error fetching all '{query}' with params {params}: {e}")
         return []
 
+# --- Change log (cross-process invalidation) ---
+# Ticket and KB writes made through this module add a change_log row in the same transaction, tagged with the
+# writing process. Other processes (server workers, scripts) poll it via utils/coordination.py.
+_HOSTNAME = socket.gethostname()
+
+def change_origin() -> str:
+    """Identifies this process in change_log.origin (computed per call: forked/spawned workers get their own)."""
+    return f"{_HOSTNAME}:{os.getpid()}"
+
+def _log_change(cursor: sqlite3.Cursor, topic: str, entity_id: Optional[int] = None, kind: Optional[str] = None) -> None:
+    cursor.execute("INSERT INTO change_log (topic, entity_id, kind, origin) VALUES (?, ?, ?, ?)",
+                   (topic, entity_id, kind, change_origin()))
+
+def _execute_logged(query: str, params: tuple, topic: str, entity_id: Optional[int] = None, kind: Optional[str] = None) -> Optional[int]:
+    """
+    execute_query plus its change_log row, committed together. entity_id defaults to the inserted row id.
+    Returns None, logging nothing, when the statement matched no row (e.g. the ticket was archived meanwhile).
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            if cursor.rowcount == 0:
+                conn.rollback()
+                log.debug("No row matched '%s' with params %s; nothing logged.", query, params)
+                return None
+            last_id = cursor.lastrowid
+            _log_change(cursor, topic, entity_id if entity_id is not None else last_id, kind)
+            conn.commit()
+            return last_id
+    except sqlite3.Error as e:
+        log.error(f"Database query error executing '{query}' with params {params}: {e}")
+        return None
+
+@_observed
+def get_change_seq(topic: Optional[str] = None) -> int:
+    """Sequence number of the latest change (to `topic`, if given); 0 when there is none."""
+    if topic is None:
+        row = fetch_one("SELECT MAX(seq) AS seq FROM change_log")
+    else:
+        row = fetch_one("SELECT seq FROM change_log WHERE topic = ? ORDER BY seq DESC LIMIT 1", (topic,))
+    return (row or {}).get('seq') or 0
+
+@_observed
+def get_changes_since(after_seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+    return fetch_all("SELECT seq, topic, entity_id, kind, origin FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?", (after_seq, limit))
+
+@_observed
+def prune_change_log(keep_rows: int) -> bool:
+    """Deletes all but the newest keep_rows changes, always keeping the latest change of each topic (get_change_seq)."""
+    result = execute_query(
+        "DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ? "
+        "AND seq NOT IN (SELECT MAX(seq) FROM change_log GROUP BY topic)",
+        (keep_rows,)
+    )
+    return result is not None
+
+# --- Change versions ---
+# Bumped after every successful ticket write, by this process or (via the change feed) another one. Read caches stamp
+# what they render with the version read *before* querying, so a write landing mid-render only causes a re-render.
+_change_sequence = itertools.count(1)
+_ticket_versions: Dict[int, int] = {}
+_tickets_list_version = 0
+
+def ticket_version(ticket_id: int) -> int:
+    """Version of one ticket row; 0 until it is first written."""
+    return _ticket_versions.get(ticket_id, 0)
+
+def tickets_list_version() -> int:
+    """Version of the ticket list as a whole: changes whenever any ticket is added or updated."""
+    return _tickets_list_version
+
+def note_ticket_changed(ticket_id: Optional[int]) -> None:
+    """Starts new ticket/list versions; called after writes here and by the change feed for other processes' writes."""
+    global _tickets_list_version
+    version = next(_change_sequence)
+    if ticket_id is not None:
+        _ticket_versions[ticket_id] = version
+    _tickets_list_version = version
+
 # --- Specific CRUD Operations ---
 
 # == Tickets (Keep existing ticket functions) ==
+@_observed
 def add_ticket(customer_name: str, subject: str, body: str, customer_email: Optional[str] = None, priority: str = 'Medium') -> Optional[int]:
     query = "INSERT INTO tickets (customer_name, customer_email, subject, body, priority, status) VALUES (?, ?, ?, ?, ?, 'Open')"
-    return execute_query(query, (customer_name, customer_email, subject, body, priority))
+    ticket_id = _execute_logged(query, (customer_name, customer_email, subject, body, priority), "ticket", kind="created")
+    if ticket_id:
+        note_ticket_changed(ticket_id)
+    return ticket_id
+@_observed
 def get_ticket(ticket_id: int) -> Optional[Dict[str, Any]]:
-    return fetch_one("SELECT * FROM tickets WHERE id = ?", (ticket_id,))
+    """The ticket, from the archive if it was archived (those rows carry archived_at)."""
+    return fetch_one("SELECT * FROM tickets WHERE id = ?", (ticket_id,)) or get_archived_ticket(ticket_id)
+@_observed
 def get_all_tickets(status: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
     base_query = "SELECT * FROM tickets"
     params = []
@@ -135,80 +381,439 @@ def get_all_tickets(status: Optional[str] = None, limit: int = 100, offset: int
         params.append(status)
     if conditions:
         base_query += " WHERE " + " AND ".join(conditions)
-    base_query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+    base_query += " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?" # id: stable pages within one second
     params.extend([limit, offset])
     return fetch_all(base_query, tuple(params))
+@_observed
+def get_ticket_stats(since_hour: str) -> List[Dict[str, Any]]:
+    """
+    ticket_stats rows of the all-time bucket plus the hourly buckets from since_hour ('YYYY-MM-DD HH:00:00') on:
+    two primary-key range reads whose size depends on the number of statuses/teams/hours, not of tickets.
+    """
+    return fetch_all(
+        "SELECT * FROM ticket_stats WHERE bucket = ? AND ticket_count != 0 "
+        "UNION ALL SELECT * FROM ticket_stats WHERE bucket >= ? AND bucket < ? AND ticket_count != 0",
+        (TICKET_STATS_ALL, since_hour, TICKET_STATS_ALL)
+    )
+@_observed
 def update_ticket_status(ticket_id: int, status: str) -> bool:
     resolved_at_update = ", resolved_at = CURRENT_TIMESTAMP" if status in ['Resolved', 'Closed'] else ""
     query = f"UPDATE tickets SET status = ?, updated_at = CURRENT_TIMESTAMP{resolved_at_update} WHERE id = ?"
-    result = execute_query(query, (status, ticket_id))
+    result = _execute_logged(query, (status, ticket_id), "ticket", ticket_id, "updated")
+    if result is not None:
+        note_ticket_changed(ticket_id)
     return result is not None
+@_observed
 def update_ticket_assignment(ticket_id: int, agent_id: Optional[int], team: Optional[str]) -> bool:
     query = "UPDATE tickets SET assigned_agent_id = ?, assigned_team = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-    result = execute_query(query, (agent_id, team, ticket_id))
+    result = _execute_logged(query, (agent_id, team, ticket_id), "ticket", ticket_id, "updated")
+    if result is not None:
+        note_ticket_changed(ticket_id)
     return result is not None
+@_observed
 def update_ticket_summary(ticket_id: int, summary: str, actions: List[str]) -> bool:
     try:
         actions_list = actions if isinstance(actions, list) else []
         actions_json = json.dumps(actions_list)
         query = "UPDATE tickets SET summary = ?, extracted_actions = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        result = execute_query(query, (summary, actions_json, ticket_id))
+        result = _execute_logged(query, (summary, actions_json, ticket_id), "ticket", ticket_id, "enriched")
+        if result is not None:
+            note_ticket_changed(ticket_id)
         return result is not None
     except TypeError as e:
-         logging.error(f"Failed to serialize actions to JSON for ticket {ticket_id}: {e}")
+         log.error(f"Failed to serialize actions to JSON for ticket {ticket_id}: {e}")
          return False
+@_observed
 def update_ticket_prediction(ticket_id: int, predicted_time: Optional[int]) -> bool:
     query = "UPDATE tickets SET predicted_resolution_time = ? WHERE id = ?"
-    result = execute_query(query, (predicted_time, ticket_id))
+    result = _execute_logged(query, (predicted_time, ticket_id), "ticket", ticket_id, "enriched")
+    if result is not None:
+        note_ticket_changed(ticket_id)
     return result is not None
 
 
+# == Ticket archive ==
+# Resolved/Closed tickets move out of the hot tickets table (and its indexes) into archive.tickets, a table of
+# the same columns plus archived_at in a separate database file. List queries only see hot tickets;
+# get_ticket falls back to the archive, and ticket_stats keeps counting archived tickets.
+def archive_database_path() -> str:
+    return ARCHIVE_DATABASE_PATH or os.path.splitext(DATABASE_PATH)[0] + "_archive.db"
+
+def _attach_archive(conn: sqlite3.Connection) -> None:
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_database_path(),))
+
+def _ensure_archive_schema(cursor: sqlite3.Cursor) -> List[str]:
+    """Creates archive.tickets, or adds columns tickets gained since; returns the tickets columns."""
+    columns = [(row['name'], row['type']) for row in cursor.execute("PRAGMA main.table_info(tickets)")]
+    definitions = ", ".join(f"{name} {type_}{' PRIMARY KEY' if name == 'id' else ''}" for name, type_ in columns)
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS archive.tickets ({definitions}, archived_at DATETIME)")
+    archived = {row['name'] for row in cursor.execute("PRAGMA archive.table_info(tickets)")}
+    for name, type_ in columns:
+        if name not in archived:
+            cursor.execute(f"ALTER TABLE archive.tickets ADD COLUMN {name} {type_}")
+    return [name for name, _ in columns]
+
+@_observed
+def archive_tickets(older_than_days: float, batch_size: int = 500) -> Optional[int]:
+    """
+    Moves Resolved/Closed tickets resolved (or last updated, if resolved_at is unset) more than older_than_days
+    ago to the archive, batch_size tickets per transaction. Returns the number moved, None on a database error.
+    A ticket is copied before it is deleted, so an interrupted run can at worst leave a copy in both (the next
+    run replaces it).
+    """
+    moved = 0
+    try:
+        with get_db_connection() as conn:
+            _attach_archive(conn)
+            cursor = conn.cursor()
+            archive_columns = _ensure_archive_schema(cursor)
+            columns = ", ".join(archive_columns)
+            # updated_at moves to the archival time, so watermark readers (utils/columnar_export.py) see the move
+            values = ", ".join("CURRENT_TIMESTAMP" if c == "updated_at" else c for c in archive_columns)
+            conn.commit()
+            while True:
+                # ticket_archive_batch also tells the ticket_stats delete trigger which deletes to ignore
+                cursor.execute("DELETE FROM ticket_archive_batch")
+                cursor.execute(
+                    "INSERT INTO ticket_archive_batch (id) SELECT id FROM tickets WHERE status IN ('Resolved', 'Closed') "
+                    "AND COALESCE(resolved_at, updated_at) < datetime('now', ?) ORDER BY id LIMIT ?",
+                    (f"-{float(older_than_days)} days", batch_size)
+                )
+                count = cursor.rowcount
+                if count <= 0:
+                    conn.rollback()
+                    break
+                cursor.execute(f"INSERT OR REPLACE INTO archive.tickets ({columns}, archived_at) "
+                               f"SELECT {values}, CURRENT_TIMESTAMP FROM main.tickets WHERE id IN (SELECT id FROM ticket_archive_batch)")
+                cursor.execute("DELETE FROM main.tickets WHERE id IN (SELECT id FROM ticket_archive_batch)")
+                cursor.execute("DELETE FROM ticket_archive_batch")
+                _log_change(cursor, "ticket", None, "archived")
+                conn.commit()
+                moved += count
+                if count < batch_size:
+                    break
+    except sqlite3.Error as e:
+        log.error(f"Database error archiving tickets (after moving {moved}): {e}")
+        return None
+    finally:
+        if moved:
+            note_ticket_changed(None)
+    if moved:
+        log.info(f"Archived {moved} tickets to {archive_database_path()}.")
+    return moved
+
+@_observed
+def get_archived_ticket(ticket_id: int) -> Optional[Dict[str, Any]]:
+    path = archive_database_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+            return dict(row) if row else None
+    except sqlite3.Error as e: # e.g. the file exists but archive_tickets has not created the table yet
+        log.error(f"Database error reading archived ticket {ticket_id}: {e}")
+        return None
+
+@_observed
+def count_archived_tickets() -> int:
+    path = archive_database_path()
+    if not os.path.exists(path):
+        return 0
+    try:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    except sqlite3.Error as e:
+        log.error(f"Database error counting archived tickets: {e}")
+        return 0
+
+
 # == Knowledge Base (Keep existing KB functions) ==
+@_observed
 def add_kb_entry(title: str, content: str, keywords: Optional[str] = None, embedding_bytes: Optional[bytes] = None, source_ticket_id: Optional[int] = None) -> Optional[int]:
     query = "INSERT INTO knowledge_base (title, content, keywords, embedding, source_ticket_id) VALUES (?, ?, ?, ?, ?)"
-    return execute_query(query, (title, content, keywords, embedding_bytes, source_ticket_id))
-def update_kb_embedding(kb_id: int, embedding: List[float]) -> bool:
+    return _execute_logged(query, (title, content, keywords, embedding_bytes, source_ticket_id), "kb")
+@_observed
+def upsert_kb_entries(entries: List[Dict[str, Any]]) -> Optional[int]:
+    """
+    Inserts or updates KB rows keyed on source_key in one transaction (a single executemany).
+    Rows whose title/content/keywords are unchanged are left untouched.
+    Returns the number of rows inserted or changed, or None on failure.
+    """
+    if not entries:
+        return 0
+    query = (
+        "INSERT INTO knowledge_base (source_key, title, content, keywords, source_ticket_id) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(source_key) DO UPDATE SET title = excluded.title, content = excluded.content, keywords = excluded.keywords "
+        "WHERE knowledge_base.title IS NOT excluded.title OR knowledge_base.content IS NOT excluded.content "
+        "OR knowledge_base.keywords IS NOT excluded.keywords"
+    )
+    rows = [(e['source_key'], e['title'], e['content'], e.get('keywords'), e.get('source_ticket_id')) for e in entries]
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(query, rows)
+            changed = cursor.rowcount
+            if changed:
+                _log_change(cursor, "kb")
+            conn.commit()
+            return changed
+    except sqlite3.Error as e:
+        log.error(f"Database error upserting {len(rows)} KB entries: {e}")
+        return None
+@_observed
+def get_kb_entries_by_source_keys(source_keys: List[str]) -> List[Dict[str, Any]]:
+    """Rows for the given natural keys, with the fields needed to decide whether they need (re-)embedding."""
+    results: List[Dict[str, Any]] = []
+    for i in range(0, len(source_keys), 500): # Stay well below SQLite's bound-parameter limit
+        chunk = source_keys[i:i + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        results.extend(fetch_all(
+            f"SELECT id, title, content, embedding IS NOT NULL AS has_embedding, content_hash, embedding_model, canonical_id "
+            f"FROM knowledge_base WHERE source_key IN ({placeholders})",
+            tuple(chunk)
+        ))
+    return results
+def kb_content_hash(title: Optional[str], content: Optional[str]) -> str:
+    """Fingerprint of the KB text an embedding is computed from; a mismatch means the vector is stale."""
+    return hashlib.sha256(f"{title or ''}\n{content or ''}".encode('utf-8')).hexdigest()
+@_observed
+def update_kb_embedding(kb_id: int, embedding: List[float], model: Optional[str] = None, content_hash: Optional[str] = None) -> bool:
     embedding_bytes = serialize_embedding(embedding)
     if embedding_bytes is None and embedding is not None:
-        logging.error(f"Failed to serialize embedding for KB ID {kb_id}. Not updating.")
+        log.error(f"Failed to serialize embedding for KB ID {kb_id}. Not updating.")
         return False
-    query = "UPDATE knowledge_base SET embedding = ? WHERE id = ?"
-    result = execute_query(query, (embedding_bytes, kb_id))
+    query = "UPDATE knowledge_base SET embedding = ?, embedding_model = ?, embedding_dim = ?, content_hash = ? WHERE id = ?"
+    result = _execute_logged(query, (embedding_bytes, model, len(embedding) if embedding is not None else None, content_hash, kb_id), "kb", kb_id)
     return result is not None
+@_observed
+def update_kb_embeddings_batch(updates: List[Tuple[int, List[float], str]], model: str) -> int:
+    """
+    Stores several (kb_id, embedding, content_hash) results from one model in a single transaction.
+    Returns the number of rows written.
+    """
+    rows = []
+    for kb_id, embedding, content_hash in updates:
+        embedding_bytes = serialize_embedding(embedding)
+        if embedding_bytes is None:
+            log.error(f"Failed to serialize embedding for KB ID {kb_id}. Skipping it in batch.")
+            continue
+        rows.append((embedding_bytes, content_hash, model, len(embedding), kb_id))
+    if not rows:
+        return 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE knowledge_base SET embedding = ?, content_hash = ?, embedding_model = ?, embedding_dim = ? WHERE id = ?",
+                rows
+            )
+            _log_change(cursor, "kb")
+            conn.commit()
+            return len(rows)
+    except sqlite3.Error as e:
+        log.error(f"Database error writing embedding batch of {len(rows)} rows: {e}")
+        return 0
+@_observed
+def get_kb_entries_page(after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+    """Keyset-paginated read of canonical KB rows with id > after_id, in id order. Used as a resumable cursor."""
+    query = ("SELECT id, title, content, embedding IS NOT NULL AS has_embedding, content_hash, embedding_model "
+             "FROM knowledge_base WHERE id > ? AND canonical_id IS NULL ORDER BY id LIMIT ?")
+    return fetch_all(query, (after_id, limit))
+@_observed
+def get_kb_embeddings_for_model(model: str) -> List[Dict[str, Any]]:
+    """
+    Canonical KB rows whose stored embedding was produced by `model` (vectors from other models are never
+    mixed in; rows merged into a near-duplicate are represented by their canonical entry).
+    """
+    query = ("SELECT id, title, content, embedding, embedding_dim, success_rate, usage_count, helpful_count FROM knowledge_base "
+             "WHERE embedding IS NOT NULL AND embedding_model = ? AND canonical_id IS NULL ORDER BY id")
+    return fetch_all(query, (model,))
+@_observed
+def get_kb_embedding_coverage(model: str) -> Dict[str, int]:
+    """Counts of canonical KB rows in total and with an embedding from `model`."""
+    row = fetch_one(
+        "SELECT COUNT(*) AS total, COALESCE(SUM(embedding IS NOT NULL AND embedding_model = ?), 0) AS embedded "
+        "FROM knowledge_base WHERE canonical_id IS NULL",
+        (model,)
+    )
+    return row or {'total': 0, 'embedded': 0}
+@_observed
 def find_kb_entries_by_ids(ids: List[int]) -> List[Dict[str, Any]]:
     if not ids: return []
     placeholders = ','.join('?' for _ in ids)
     query = f"SELECT id, title, content, embedding, success_rate, usage_count FROM knowledge_base WHERE id IN ({placeholders})"
     return fetch_all(query, tuple(ids))
-def get_all_kb_entries_with_embeddings(limit: int = 1000) -> List[Dict[str, Any]]:
-    query = "SELECT id, title, content, embedding, success_rate, usage_count FROM knowledge_base WHERE embedding IS NOT NULL LIMIT ?"
-    return fetch_all(query, (limit,))
+@_observed
+def get_all_kb_entries_with_embeddings(limit: int = 1000, model: Optional[str] = None) -> List[Dict[str, Any]]:
+    query = "SELECT id, title, content, embedding, success_rate, usage_count FROM knowledge_base WHERE embedding IS NOT NULL AND canonical_id IS NULL"
+    params: list = []
+    if model:
+        query += " AND embedding_model = ?"
+        params.append(model)
+    query += " LIMIT ?"
+    params.append(limit)
+    return fetch_all(query, tuple(params))
+@_observed
 def get_kb_entry(kb_id: int) -> Optional[Dict[str, Any]]:
      return fetch_one("SELECT id, title, content, embedding, success_rate, usage_count FROM knowledge_base WHERE id = ?", (kb_id,))
 
 
+# == KB near-duplicate index (MinHash signatures + LSH buckets, see backend/utils/kb_dedup.py) ==
+# `embedding` is only returned when it comes from the requested model (NULL otherwise)
+_KB_DEDUP_SELECT = (
+    "SELECT kb.id, kb.title, kb.content, kb.content_hash AS embedding_content_hash, m.content_hash AS minhash_content_hash, "
+    "CASE WHEN kb.embedding_model = ? THEN kb.embedding END AS embedding "
+    "FROM knowledge_base kb LEFT JOIN kb_minhash m ON m.kb_id = kb.id WHERE kb.canonical_id IS NULL"
+)
+@_observed
+def get_kb_dedup_rows_by_source_keys(source_keys: List[str], embedding_model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Canonical rows for the given natural keys, in id order, with their current MinHash content hash (if signed)."""
+    results: List[Dict[str, Any]] = []
+    for i in range(0, len(source_keys), 500):
+        chunk = source_keys[i:i + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        results.extend(fetch_all(f"{_KB_DEDUP_SELECT} AND kb.source_key IN ({placeholders})", (embedding_model, *chunk)))
+    return sorted(results, key=lambda row: row['id'])
+@_observed
+def get_kb_dedup_rows_page(after_id: int = 0, limit: int = 500, embedding_model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Keyset-paginated canonical rows with id > after_id, in id order, for a full deduplication pass."""
+    return fetch_all(f"{_KB_DEDUP_SELECT} AND kb.id > ? ORDER BY kb.id LIMIT ?", (embedding_model, after_id, limit))
+@_observed
+def get_kb_lsh_candidates(buckets: List[int], embedding_model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Indexed entries sharing any of the given LSH buckets: one row per (bucket, kb_id) with the entry's signature.
+    `embedding` is only returned when it is from `embedding_model` and was computed from the signed text.
+    """
+    results: List[Dict[str, Any]] = []
+    for i in range(0, len(buckets), 500):
+        chunk = buckets[i:i + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        results.extend(fetch_all(
+            f"SELECT b.bucket, b.kb_id, m.signature, "
+            f"CASE WHEN kb.embedding_model = ? AND kb.content_hash = m.content_hash THEN kb.embedding END AS embedding "
+            f"FROM kb_lsh_buckets b JOIN kb_minhash m ON m.kb_id = b.kb_id JOIN knowledge_base kb ON kb.id = b.kb_id "
+            f"WHERE b.bucket IN ({placeholders})",
+            (embedding_model, *chunk)
+        ))
+    return results
+@_observed
+def clear_kb_dedup_index() -> bool:
+    """Drops all stored signatures and buckets (merges already made are kept)."""
+    try:
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM kb_lsh_buckets")
+            conn.execute("DELETE FROM kb_minhash")
+            conn.commit()
+            return True
+    except sqlite3.Error as e:
+        log.error(f"Database error clearing KB dedup index: {e}")
+        return False
+@_observed
+def apply_kb_dedup(indexed: List[Tuple[int, str, bytes, List[int]]], merges: List[Tuple[int, int]]) -> bool:
+    """
+    Applies one deduplication batch in a single transaction:
+    - indexed: (kb_id, content_hash, signature, buckets) for canonical entries, replacing any older signature;
+    - merges: (duplicate_id, canonical_id), in order. The duplicate (and anything already merged into it) is
+      pointed at the canonical entry, whose usage/helpful counts are summed and success_rate averaged, weighting
+      each side by its usage_count (at least one use per source row it represents).
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            for kb_id, content_hash, signature, buckets in indexed:
+                cursor.execute("DELETE FROM kb_lsh_buckets WHERE kb_id = ?", (kb_id,))
+                cursor.execute("INSERT OR REPLACE INTO kb_minhash (kb_id, content_hash, signature) VALUES (?, ?, ?)",
+                               (kb_id, content_hash, signature))
+                cursor.executemany("INSERT OR IGNORE INTO kb_lsh_buckets (bucket, kb_id) VALUES (?, ?)",
+                                   [(bucket, kb_id) for bucket in buckets])
+            for duplicate_id, canonical_id in merges:
+                rows = {row['id']: row for row in cursor.execute(
+                    "SELECT id, usage_count, helpful_count, success_rate, duplicate_count FROM knowledge_base WHERE id IN (?, ?)",
+                    (duplicate_id, canonical_id)
+                )}
+                if duplicate_id not in rows or canonical_id not in rows:
+                    continue
+                dup, canonical = rows[duplicate_id], rows[canonical_id]
+                dup_weight = max(dup['usage_count'] or 0, (dup['duplicate_count'] or 0) + 1)
+                canonical_weight = max(canonical['usage_count'] or 0, (canonical['duplicate_count'] or 0) + 1)
+                dup_rate = dup['success_rate'] if dup['success_rate'] is not None else 0.5
+                canonical_rate = canonical['success_rate'] if canonical['success_rate'] is not None else 0.5
+                cursor.execute(
+                    "UPDATE knowledge_base SET usage_count = ?, helpful_count = ?, success_rate = ?, duplicate_count = ? WHERE id = ?",
+                    (
+                        (canonical['usage_count'] or 0) + (dup['usage_count'] or 0),
+                        (canonical['helpful_count'] or 0) + (dup['helpful_count'] or 0),
+                        (canonical_rate * canonical_weight + dup_rate * dup_weight) / (canonical_weight + dup_weight),
+                        (canonical['duplicate_count'] or 0) + (dup['duplicate_count'] or 0) + 1,
+                        canonical_id,
+                    )
+                )
+                cursor.execute("UPDATE knowledge_base SET canonical_id = ? WHERE id = ? OR canonical_id = ?",
+                               (canonical_id, duplicate_id, duplicate_id))
+                cursor.execute("DELETE FROM kb_lsh_buckets WHERE kb_id = ?", (duplicate_id,))
+                cursor.execute("DELETE FROM kb_minhash WHERE kb_id = ?", (duplicate_id,))
+            if merges: # Signatures alone don't change what recommendations see
+                _log_change(cursor, "kb")
+            conn.commit()
+            return True
+    except sqlite3.Error as e:
+        log.error(f"Database error applying KB dedup batch ({len(indexed)} indexed, {len(merges)} merges): {e}")
+        return False
+
+@_observed
+def apply_kb_feedback_batch(deltas: List[Tuple[int, int, int]], prior_helpful: float, prior_unhelpful: float) -> bool:
+    """
+    Adds buffered feedback to KB rows in one transaction: (kb_id, uses, helpful uses) per entry.
+    success_rate becomes the Beta-smoothed (helpful_count + prior_helpful) / (usage_count + prior_helpful + prior_unhelpful).
+    Feedback on an entry merged into a near-duplicate is credited to its canonical entry.
+    """
+    if not deltas:
+        return True
+    query = (
+        "UPDATE knowledge_base SET usage_count = COALESCE(usage_count, 0) + ?, helpful_count = COALESCE(helpful_count, 0) + ?, "
+        "success_rate = (COALESCE(helpful_count, 0) + ? + ?) / (COALESCE(usage_count, 0) + ? + ? + ?) "
+        "WHERE id = COALESCE((SELECT canonical_id FROM knowledge_base WHERE id = ?), ?)"
+    )
+    rows = [(uses, helpful, helpful, prior_helpful, uses, prior_helpful, prior_unhelpful, kb_id, kb_id) for kb_id, uses, helpful in deltas]
+    try:
+        with get_db_connection() as conn:
+            conn.executemany(query, rows)
+            conn.commit()
+            return True
+    except sqlite3.Error as e:
+        log.error(f"Database error applying feedback for {len(rows)} KB entries: {e}")
+        return False
+
+
 # == Agents (Keep existing Agent functions) ==
+@_observed
 def add_agent(name: str, email: str, skills: Optional[str] = None) -> Optional[int]:
     query = "INSERT INTO agents (name, email, skills) VALUES (?, ?, ?)"
     try:
         return execute_query(query, (name, email, skills))
     except sqlite3.IntegrityError as e:
-        if "UNIQUE constraint failed: agents.email" in str(e): logging.error(f"Email '{email}' already exists.")
-        else: logging.error(f"DB integrity error adding agent: {e}")
+        if "UNIQUE constraint failed: agents.email" in str(e): log.error(f"Email '{email}' already exists.")
+        else: log.error(f"DB integrity error adding agent: {e}")
         return None
+@_observed
 def get_agent(agent_id: int) -> Optional[Dict[str, Any]]:
     return fetch_one("SELECT * FROM agents WHERE id = ?", (agent_id,))
+@_observed
 def get_available_agents() -> List[Dict[str, Any]]:
     return fetch_all("SELECT id, name, email, skills, current_load, is_available FROM agents WHERE is_available = 1 ORDER BY current_load ASC")
 
 
 # == Users (Existing + Added get_user_by_email) ==
+@_observed
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """Retrieves a user by their username."""
     query = "SELECT id, username, hashed_password, is_active, full_name, email FROM users WHERE username = ?"
     return fetch_one(query, (username,))
 
 # <<<--- ADDED THIS FUNCTION ---<<<
+@_observed
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Retrieves a user by their email address."""
     # Only return minimal info needed to check existence
@@ -216,6 +821,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     return fetch_one(query, (email,))
 # <<<---------------------------<<<
 
+@_observed
 def add_user(username: str, hashed_password: str, email: Optional[str] = None, full_name: Optional[str] = None, is_active: bool = True) -> Optional[int]:
     """Adds a new user to the database. Assumes password is ALREADY hashed."""
     query = "INSERT INTO users (username, hashed_password, email, full_name, is_active) VALUES (?, ?, ?, ?, ?)"
@@ -224,11 +830,11 @@ def add_user(username: str, hashed_password: str, email: Optional[str] = None, f
         return execute_query(query, (username, hashed_password, email, full_name, active_flag))
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed: users.username" in str(e):
-             logging.error(f"DB Error: Username '{username}' already exists.")
+             log.error(f"DB Error: Username '{username}' already exists.")
         elif "UNIQUE constraint failed: users.email" in str(e) and email:
-             logging.error(f"DB Error: Email '{email}' already exists.")
+             log.error(f"DB Error: Email '{email}' already exists.")
         else:
-             logging.error(f"Database integrity error adding user: {e}")
+             log.error(f"Database integrity error adding user: {e}")
         return None
 
 
@@ -34,7 +34,61 @@ CREATE TABLE IF NOT EXISTS knowledge_base (
     source_ticket_id INTEGER,           -- Optional: Link to ticket that generated this entry
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     success_rate REAL DEFAULT 0.5,      -- How often this resolution worked (0.0 to 1.0)
-    usage_count INTEGER DEFAULT 0       -- How many times this has been used/recommended
+    usage_count INTEGER DEFAULT 0,      -- How many times this has been used/recommended
+    helpful_count INTEGER DEFAULT 0,    -- How many of those uses were reported helpful (feedback)
+    content_hash TEXT,                  -- SHA-256 of the title/content the stored embedding was computed from
+    embedding_model TEXT,               -- Ollama model that produced the stored embedding
+    embedding_dim INTEGER,              -- Length of the stored embedding vector
+    source_key TEXT,                    -- Natural key of the imported record (e.g. 'csv:TECH_021'); used for upserts
+    canonical_id INTEGER,               -- Set when this row was merged into a near-duplicate canonical entry
+    duplicate_count INTEGER DEFAULT 0,  -- Number of near-duplicate rows merged into this (canonical) entry
+    FOREIGN KEY (canonical_id) REFERENCES knowledge_base(id)
+);
+
+-- MinHash signatures of canonical KB entries, used for near-duplicate detection
+CREATE TABLE IF NOT EXISTS kb_minhash (
+    kb_id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,         -- kb_content_hash of the text the signature was computed from
+    signature BLOB NOT NULL,            -- uint32 MinHash values
+    FOREIGN KEY (kb_id) REFERENCES knowledge_base(id)
+);
+
+-- LSH band buckets of the signatures above; entries sharing a bucket are near-duplicate candidates
+CREATE TABLE IF NOT EXISTS kb_lsh_buckets (
+    bucket INTEGER NOT NULL,            -- 64-bit hash of (band number, band values)
+    kb_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, kb_id)
+) WITHOUT ROWID;
+
+-- Dashboard aggregates over tickets, kept current by triggers (installed by database_manager.init_db) so that
+-- statistics never scan the tickets table. Rows per bucket ('YYYY-MM-DD HH:00:00' or 'all') and dimension:
+--   status / team / priority: tickets created in the bucket hour, by their *current* value (team '' = unassigned);
+--   resolved (value ''): tickets resolved in the bucket hour, with the summed created -> resolved time.
+CREATE TABLE IF NOT EXISTS ticket_stats (
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    ticket_count INTEGER NOT NULL DEFAULT 0,
+    resolution_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, dimension, value)
+) WITHOUT ROWID;
+
+-- Ids of the tickets archive_tickets is moving in the current transaction (the ticket_stats delete trigger skips
+-- them: archived tickets keep counting). Empty outside that transaction.
+CREATE TABLE IF NOT EXISTS ticket_archive_batch (
+    id INTEGER PRIMARY KEY
+);
+
+-- Cross-process invalidation channel: ticket/KB writes made through database_manager append a row in the same
+-- transaction; every server worker polls for rows from other processes (utils/coordination.py) and drops or
+-- refreshes what it caches. Pruned to the most recent rows.
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,              -- 'ticket' or 'kb'
+    entity_id INTEGER,                -- Ticket/KB id, NULL for bulk changes
+    kind TEXT,                        -- created / updated / enriched (tickets)
+    origin TEXT NOT NULL,             -- 'host:pid' of the writing process
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Stores agent information (simplified)
@@ -71,6 +125,11 @@ END;
 CREATE INDEX IF NOT EXISTS idx_ticket_status ON tickets(status);
 CREATE INDEX IF NOT EXISTS idx_ticket_assigned_agent ON tickets(assigned_agent_id);
 CREATE INDEX IF NOT EXISTS idx_ticket_created_at ON tickets(created_at);
+CREATE INDEX IF NOT EXISTS idx_ticket_updated_at ON tickets(updated_at, id); -- Incremental exports (utils/columnar_export.py)
 CREATE INDEX IF NOT EXISTS idx_kb_keywords ON knowledge_base(keywords);
+CREATE INDEX IF NOT EXISTS idx_kb_embedding_model ON knowledge_base(embedding_model);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_kb_source_key ON knowledge_base(source_key);
+CREATE INDEX IF NOT EXISTS idx_kb_canonical_id ON knowledge_base(canonical_id);
+CREATE INDEX IF NOT EXISTS idx_kb_lsh_kb_id ON kb_lsh_buckets(kb_id);
 CREATE INDEX IF NOT EXISTS idx_agent_email ON agents(email);
 CREATE INDEX IF NOT EXISTS idx_user_username ON users(username);
\ No newline at end of file
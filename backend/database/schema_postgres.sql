@@ -0,0 +1,83 @@
+-- backend/database/schema_postgres.sql
+-- PostgreSQL schema for backend/database/postgres_storage.py (same tables/columns as schema.sql for what the
+-- Storage interface covers). Timestamps are UTC without time zone, like SQLite's CURRENT_TIMESTAMP.
+-- Requires the pgvector extension (https://github.com/pgvector/pgvector).
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS agents (
+    id BIGSERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    skills TEXT,
+    current_load INTEGER DEFAULT 0,
+    is_available BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    id BIGSERIAL PRIMARY KEY,
+    customer_name TEXT NOT NULL,
+    customer_email TEXT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'Open',
+    priority TEXT DEFAULT 'Medium',
+    assigned_agent_id BIGINT REFERENCES agents(id),
+    assigned_team TEXT,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    resolved_at TIMESTAMP,
+    summary TEXT,
+    extracted_actions TEXT,             -- JSON list, as in SQLite
+    predicted_resolution_time INTEGER,
+    resolution_details TEXT,
+    feedback_rating INTEGER,
+    feedback_comment TEXT
+);
+
+CREATE TABLE IF NOT EXISTS knowledge_base (
+    id BIGSERIAL PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    keywords TEXT,
+    embedding vector,                   -- Any dimension; embedding_dim says which (see the per-dimension index below)
+    source_ticket_id BIGINT,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    success_rate REAL DEFAULT 0.5,
+    usage_count INTEGER DEFAULT 0,
+    helpful_count INTEGER DEFAULT 0,
+    content_hash TEXT,
+    embedding_model TEXT,
+    embedding_dim INTEGER,
+    source_key TEXT UNIQUE,
+    canonical_id BIGINT REFERENCES knowledge_base(id),
+    duplicate_count INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id BIGSERIAL PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE,
+    full_name TEXT,
+    hashed_password TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE OR REPLACE FUNCTION touch_ticket_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now() AT TIME ZONE 'utc';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_ticket_timestamp ON tickets;
+CREATE TRIGGER update_ticket_timestamp BEFORE UPDATE ON tickets
+    FOR EACH ROW EXECUTE FUNCTION touch_ticket_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_ticket_status ON tickets(status);
+CREATE INDEX IF NOT EXISTS idx_ticket_assigned_agent ON tickets(assigned_agent_id);
+CREATE INDEX IF NOT EXISTS idx_ticket_created_at ON tickets(created_at);
+CREATE INDEX IF NOT EXISTS idx_kb_embedding_model ON knowledge_base(embedding_model);
+CREATE INDEX IF NOT EXISTS idx_kb_canonical_id ON knowledge_base(canonical_id);
+-- The HNSW index on embedding::vector(<KB_VECTOR_INDEX_DIM>) is created by PostgresStorage.init
@@ -0,0 +1,240 @@
+# backend/database/storage.py
+"""
+Storage interface for tickets, knowledge base, agents and users, so the system can run on a database that
+allows concurrent writers. Implementations:
+- SQLiteStorage (default): the functions in database_manager, run off the event loop;
+- PostgresStorage (backend/database/postgres_storage.py): asyncpg connection pool, pgvector KB search.
+
+Both return rows as plain dicts shaped like database_manager's (timestamps as 'YYYY-MM-DD HH:MM:SS' text,
+booleans as 0/1, extracted_actions as JSON text), except that KB embeddings are lists of floats. The shared
+conformance suite is backend/tests/test_storage.py.
+
+Select with STORAGE_BACKEND=sqlite|postgres (POSTGRES_DSN for the latter) and use get_storage(). The ticket
+endpoints (except /tickets/stats), login/registration/token checks, recommendations (KB search) and recommendation
+feedback go through it. Still SQLite-only: ticket stats, ticket archival, columnar export, KB ingestion and
+background re-embedding, and the transcript mining scripts.
+"""
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.database import database_manager as db
+from backend.utils.kb_index import get_kb_index, invalidate_kb_index
+from backend.utils.ollama_integration import deserialize_embedding
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+POSTGRES_DSN = os.getenv("POSTGRES_DSN", "")
+# --- End Configuration ---
+
+
+class Storage(ABC):
+    """CRUD used by the API. Write methods return the new id / True, or None / False on failure (logged)."""
+
+    async def init(self) -> None:
+        """Creates missing tables and opens connections; call once before use."""
+
+    async def close(self) -> None:
+        """Releases connections."""
+
+    # == Tickets ==
+    @abstractmethod
+    async def add_ticket(self, customer_name: str, subject: str, body: str, customer_email: Optional[str] = None,
+                         priority: str = 'Medium') -> Optional[int]: ...
+
+    @abstractmethod
+    async def get_ticket(self, ticket_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_all_tickets(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest first."""
+
+    @abstractmethod
+    async def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+        """Also sets resolved_at for Resolved/Closed."""
+
+    @abstractmethod
+    async def update_ticket_assignment(self, ticket_id: int, agent_id: Optional[int], team: Optional[str]) -> bool: ...
+
+    @abstractmethod
+    async def update_ticket_summary(self, ticket_id: int, summary: str, actions: List[str]) -> bool: ...
+
+    @abstractmethod
+    async def update_ticket_prediction(self, ticket_id: int, predicted_time: Optional[int]) -> bool: ...
+
+    # == Knowledge Base ==
+    @abstractmethod
+    async def add_kb_entry(self, title: str, content: str, keywords: Optional[str] = None,
+                           source_ticket_id: Optional[int] = None) -> Optional[int]: ...
+
+    @abstractmethod
+    async def get_kb_entry(self, kb_id: int) -> Optional[Dict[str, Any]]:
+        """id, title, content, embedding (list of floats or None), success_rate, usage_count."""
+
+    @abstractmethod
+    async def update_kb_embedding(self, kb_id: int, embedding: List[float], model: str,
+                                  content_hash: Optional[str] = None) -> bool: ...
+
+    @abstractmethod
+    async def search_kb(self, embedding: List[float], model: str, top_k: int = 10,
+                        with_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """
+        Canonical entries embedded with `model` (same dimension), by cosine similarity to `embedding`, best
+        first: id, title, content, success_rate, usage_count, similarity; with_embeddings adds each entry's
+        embedding (for re-ranking by direction: it may come back L2-normalized).
+        """
+
+    async def kb_version(self, model: str) -> Optional[int]:
+        """
+        Identifies the KB state search_kb(model) answers from (entries and success rates), so results computed
+        from it can be cached under it; None when the backend cannot tell, i.e. don't cache.
+        """
+        return None
+
+    @abstractmethod
+    async def apply_kb_feedback(self, deltas: List[Tuple[int, int, int]], prior_helpful: float,
+                                prior_unhelpful: float) -> bool:
+        """Adds batched feedback, (kb_id, uses, helpful uses) per entry; see database_manager.apply_kb_feedback_batch."""
+
+    # == Agents ==
+    @abstractmethod
+    async def add_agent(self, name: str, email: str, skills: Optional[str] = None) -> Optional[int]: ...
+
+    @abstractmethod
+    async def get_agent(self, agent_id: int) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_available_agents(self) -> List[Dict[str, Any]]:
+        """Least loaded first."""
+
+    # == Users ==
+    @abstractmethod
+    async def add_user(self, username: str, hashed_password: str, email: Optional[str] = None,
+                       full_name: Optional[str] = None, is_active: bool = True) -> Optional[int]: ...
+
+    @abstractmethod
+    async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]: ...
+
+
+class SQLiteStorage(Storage):
+    """database_manager behind the Storage interface; each call runs in a worker thread."""
+
+    async def init(self) -> None:
+        await asyncio.to_thread(db.init_db)
+
+    async def add_ticket(self, customer_name, subject, body, customer_email=None, priority='Medium'):
+        return await asyncio.to_thread(db.add_ticket, customer_name, subject, body, customer_email, priority)
+
+    async def get_ticket(self, ticket_id):
+        return await asyncio.to_thread(db.get_ticket, ticket_id)
+
+    async def get_all_tickets(self, status=None, limit=100, offset=0):
+        return await asyncio.to_thread(db.get_all_tickets, status, limit, offset)
+
+    async def update_ticket_status(self, ticket_id, status):
+        return await asyncio.to_thread(db.update_ticket_status, ticket_id, status)
+
+    async def update_ticket_assignment(self, ticket_id, agent_id, team):
+        return await asyncio.to_thread(db.update_ticket_assignment, ticket_id, agent_id, team)
+
+    async def update_ticket_summary(self, ticket_id, summary, actions):
+        return await asyncio.to_thread(db.update_ticket_summary, ticket_id, summary, actions)
+
+    async def update_ticket_prediction(self, ticket_id, predicted_time):
+        return await asyncio.to_thread(db.update_ticket_prediction, ticket_id, predicted_time)
+
+    async def add_kb_entry(self, title, content, keywords=None, source_ticket_id=None):
+        return await asyncio.to_thread(db.add_kb_entry, title, content, keywords, None, source_ticket_id)
+
+    async def get_kb_entry(self, kb_id):
+        row = await asyncio.to_thread(db.get_kb_entry, kb_id)
+        if row is not None:
+            row['embedding'] = deserialize_embedding(row['embedding'])
+        return row
+
+    async def update_kb_embedding(self, kb_id, embedding, model, content_hash=None):
+        updated = await asyncio.to_thread(db.update_kb_embedding, kb_id, embedding, model, content_hash)
+        if updated:
+            invalidate_kb_index(model)
+        return updated
+
+    async def search_kb(self, embedding, model, top_k=10, with_embeddings=False):
+        # The in-memory KB index is SQLite's vector search
+        index = await get_kb_index(model)
+        if not len(index) or len(embedding) != index.dim:
+            return []
+        rows, similarities = index.search(embedding, top_k)
+        results = [{
+            'id': int(index.ids[row]), 'title': index.titles[row], 'content': index.contents[row],
+            'success_rate': float(index.success_rates[row]), 'usage_count': int(index.usage_counts[row]),
+            'similarity': float(similarity),
+        } for row, similarity in zip(rows, similarities)]
+        if with_embeddings:
+            for result, row in zip(results, rows):
+                result['embedding'] = index.matrix[row].tolist() # Normalized rows
+        return results
+
+    async def kb_version(self, model):
+        # Changes with every reload of the index and every feedback applied to it in memory
+        return (await get_kb_index(model)).version
+
+    async def apply_kb_feedback(self, deltas, prior_helpful, prior_unhelpful):
+        return await asyncio.to_thread(db.apply_kb_feedback_batch, deltas, prior_helpful, prior_unhelpful)
+
+    async def add_agent(self, name, email, skills=None):
+        return await asyncio.to_thread(db.add_agent, name, email, skills)
+
+    async def get_agent(self, agent_id):
+        return await asyncio.to_thread(db.get_agent, agent_id)
+
+    async def get_available_agents(self):
+        return await asyncio.to_thread(db.get_available_agents)
+
+    async def add_user(self, username, hashed_password, email=None, full_name=None, is_active=True):
+        return await asyncio.to_thread(db.add_user, username, hashed_password, email, full_name, is_active)
+
+    async def get_user_by_username(self, username):
+        return await asyncio.to_thread(db.get_user_by_username, username)
+
+    async def get_user_by_email(self, email):
+        return await asyncio.to_thread(db.get_user_by_email, email)
+
+
+_storage: Optional[Storage] = None
+_storage_lock = asyncio.Lock()
+
+
+async def get_storage() -> Storage:
+    """The configured backend (STORAGE_BACKEND), initialized on first use."""
+    global _storage
+    if _storage is not None:
+        return _storage
+    async with _storage_lock:
+        if _storage is not None:
+            return _storage
+        if STORAGE_BACKEND == "postgres":
+            from backend.database.postgres_storage import PostgresStorage
+            storage: Storage = PostgresStorage(POSTGRES_DSN)
+        elif STORAGE_BACKEND == "sqlite":
+            storage = SQLiteStorage()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}' (expected 'sqlite' or 'postgres').")
+        await storage.init()
+        _storage = storage
+        log.info(f"Storage backend: {type(storage).__name__}.")
+        return _storage
+
+
+async def close_storage() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
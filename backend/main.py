@@ -1,10 +1,13 @@
 # backend/main.py
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 import uvicorn
 import os
+import asyncio
 import logging
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,13 +20,38 @@ from backend.apis import (
     routing_api,
     recommendation_api,
     prediction_api,
-    auth_api # <<<--- ADDED IMPORT
+    auth_api, # <<<--- ADDED IMPORT
+    events_api
 )
 from backend.database import database_manager
+from backend.database.storage import get_storage, close_storage
+from backend.utils.coordination import acquire_singleton, change_feed
+from backend.utils.kb_embedding_pipeline import reembed_in_background
+from backend.utils.kb_index import invalidate_kb_index
+from backend.utils.kb_feedback import feedback_aggregator
+from backend.utils.llm_gateway import llm_gateway, llm_deadline
+from backend.utils.logging_config import configure_logging
+from backend.utils.ticket_archive import archive_in_background, TICKET_ARCHIVE_INTERVAL_HOURS
+from backend.utils.metrics import REGISTRY, HTTP_REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE
+from backend.utils.tracing import configure_tracing, shutdown_tracing, start_span
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s [%(name)s] %(message)s')
+configure_logging() # JSON lines via a background writer thread; see LOG_* settings in utils/logging_config.py
 log = logging.getLogger(__name__)
 
+# Time budget for all Ollama calls made while serving one request; once spent, agents use their fallbacks
+LLM_REQUEST_BUDGET_SECONDS = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", "60"))
+
+async def _apply_remote_ticket_change(change):
+    """Another worker process changed a ticket: drop this worker's cached renderings and notify its subscribers."""
+    database_manager.note_ticket_changed(change['entity_id'])
+    if change['entity_id'] is None: # Bulk change (archival): list caches only
+        return
+    kind = change['kind'] or "updated"
+    await events_api.publish_ticket_event(kind, change['entity_id'], previous_unknown=(kind != "created"))
+
+change_feed.on("ticket", _apply_remote_ticket_change)
+change_feed.on("kb", lambda change: invalidate_kb_index())
+
 app = FastAPI(
     title="AI Customer Support System API",
     description="API endpoints for the enterprise AI-driven customer support system.",
@@ -49,23 +77,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Times every request into http_request_duration_seconds, labelled by route template (not raw path),
+    and opens the root trace span; its id is returned in the X-Trace-Id header. Also starts the request's
+    LLM deadline (LLM_REQUEST_BUDGET_SECONDS).
+    """
+    start = time.perf_counter()
+    status_code = 500
+    with start_span("http.request", method=request.method, path=request.url.path) as span, llm_deadline(LLM_REQUEST_BUDGET_SECONDS):
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            response.headers["X-Trace-Id"] = span.trace_id
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            span.name = f"{request.method} {route}"
+            span.set_attribute("status", status_code)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=str(status_code))
+
 # --- Event Handlers (Keep as is) ---
 @app.on_event("startup")
 async def startup_event():
     log.info("Starting up AI Customer Support System API...")
+    configure_tracing() # Exporter/sampler from TRACE_* environment variables
+    ollama_available = False
     try:
         # Check Ollama connection
         try:
-            from backend.utils.ollama_integration import client as ollama_client
-            if ollama_client is None:
+            from backend.utils.ollama_integration import ollama_available as check_ollama
+            if not check_ollama():
                  log.warning("Ollama client failed to initialize. AI features needing Ollama may fail.")
             else:
                  log.info("Ollama client seems available.")
+                 ollama_available = True
+            llm_gateway.start() # Periodic host health checks (also revives hosts that were down at startup)
         except Exception as ollama_err:
              log.warning(f"Could not verify Ollama connection during startup: {ollama_err}")
         # Initialize DB
         database_manager.init_db()
         log.info("Database check/initialization complete.")
+        # Tickets, users and KB search (STORAGE_BACKEND); the SQLite database above still holds the rest
+        await get_storage()
+        # Invalidation from other worker processes (scripts/run_server.py --workers N)
+        change_feed.start()
+        # Batched writer for recommendation feedback
+        feedback_aggregator.start()
+        # Re-embed new, edited or other-model KB entries without blocking startup (in one worker only)
+        if ollama_available and os.getenv("KB_BACKGROUND_REEMBED", "true").lower() == "true" and acquire_singleton("kb-reembed"):
+            app.state.kb_reembed_task = asyncio.create_task(reembed_in_background())
+        # Move old resolved tickets out of the hot table (in one worker only)
+        if TICKET_ARCHIVE_INTERVAL_HOURS > 0 and acquire_singleton("ticket-archive"):
+            app.state.ticket_archive_task = asyncio.create_task(archive_in_background())
     except Exception as e:
         log.error(f"FATAL: Error during application startup sequence: {e}", exc_info=True)
     log.info("API startup sequence completed.")
@@ -73,6 +138,15 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     log.info("Shutting down API...")
+    for task_name in ("kb_reembed_task", "ticket_archive_task"):
+        task = getattr(app.state, task_name, None)
+        if task and not task.done():
+            task.cancel()
+    await feedback_aggregator.stop() # Write feedback still buffered
+    await change_feed.stop()
+    await close_storage()
+    await llm_gateway.stop()
+    shutdown_tracing()
 
 # --- Include API Routers ---
 app.include_router(auth_api.router) # <<<--- ADDED ROUTER
@@ -81,6 +155,12 @@ app.include_router(summarization_api.router)
 app.include_router(routing_api.router)
 app.include_router(recommendation_api.router)
 app.include_router(prediction_api.router)
+app.include_router(events_api.router) # WebSocket push of ticket changes (authenticates in-band)
+
+# --- Metrics (Prometheus scrape target; unauthenticated, like the root status endpoint) ---
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # --- Root Endpoint (Keep as is) ---
 @app.get("/", tags=["Root"], summary="API Root Status")
@@ -0,0 +1,50 @@
+# backend/scripts/archive_tickets.py
+
+import sys
+import os
+import argparse
+import logging
+import sqlite3
+
+# --- Path Setup ---
+# Ensures the script can find backend modules when run directly
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(scripts_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+if backend_dir not in sys.path: sys.path.insert(0, backend_dir)
+# --- End Path Setup ---
+
+try:
+    from backend.database import database_manager as db
+    from backend.utils.ticket_archive import TICKET_ARCHIVE_AFTER_DAYS, TICKET_ARCHIVE_BATCH_SIZE
+except ImportError as e:
+    print(f"Error importing backend modules: {e}")
+    print("Ensure you are running this script from the project root or backend directory,"
+          " or that PYTHONPATH includes the project root.")
+    sys.exit(1)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s [%(name)s] %(message)s')
+log = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old Resolved/Closed tickets into the archive database.")
+    parser.add_argument("--older-than-days", type=float, default=TICKET_ARCHIVE_AFTER_DAYS,
+                        help="Archive tickets resolved more than this many days ago.")
+    parser.add_argument("--batch-size", type=int, default=TICKET_ARCHIVE_BATCH_SIZE, help="Tickets per transaction.")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM the main database afterwards to return freed pages to the OS (otherwise new tickets reuse them).")
+    args = parser.parse_args()
+
+    print("--- Archiving tickets ---")
+    db.init_db()
+    moved = db.archive_tickets(args.older_than_days, args.batch_size)
+    if moved is None:
+        sys.exit(1)
+    print(f"Archived: {moved}, archive now holds {db.count_archived_tickets()} tickets ({db.archive_database_path()})")
+    if args.vacuum and moved:
+        conn = sqlite3.connect(db.DATABASE_PATH)
+        conn.execute("VACUUM")
+        conn.close()
+        print("Main database vacuumed.")
+    print("--- Ticket archival finished ---")
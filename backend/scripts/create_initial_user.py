@@ -2,6 +2,7 @@
 
 import sys
 import os
+import asyncio
 import logging
 import getpass # To securely get password input
 import sqlite3 # Import to catch specific DB errors
@@ -17,6 +18,7 @@ if backend_dir not in sys.path: sys.path.insert(0, backend_dir)
 # Import necessary functions AFTER path setup
 try:
     from backend.database import database_manager as db
+    from backend.database.storage import get_storage, close_storage
     from backend.auth import get_password_hash # Import hashing function
 except ImportError as e:
     print(f"Error importing backend modules: {e}")
@@ -27,6 +29,15 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
+def storage_call(method: str, *args, **kwargs):
+    """Runs one Storage method on the configured backend (STORAGE_BACKEND), where the API looks users up."""
+    async def call():
+        try:
+            return await getattr(await get_storage(), method)(*args, **kwargs)
+        finally:
+            await close_storage()
+    return asyncio.run(call())
+
 def create_user():
     """Prompts for user details and creates the initial user."""
     log.info("--- Create Initial User ---")
@@ -40,7 +51,7 @@ def create_user():
         username = input("Enter username: ").strip()
         if username:
             try:
-                existing = db.get_user_by_username(username)
+                existing = storage_call("get_user_by_username", username)
                 if existing:
                      log.error(f"Username '{username}' already exists. Please choose another.")
                 else:
@@ -80,7 +91,8 @@ def create_user():
 
     # Add user to database
     try:
-        user_id = db.add_user(
+        user_id = storage_call(
+            "add_user",
             username=username,
             hashed_password=hashed_password,
             email=email,
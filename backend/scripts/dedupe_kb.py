@@ -0,0 +1,48 @@
+# backend/scripts/dedupe_kb.py
+
+import sys
+import os
+import argparse
+import logging
+
+# --- Path Setup ---
+# Ensures the script can find backend modules when run directly
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(scripts_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+if backend_dir not in sys.path: sys.path.insert(0, backend_dir)
+# --- End Path Setup ---
+
+try:
+    from backend.database import database_manager as db
+    from backend.utils.kb_dedup import dedupe_kb, DEFAULT_JACCARD_THRESHOLD
+    from backend.utils.kb_index import invalidate_kb_index
+    from backend.utils.ollama_integration import EMBEDDING_MODEL
+except ImportError as e:
+    print(f"Error importing backend modules: {e}")
+    print("Ensure you are running this script from the project root or backend directory,"
+          " or that PYTHONPATH includes the project root.")
+    sys.exit(1)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s [%(name)s] %(message)s')
+log = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge near-duplicate knowledge base entries (MinHash/LSH).")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_JACCARD_THRESHOLD,
+                        help="Estimated Jaccard similarity (word 3-grams) at which entries are merged.")
+    parser.add_argument("--embedding-threshold", type=float, default=None,
+                        help="Also merge LSH candidates whose embeddings have at least this cosine similarity.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Embedding model used with --embedding-threshold.")
+    parser.add_argument("--resign", action="store_true", help="Drop stored signatures and re-sign every canonical entry.")
+    args = parser.parse_args()
+
+    print("--- Deduplicating Knowledge Base ---")
+    db.init_db()
+    if args.resign and not db.clear_kb_dedup_index():
+        sys.exit(1)
+    stats = dedupe_kb(threshold=args.threshold, embedding_threshold=args.embedding_threshold, model=args.model)
+    invalidate_kb_index()
+    print(f"Merged: {stats.merged}, indexed: {stats.indexed}, skipped: {stats.skipped}, failed: {stats.failed}")
+    print("--- KB dedup finished ---")
@@ -0,0 +1,54 @@
+# backend/scripts/export_columnar.py
+
+import sys
+import os
+import argparse
+import logging
+
+# --- Path Setup ---
+# Ensures the script can find backend modules when run directly
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(scripts_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+if backend_dir not in sys.path: sys.path.insert(0, backend_dir)
+# --- End Path Setup ---
+
+try:
+    from backend.database import database_manager as db
+    from backend.utils.columnar_export import EXPORT_CHUNK_ROWS, FORMATS, export_kb, export_tickets
+    from backend.utils.ollama_integration import EMBEDDING_MODEL
+except ImportError as e:
+    print(f"Error importing backend modules: {e}")
+    print("Ensure you are running this script from the project root or backend directory,"
+          " or that PYTHONPATH includes the project root.")
+    sys.exit(1)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s [%(name)s] %(message)s')
+log = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export tickets and KB entries to Parquet/Arrow IPC files for analytics and training.")
+    parser.add_argument("output_dir", help="Export directory (tickets/ parts, kb/ files and the watermark state).")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--only", choices=["tickets", "kb"], help="Export just one of the two tables.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Embedding model whose vectors go into the KB export.")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS, help="Rows per read and per row group/record batch.")
+    parser.add_argument("--full", action="store_true", help="Ignore the stored watermarks and export everything again.")
+    args = parser.parse_args()
+
+    if not os.path.exists(db.DATABASE_PATH):
+        print(f"Database not found at {db.DATABASE_PATH}")
+        sys.exit(1)
+    print("--- Columnar export ---")
+    try:
+        if args.only != "kb":
+            stats = export_tickets(args.output_dir, args.format, args.chunk_rows, args.full)
+            print(f"Tickets: {stats.tickets} rows {stats.files or '(nothing new)'}")
+        if args.only != "tickets":
+            stats = export_kb(args.output_dir, args.format, args.model, args.chunk_rows, args.full)
+            print(f"KB: {stats.kb_entries} rows {stats.files or '(unchanged)'}")
+    except RuntimeError as e: # pyarrow missing
+        print(e)
+        sys.exit(1)
+    print("--- Columnar export finished ---")
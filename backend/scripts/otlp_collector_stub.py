@@ -0,0 +1,67 @@
+# backend/scripts/otlp_collector_stub.py
+"""
+Minimal OTLP/HTTP JSON trace receiver for local debugging (no OpenTelemetry collector needed).
+Run it, start the API with TRACE_EXPORT=otlp, and every kept trace is printed as an indented span tree
+and appended to a JSONL file.
+
+    python backend/scripts/otlp_collector_stub.py [--port 4318] [--out otlp_traces.jsonl]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _print_trace(spans):
+    children = defaultdict(list)
+    for span in spans:
+        children[span.get("parentSpanId") or None].append(span)
+    ids = {span["spanId"] for span in spans}
+
+    def walk(span, depth):
+        duration_ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+        error = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+        print(f"{'  ' * depth}{span['name']} {duration_ms:.1f}ms{error}")
+        for child in sorted(children[span["spanId"]], key=lambda s: int(s["startTimeUnixNano"])):
+            walk(child, depth + 1)
+
+    for root in [s for s in spans if not s.get("parentSpanId") or s["parentSpanId"] not in ids]:
+        print(f"--- trace {root['traceId']}")
+        walk(root, 0)
+
+
+def make_handler(out_path):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                self.send_error(400, "Expected OTLP JSON")
+                return
+            spans = [span for rs in payload.get("resourceSpans", []) for ss in rs.get("scopeSpans", []) for span in ss.get("spans", [])]
+            _print_trace(spans)
+            with open(out_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass # Traces are printed instead of access logs
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OTLP/HTTP JSON trace receiver.")
+    parser.add_argument("--port", type=int, default=4318, help="Port to listen on (OTLP/HTTP default: 4318).")
+    parser.add_argument("--out", default="otlp_traces.jsonl", help="File the received payloads are appended to.")
+    args = parser.parse_args()
+    print(f"Listening for OTLP/HTTP JSON traces on http://localhost:{args.port}/v1/traces")
+    ThreadingHTTPServer(("0.0.0.0", args.port), make_handler(args.out)).serve_forever()
@@ -0,0 +1,81 @@
+# backend/scripts/run_server.py
+"""
+Production launcher: N uvicorn worker processes serving backend.main:app on one port.
+
+Before forking it initializes the database once, switches it to WAL (concurrent readers alongside one writer)
+and builds the KB index snapshot that every worker then memory-maps (KB_SNAPSHOT_DIR). Workers keep their own
+caches and stay consistent through the change_log feed (utils/coordination.py); background re-embedding runs
+in one worker only.
+
+/metrics is per worker: each process has its own counters and a scrape is answered by whichever worker accepts
+it. With more than one worker every series is labelled worker="<pid>" (METRICS_WORKER_LABEL), so Prometheus
+keeps one series per worker instead of one that jumps between them; aggregate with e.g.
+`sum without (worker) (rate(http_request_duration_seconds_count[5m]))`. A scrape only refreshes the worker that
+answered it, so scrape often enough to reach every worker, or run one process per port and scrape each.
+
+    python backend/scripts/run_server.py --workers 4 --port 8000
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# --- Path Setup ---
+# Ensures the script can find backend modules when run directly
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(scripts_dir)
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path: sys.path.insert(0, project_root)
+# --- End Path Setup ---
+
+try:
+    import uvicorn
+    from backend.database import database_manager as db
+    from backend.utils import kb_index
+    from backend.utils.ollama_integration import EMBEDDING_MODEL
+except ImportError as e:
+    print(f"Error importing backend modules: {e}")
+    print("Ensure you are running this script from the project root or backend directory,"
+          " or that PYTHONPATH includes the project root.")
+    sys.exit(1)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s [%(name)s] %(message)s')
+log = logging.getLogger(__name__)
+
+
+def prepare_shared_state(snapshot_dir: str) -> None:
+    """One-time setup in the parent process; workers inherit the environment and find the results on disk."""
+    db.init_db()
+    with db.get_db_connection() as conn:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0] # Persistent: stored in the database file
+    if mode.lower() != "wal":
+        log.warning(f"Could not enable WAL (journal_mode={mode}); workers will serialize on database locks.")
+    kb_index.KB_SNAPSHOT_DIR = os.environ["KB_SNAPSHOT_DIR"] = snapshot_dir
+    index = kb_index.KBIndex.load(EMBEDDING_MODEL)
+    log.info(f"KB snapshot ready in {snapshot_dir}: {len(index)} entries for model '{EMBEDDING_MODEL}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Worker processes (default: WEB_CONCURRENCY or the CPU count).")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    parser.add_argument("--snapshot-dir", default=os.getenv("KB_SNAPSHOT_DIR") or None,
+                        help="Where KB index snapshots are shared (default: kb_snapshots next to the database).")
+    args = parser.parse_args()
+
+    snapshot_dir = args.snapshot_dir or os.path.join(os.path.dirname(os.path.abspath(db.DATABASE_PATH)), "kb_snapshots")
+    prepare_shared_state(snapshot_dir)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [project_root, os.environ.get("PYTHONPATH")])) # For spawned workers
+    if args.workers > 1:
+        os.environ.setdefault("METRICS_WORKER_LABEL", "true")
+        log.info("/metrics is per worker: each scrape reports only the worker that answered it, with every series "
+                 "labelled worker=\"<pid>\". Aggregate across workers with `sum without (worker) (...)`; "
+                 "see the notes at the top of run_server.py.")
+    log.info(f"Starting {args.workers} worker(s) on {args.host}:{args.port}")
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers,
+                log_level=args.log_level, access_log=not args.no_access_log)
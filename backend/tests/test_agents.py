@@ -0,0 +1,195 @@
+# backend/tests/test_agents.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.agents.summarization_agent import SummarizationAgent
+from backend.benchmarks.fake_ollama import make_server
+from backend.utils import ollama_integration
+from backend.utils.llm_gateway import Lane, LLMGateway, _Job, llm_deadline
+
+CONVERSATION = "Subject: Installer fails\n\nBody:\nThe installer stops at 80% with error 0x80070005 and rolls back."
+
+
+@pytest.fixture
+def stub_ollama():
+    """Starts stub Ollama servers (backend/benchmarks/fake_ollama.py) on free ports; yields a factory returning (url, server)."""
+    servers = []
+
+    def start(**options):
+        server = make_server(port=0, latency_ms=5, tokens_per_second=10000, completion_tokens=10, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def use_gateway(monkeypatch, hosts, **options) -> LLMGateway:
+    gateway = LLMGateway(hosts, health_check_interval=3600, **options)
+    monkeypatch.setattr(ollama_integration, "llm_gateway", gateway)
+    return gateway
+
+
+def test_summarization_falls_back_within_deadline_when_ollama_stalls(stub_ollama, monkeypatch):
+    url, _ = stub_ollama(stall_seconds=5)
+    use_gateway(monkeypatch, [url])
+
+    async def summarize():
+        with llm_deadline(0.5):
+            return await SummarizationAgent().summarize_and_extract(CONVERSATION)
+
+    start = time.monotonic()
+    summary, actions = asyncio.run(summarize())
+    assert time.monotonic() - start < 2.0
+    assert summary == "[AI summary generation failed]"
+    assert actions == ["[AI action extraction failed]"]
+
+
+def test_circuit_opens_after_stalls_and_then_fails_fast(stub_ollama, monkeypatch):
+    url, server = stub_ollama(stall_seconds=5)
+    gateway = use_gateway(monkeypatch, [url], breaker_failures=2, breaker_cooldown=60)
+
+    async def call():
+        with llm_deadline(0.3):
+            return await ollama_integration.call_ollama_llm("Summarize: printer offline", model="stub")
+
+    async def scenario():
+        for _ in range(2):
+            assert (await call()).startswith("[Error:")
+        requests_before = server.RequestHandlerClass.chat_requests
+        start = time.monotonic()
+        reply = await call()
+        return reply, time.monotonic() - start, server.RequestHandlerClass.chat_requests - requests_before
+
+    reply, elapsed, requests_sent = asyncio.run(scenario())
+    assert reply.startswith("[Error:")
+    assert elapsed < 0.05
+    assert requests_sent == 0
+    assert not gateway.available()
+
+
+def test_hedged_request_answers_from_second_host(stub_ollama, monkeypatch):
+    slow_url, _ = stub_ollama(stall_seconds=5)
+    fast_url, fast_server = stub_ollama()
+    use_gateway(monkeypatch, [slow_url, fast_url], hedge_after=0.1)
+
+    start = time.monotonic()
+    reply = asyncio.run(ollama_integration.call_ollama_llm("Summarize: printer offline", model="stub"))
+    assert time.monotonic() - start < 1.0
+    assert not reply.startswith("[Error:")
+    assert fast_server.RequestHandlerClass.chat_requests == 1
+
+
+def test_long_transcript_is_summarized_map_reduce_with_bounded_calls(stub_ollama, monkeypatch):
+    url, server = stub_ollama()
+    use_gateway(monkeypatch, [url])
+    turns = [f"Customer: The sync stopped again on device {i}, error E{i:04d} after the update.\nAgent: Noted, checking.\n"
+             for i in range(700)]
+    transcript = "".join(turns)
+    assert len(transcript) > 50_000
+
+    summary, actions = asyncio.run(SummarizationAgent().summarize_and_extract(transcript))
+    assert not summary.startswith("[AI")
+    assert actions and not actions[0].startswith("[AI")
+    # At most SUMMARIZATION_MAX_CHUNKS map calls plus the two task calls, whatever the transcript length
+    assert server.RequestHandlerClass.chat_requests <= 10 + 2
+
+
+def test_tiered_strategy_returns_extractive_result_then_llm_upgrade(stub_ollama, monkeypatch):
+    url, _ = stub_ollama()
+    use_gateway(monkeypatch, [url])
+    agent = SummarizationAgent(strategy="tiered")
+
+    async def scenario():
+        upgraded = asyncio.get_running_loop().create_future()
+
+        async def on_upgrade(summary, actions):
+            upgraded.set_result((summary, actions))
+
+        start = time.perf_counter()
+        first = agent.summarize_tiered(CONVERSATION, on_upgrade)
+        elapsed = time.perf_counter() - start
+        return first, elapsed, await asyncio.wait_for(upgraded, 5)
+
+    (summary, actions), elapsed, (llm_summary, llm_actions) = asyncio.run(scenario())
+    assert elapsed < 0.01
+    assert "0x80070005" in summary
+    assert "Ask for the specific error code/message." in actions
+    assert llm_summary != summary and llm_actions != actions
+
+
+def chat_messages(text: str):
+    return [{"role": "user", "content": text}]
+
+
+def test_identical_requests_are_coalesced_into_one_call(stub_ollama, monkeypatch):
+    url, server = stub_ollama()
+    gateway = use_gateway(monkeypatch, [url])
+
+    async def scenario():
+        return await asyncio.gather(*(gateway.chat("stub", chat_messages("Summarize: printer offline")) for _ in range(5)))
+
+    replies = asyncio.run(scenario())
+    assert server.RequestHandlerClass.chat_requests == 1
+    assert len({reply["message"]["content"] for reply in replies}) == 1
+
+
+def dispatch_order(gateway: LLMGateway, jobs) -> list:
+    """Runs (label, lane) chat jobs submitted in order against a one-slot host; returns labels in completion order."""
+    order = []
+
+    async def run(label, lane):
+        await gateway.chat("stub", chat_messages(label), lane=lane)
+        order.append(label)
+
+    async def scenario():
+        await asyncio.gather(*(run(label, lane) for label, lane in jobs))
+
+    asyncio.run(scenario())
+    return order
+
+
+def test_urgent_request_jumps_the_queue(stub_ollama, monkeypatch):
+    url, _ = stub_ollama()
+    gateway = use_gateway(monkeypatch, [url], max_parallel_per_host=1)
+    jobs = [(f"batch {i}", Lane.BATCH) for i in range(5)] + [("urgent", Lane.URGENT)]
+    order = dispatch_order(gateway, jobs)
+    assert order[:2] == ["batch 0", "urgent"] # batch 0 already had the slot
+
+
+def test_weighted_lanes_share_slots_8_2_1(stub_ollama, monkeypatch):
+    url, _ = stub_ollama()
+    gateway = use_gateway(monkeypatch, [url], max_parallel_per_host=1)
+    # The urgent job holds the slot while the weighted lanes fill up, so all three start at the same pass
+    jobs = [("URGENT", Lane.URGENT)] + [(f"{lane.name} {i}", lane) for lane in (Lane.BATCH, Lane.BACKGROUND, Lane.INTERACTIVE) for i in range(24)]
+    order = dispatch_order(gateway, jobs)
+    window = [label.split()[0] for label in order[1:23]] # Two full stride rounds, all three lanes backlogged
+    assert (window.count("INTERACTIVE"), window.count("BACKGROUND"), window.count("BATCH")) == (16, 4, 2)
+
+
+def test_job_waiting_for_a_retry_host_does_not_block_other_lanes(stub_ollama, monkeypatch):
+    first_url, _ = stub_ollama()
+    second_url, _ = stub_ollama()
+    gateway = use_gateway(monkeypatch, [first_url, second_url], max_parallel_per_host=1)
+    first, second = gateway.backends
+
+    async def scenario():
+        retry = _Job("retry", "chat", {}, Lane.INTERACTIVE)
+        retry.tried.append(first) # Failed on the first host; the second is busy
+        gateway._enqueue(retry, Lane.INTERACTIVE)
+        gateway._enqueue(_Job("batch", "chat", {}, Lane.BATCH), Lane.BATCH)
+        second.in_flight = 1
+        interactive_pass = gateway._pass[Lane.INTERACTIVE]
+        job, backend = gateway._next_job()
+        return job.key, backend, gateway._pass[Lane.INTERACTIVE] == interactive_pass, list(gateway._queues[Lane.INTERACTIVE])
+
+    key, backend, pass_unchanged, interactive_queue = asyncio.run(scenario())
+    assert (key, backend) == ("batch", first)
+    assert pass_unchanged and [job.key for job in interactive_queue] == ["retry"]
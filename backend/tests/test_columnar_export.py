@@ -0,0 +1,98 @@
+# backend/tests/test_columnar_export.py
+
+import sqlite3
+import time
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+from backend.database import database_manager as db
+from backend.utils import columnar_export
+
+MODEL = "test-embed"
+
+
+@pytest.fixture
+def export_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "export.db"))
+    monkeypatch.delenv("ARCHIVE_DATABASE_PATH", raising=False)
+    monkeypatch.setattr(columnar_export, "EXPORT_SETTLE_SECONDS", 0)
+    db.init_db()
+    return tmp_path
+
+
+def read_table(path: str):
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def insert_ticket(name: str, status: str, updated_at: str) -> None:
+    with sqlite3.connect(db.DATABASE_PATH) as conn:
+        conn.execute(
+            "INSERT INTO tickets (customer_name, subject, body, status, extracted_actions, created_at, updated_at, resolved_at) "
+            "VALUES (?, 'Printer offline', 'It shows offline.', ?, '[\"Restart the spooler.\"]', '2024-01-01 00:00:00', ?, ?)",
+            (name, status, updated_at, updated_at if status == "Resolved" else None))
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_ticket_export_is_incremental_and_tracks_archival(export_db, file_format):
+    out = str(export_db / "out")
+    insert_ticket("Ann", "Resolved", "2024-01-02 00:00:00")
+    insert_ticket("Bob", "Open", "2024-01-03 00:00:00")
+
+    first = columnar_export.export_tickets(out, file_format)
+    table = read_table(first.files[0])
+    assert first.tickets == 2 and table.num_rows == 2
+    assert table.schema.field("updated_at").type == pa.timestamp("ms")
+    assert pa.types.is_dictionary(table.schema.field("status").type)
+    rows = table.to_pylist()
+    assert [r["customer_name"] for r in rows] == ["Ann", "Bob"] and [r["archived"] for r in rows] == [False, False]
+    assert rows[0]["extracted_actions"] == ["Restart the spooler."] and rows[1]["resolved_at"] is None
+
+    assert columnar_export.export_tickets(out, file_format).files == [] # Nothing changed
+
+    assert db.archive_tickets(30) == 1
+    time.sleep(1.1) # Let the archival second settle
+    second = columnar_export.export_tickets(out, file_format)
+    rows = read_table(second.files[0]).to_pylist()
+    assert [(r["customer_name"], r["archived"]) for r in rows] == [("Ann", True)]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_kb_export_has_fixed_size_embeddings_and_skips_when_unchanged(export_db, file_format):
+    out = str(export_db / "out")
+    embedded = db.add_kb_entry("Reset router", "Unplug the router for 30 seconds.", "network")
+    db.add_kb_entry("Draft", "Not embedded yet.")
+    assert db.update_kb_embedding(embedded, [1.0, 0.5, 0.25], MODEL)
+
+    stats = columnar_export.export_kb(out, file_format, model=MODEL)
+    table = read_table(stats.files[0])
+    assert stats.kb_entries == 2
+    assert table.schema.field("embedding").type == pa.list_(pa.float32(), 3)
+    assert table.column("embedding").to_pylist() == [[1.0, 0.5, 0.25], None]
+
+    assert columnar_export.export_kb(out, file_format, model=MODEL).files == []
+    db.add_kb_entry("Refund", "Refunds take five days.")
+    assert columnar_export.export_kb(out, file_format, model=MODEL).kb_entries == 3
+
+
+def test_kb_export_state_is_kept_per_model(export_db):
+    out = str(export_db / "out")
+    entry = db.add_kb_entry("Reset router", "Unplug the router for 30 seconds.")
+    assert db.update_kb_embedding(entry, [1.0, 0.0], MODEL)
+
+    first = columnar_export.export_kb(out, "parquet", model=MODEL)
+    other = columnar_export.export_kb(out, "parquet", model="other-embed")
+    assert first.files and other.files and first.files != other.files
+    # Alternating models: neither export invalidates the other's state
+    assert columnar_export.export_kb(out, "parquet", model=MODEL).files == []
+    assert columnar_export.export_kb(out, "parquet", model="other-embed").files == []
+
+    db.add_kb_entry("Refund", "Refunds take five days.")
+    assert columnar_export.export_kb(out, "parquet", model="other-embed").kb_entries == 2
+    assert columnar_export.export_kb(out, "parquet", model=MODEL).kb_entries == 2
+    assert set(columnar_export.load_state(out)["kb"]) == {MODEL, "other-embed"}
@@ -0,0 +1,73 @@
+# backend/tests/test_coordination.py
+
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend.database import database_manager as db
+from backend.utils import kb_index
+from backend.utils.coordination import ChangeFeed
+from backend.utils.read_cache import ReadCache
+
+MODEL = "test-embed"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def shared_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "shared.db"))
+    monkeypatch.setattr(db, "ARCHIVE_DATABASE_PATH", "")
+    monkeypatch.setattr(kb_index, "KB_SNAPSHOT_DIR", "") # Built from the database, like a single host without snapshots
+    db.init_db()
+    kb_index.invalidate_kb_index()
+    yield tmp_path
+    kb_index.invalidate_kb_index()
+
+
+def write_in_other_worker(code: str) -> None:
+    """Runs `code` (with `db` imported) in a separate process against the same database file: another worker."""
+    env = {**os.environ, "DATABASE_PATH": db.DATABASE_PATH}
+    script = f"from backend.database import database_manager as db\n{code}"
+    subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, env=env, check=True, capture_output=True, timeout=60)
+
+
+def test_other_workers_writes_make_read_cache_and_kb_snapshot_stale(shared_db):
+    ticket_id = db.add_ticket("Ann", "Printer offline", "The printer shows offline after the update.")
+    kb_id = db.add_kb_entry("Restart the spooler", "Restart the print spooler service.")
+    assert db.update_kb_embedding(kb_id, [1.0, 0.0], MODEL)
+
+    # This worker's wiring, as in main.py
+    feed = ChangeFeed()
+    feed.on("ticket", lambda change: db.note_ticket_changed(change['entity_id']))
+    feed.on("kb", lambda change: kb_index.invalidate_kb_index())
+
+    async def run():
+        assert await feed.poll_once() == 0 # Sets the start
+        cache = ReadCache("test")
+        cache.put(ticket_id, db.ticket_version(ticket_id), b'{"status": "Open"}')
+        cache.put("list", db.tickets_list_version(), b'[]')
+        snapshot = await kb_index.get_kb_index(MODEL)
+        assert len(snapshot) == 1
+
+        write_in_other_worker(
+            f"assert db.update_ticket_status({ticket_id}, 'Resolved')\n"
+            f"kb_id = db.add_kb_entry('Reinstall the driver', 'Remove and reinstall the printer driver.')\n"
+            f"assert db.update_kb_embedding(kb_id, [0.0, 1.0], {MODEL!r})\n"
+        )
+        # Nothing in this process saw the write yet
+        assert cache.get(ticket_id, db.ticket_version(ticket_id)) is not None
+        assert await kb_index.get_kb_index(MODEL) is snapshot
+
+        assert await feed.poll_once() == 2 # One ticket, one KB entry (its two changes coalesce)
+        assert cache.get(ticket_id, db.ticket_version(ticket_id)) is None
+        assert cache.get("list", db.tickets_list_version()) is None
+        reloaded = await kb_index.get_kb_index(MODEL)
+        assert reloaded is not snapshot and reloaded.version != snapshot.version and len(reloaded) == 2
+
+        db.update_ticket_status(ticket_id, "Open") # This worker's own writes are not dispatched back to it
+        assert await feed.poll_once() == 0
+
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+# backend/tests/test_ticket_archive.py
+
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import auth
+from backend.apis import tickets_api
+from backend.database import database_manager as db
+
+
+@pytest.fixture
+def archive_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "tickets.db"))
+    monkeypatch.setattr(db, "ARCHIVE_DATABASE_PATH", "") # Next to DATABASE_PATH: tickets_archive.db
+    db.init_db()
+    return tmp_path
+
+
+def add_resolved_ticket(name: str, resolved_at: str) -> int:
+    ticket_id = db.add_ticket(name, f"Issue from {name}", "Something does not work at all.")
+    assert db.update_ticket_status(ticket_id, "Resolved")
+    with sqlite3.connect(db.DATABASE_PATH) as conn:
+        conn.execute("UPDATE tickets SET resolved_at = ? WHERE id = ?", (resolved_at, ticket_id))
+    return ticket_id
+
+
+def hot_ids() -> set:
+    with sqlite3.connect(db.DATABASE_PATH) as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM tickets")}
+
+
+def archived_rows() -> dict:
+    with sqlite3.connect(db.archive_database_path()) as conn:
+        return {row[0]: row[1:] for row in conn.execute("SELECT id, customer_name, archived_at FROM tickets")}
+
+
+def test_archival_moves_only_old_resolved_tickets_and_is_idempotent(archive_db):
+    old = [add_resolved_ticket(f"Old {i}", "2020-01-0%d 00:00:00" % (i + 1)) for i in range(3)]
+    recent = add_resolved_ticket("Recent", "2999-01-01 00:00:00") # Resolved, but not before the cutoff
+    still_open = db.add_ticket("Open", "Still broken", "Nothing has changed yet.")
+
+    assert db.archive_tickets(30, batch_size=2) == 3 # Two batches
+    assert hot_ids() == {recent, still_open}
+    archived = archived_rows()
+    assert set(archived) == set(old)
+    assert all(archived_at for _, archived_at in archived.values())
+
+    assert db.archive_tickets(30, batch_size=2) == 0 # Nothing left to move
+    assert hot_ids() == {recent, still_open} and archived_rows() == archived
+
+
+def test_archived_ticket_is_still_readable_and_read_only(archive_db):
+    ticket_id = add_resolved_ticket("Ann", "2020-01-01 00:00:00")
+    assert db.archive_tickets(30) == 1
+
+    ticket = db.get_ticket(ticket_id)
+    assert ticket["customer_name"] == "Ann" and ticket["status"] == "Resolved" and ticket["archived_at"]
+
+    app = FastAPI()
+    app.include_router(tickets_api.router)
+    app.dependency_overrides[auth.get_current_active_user] = lambda: {"username": "tester", "is_active": True}
+    with TestClient(app) as client:
+        assert client.patch(f"/tickets/{ticket_id}/status", json={"status": "Open"}).status_code == 409
+        assert client.patch(f"/tickets/{ticket_id}/assignment", json={"team": "Technical"}).status_code == 409
+        assert client.patch(f"/tickets/{ticket_id + 1000}/status", json={"status": "Open"}).status_code == 404
+    assert db.get_ticket(ticket_id)["status"] == "Resolved"
@@ -0,0 +1,67 @@
+# backend/tests/test_ticket_stats.py
+
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import auth
+from backend.apis import tickets_api
+from backend.database import database_manager as db
+
+
+@pytest.fixture
+def stats_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "stats.db"))
+    monkeypatch.setattr(db, "ARCHIVE_DATABASE_PATH", "")
+    db.init_db()
+    return tmp_path
+
+
+def ticket_stats() -> list:
+    # Rows whose count went back to zero are kept by the triggers (and ignored by readers); rebuilds don't create them
+    with sqlite3.connect(db.DATABASE_PATH) as conn:
+        rows = conn.execute("SELECT bucket, dimension, value, ticket_count, resolution_seconds FROM ticket_stats "
+                            "WHERE ticket_count != 0 ORDER BY bucket, dimension, value").fetchall()
+    return [(bucket, dimension, value, count, round(seconds, 3)) for bucket, dimension, value, count, seconds in rows]
+
+
+def test_trigger_maintained_stats_match_a_rebuild(stats_db):
+    ids = [db.add_ticket(f"Customer {i}", f"Issue {i}", "Something does not work at all.",
+                         priority=["Low", "Medium", "High"][i % 3]) for i in range(9)]
+    with sqlite3.connect(db.DATABASE_PATH) as conn: # Spread the tickets over several hours
+        conn.executemany("UPDATE tickets SET created_at = ? WHERE id = ?",
+                         [(f"2024-05-01 {8 + i % 4:02d}:15:00", ticket_id) for i, ticket_id in enumerate(ids)])
+
+    assert db.update_ticket_assignment(ids[0], None, "Technical")
+    assert db.update_ticket_assignment(ids[1], None, "Billing")
+    assert db.update_ticket_assignment(ids[0], None, "Billing") # Re-assigned
+    assert db.update_ticket_status(ids[2], "In Progress")
+    for ticket_id in ids[3:7]:
+        assert db.update_ticket_status(ticket_id, "Resolved")
+    assert db.update_ticket_status(ids[3], "Open") # Re-opened (resolved_at stays)
+    with sqlite3.connect(db.DATABASE_PATH) as conn:
+        conn.execute("UPDATE tickets SET priority = 'Urgent' WHERE id = ?", (ids[4],))
+        conn.execute("UPDATE tickets SET resolved_at = '2020-01-01 00:00:00' WHERE id IN (?, ?)", (ids[5], ids[6]))
+        conn.execute("UPDATE tickets SET resolved_at = '2024-05-02 10:00:00' WHERE id = ?", (ids[5],)) # Moved again
+        conn.execute("DELETE FROM tickets WHERE id IN (?, ?)", (ids[7], ids[1]))
+    assert db.archive_tickets(30) == 2 # ids[5] and ids[6]; archived tickets keep counting
+
+    maintained = ticket_stats()
+    assert maintained
+    assert db.rebuild_ticket_stats()
+    assert ticket_stats() == maintained
+
+
+def test_stats_route_is_not_taken_for_a_ticket_id(stats_db):
+    db.add_ticket("Ann", "Printer offline", "The printer shows offline after the update.", priority="High")
+    app = FastAPI()
+    app.include_router(tickets_api.router)
+    app.dependency_overrides[auth.get_current_active_user] = lambda: {"username": "tester", "is_active": True}
+    with TestClient(app) as client:
+        response = client.get("/tickets/stats", params={"hours": 2})
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["total"] == 1 and stats["by_priority"] == {"High": 1} and len(stats["hourly"]) == 2
+        assert client.get("/tickets/1").json()["subject"] == "Printer offline"
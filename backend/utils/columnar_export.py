@@ -0,0 +1,305 @@
+# backend/utils/columnar_export.py
+"""
+Columnar export of tickets and KB rows for analytics and model training (Parquet or Arrow IPC files), so those
+jobs read files instead of the live database.
+
+- Rows are streamed from a read-only connection in chunks of plain tuples (no per-row dicts) and written as one
+  row group / record batch per chunk, so memory stays bounded by the chunk size.
+- Typed columns: timestamps (ms, the coarsest unit Parquet keeps), dictionary-encoded status/priority/team,
+  extracted_actions as list<string>, KB embeddings as fixed_size_list<float32>[dim] for one embedding model.
+- Incremental: tickets are exported by (updated_at, id) watermark, including archived ones; every run writes a
+  new part file holding the tickets created or changed since the previous run (readers keep the latest row per
+  id; archive_tickets moves updated_at to the archival time, so the latest row carries archived=true). The KB
+  file of each embedding model is re-exported in full only when a KB change was logged since that model's last
+  export (change_log 'kb' sequence). Watermarks are kept in <output>/_export_state.json.
+
+pyarrow is optional and only imported when exporting.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.database import database_manager as db
+from backend.utils.ollama_integration import EMBEDDING_MODEL
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+# Rows changed within the last seconds wait for the next run: updated_at has one-second resolution, so the
+# watermark only ever advances over seconds that can no longer receive changes
+EXPORT_SETTLE_SECONDS = 2
+# --- End Configuration ---
+
+STATE_FILE = "_export_state.json"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TICKET_COLUMNS = ["id", "customer_name", "customer_email", "subject", "body", "status", "priority", "assigned_agent_id",
+                  "assigned_team", "created_at", "updated_at", "resolved_at", "summary", "extracted_actions",
+                  "predicted_resolution_time", "resolution_details", "feedback_rating", "feedback_comment"]
+KB_COLUMNS = ["id", "title", "content", "keywords", "source_ticket_id", "created_at", "success_rate", "usage_count",
+              "helpful_count", "embedding_model", "embedding_dim", "duplicate_count", "embedding"]
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError as e:
+        raise RuntimeError("Columnar export needs pyarrow (pip install pyarrow).") from e
+    return pa, pc
+
+
+@dataclass
+class ExportStats:
+    tickets: int = 0
+    kb_entries: int = 0
+    files: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def ticket_schema(pa):
+    text, category = pa.string(), pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.int64()), ("customer_name", text), ("customer_email", text), ("subject", text), ("body", text),
+        ("status", category), ("priority", category), ("assigned_agent_id", pa.int64()), ("assigned_team", category),
+        ("created_at", pa.timestamp("ms")), ("updated_at", pa.timestamp("ms")), ("resolved_at", pa.timestamp("ms")),
+        ("summary", text), ("extracted_actions", pa.list_(text)), ("predicted_resolution_time", pa.int32()),
+        ("resolution_details", text), ("feedback_rating", pa.int8()), ("feedback_comment", text),
+        ("archived", pa.bool_()),
+    ])
+
+
+def kb_schema(pa, dim: int):
+    return pa.schema([
+        ("id", pa.int64()), ("title", pa.string()), ("content", pa.string()), ("keywords", pa.string()),
+        ("source_ticket_id", pa.int64()), ("created_at", pa.timestamp("ms")), ("success_rate", pa.float32()),
+        ("usage_count", pa.int64()), ("helpful_count", pa.int64()), ("embedding_model", pa.dictionary(pa.int32(), pa.string())),
+        ("embedding_dim", pa.int32()), ("duplicate_count", pa.int32()),
+        ("embedding", pa.list_(pa.float32(), dim)), # Fixed-size list: one contiguous float32 buffer
+    ])
+
+
+def _timestamps(pa, pc, values: List[Optional[str]]):
+    # SQLite stores 'YYYY-MM-DD HH:MM:SS' text; anything unparseable becomes null rather than failing the export
+    return pc.strptime(pa.array(values, pa.string()), format=TIMESTAMP_FORMAT, unit="ms", error_is_null=True)
+
+
+def _actions(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    try:
+        actions = json.loads(value)
+    except ValueError:
+        return None
+    return [str(action) for action in actions] if isinstance(actions, list) else None
+
+
+def _ticket_batch(pa, pc, schema, rows: List[tuple]):
+    columns = list(zip(*rows))
+    by_name = dict(zip(TICKET_COLUMNS + ["archived"], columns))
+    arrays = []
+    for column in schema:
+        values = list(by_name[column.name])
+        if pa.types.is_timestamp(column.type):
+            arrays.append(_timestamps(pa, pc, values))
+        elif column.name == "extracted_actions":
+            arrays.append(pa.array([_actions(v) for v in values], column.type))
+        elif pa.types.is_dictionary(column.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        elif pa.types.is_boolean(column.type):
+            arrays.append(pa.array([bool(v) for v in values], column.type)) # SQLite yields 0/1
+        else:
+            arrays.append(pa.array(values, column.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _kb_batch(pa, pc, schema, rows: List[tuple], dim: int):
+    by_name = dict(zip(KB_COLUMNS, zip(*rows)))
+    flat = np.zeros((len(rows), dim), dtype=np.float32)
+    valid = np.zeros(len(rows), dtype=bool)
+    for i, blob in enumerate(by_name["embedding"]):
+        if blob is None:
+            continue
+        try:
+            vector = np.asarray(json.loads(blob), dtype=np.float32) # serialize_embedding's JSON text
+        except (ValueError, TypeError):
+            continue
+        if vector.shape == (dim,):
+            flat[i], valid[i] = vector, True
+    if dim:
+        embeddings = pa.FixedSizeListArray.from_arrays(pa.array(flat.reshape(-1)), dim, mask=pa.array(~valid))
+    else: # Nothing embedded with this model yet: arrow rejects a zero list size, so the column is all null
+        embeddings = pa.nulls(len(rows), schema.field("embedding").type)
+    arrays = []
+    for column in schema:
+        if column.name == "embedding":
+            arrays.append(embeddings)
+        elif pa.types.is_timestamp(column.type):
+            arrays.append(_timestamps(pa, pc, list(by_name[column.name])))
+        elif pa.types.is_dictionary(column.type):
+            arrays.append(pa.array(list(by_name[column.name]), pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(list(by_name[column.name]), column.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _PartWriter:
+    """Writes record batches to <path>.tmp and renames it into place on close, so readers never see partial files."""
+    def __init__(self, pa, path: str, schema, file_format: str):
+        self.path = path
+        self.rows = 0
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path + ".tmp", schema, compression="zstd")
+            self._write = self._writer.write_batch
+        else:
+            self._sink = pa.OSFile(path + ".tmp", "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+            self._write = self._writer.write_batch
+
+    def write(self, batch) -> None:
+        self._write(batch)
+        self.rows += batch.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+def _read_connection() -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{db.DATABASE_PATH}?mode=ro", uri=True)
+    if os.path.exists(db.archive_database_path()):
+        conn.execute("ATTACH DATABASE ? AS archive", (f"file:{db.archive_database_path()}?mode=ro",))
+    return conn
+
+
+def _has_archive(conn: sqlite3.Connection) -> bool:
+    return bool(conn.execute("SELECT 1 FROM pragma_database_list WHERE name = 'archive'").fetchone()
+                and conn.execute("SELECT 1 FROM archive.sqlite_master WHERE type = 'table' AND name = 'tickets'").fetchone())
+
+
+def _ticket_chunks(conn: sqlite3.Connection, after: Tuple[str, int], chunk_rows: int) -> Iterator[List[tuple]]:
+    """Tickets (hot and archived) with (updated_at, id) > after and updated_at settled, in watermark order."""
+    columns = ", ".join(TICKET_COLUMNS)
+    source = f"SELECT {columns}, 0 AS archived FROM main.tickets"
+    if _has_archive(conn):
+        source += f" UNION ALL SELECT {columns}, 1 AS archived FROM archive.tickets"
+    query = (f"SELECT * FROM ({source}) WHERE (updated_at, id) > (?, ?) "
+             f"AND updated_at < datetime('now', '-{EXPORT_SETTLE_SECONDS} seconds') ORDER BY updated_at, id LIMIT ?")
+    while True:
+        rows = conn.execute(query, (after[0], after[1], chunk_rows)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+        after = (last[TICKET_COLUMNS.index("updated_at")], last[0])
+        if len(rows) < chunk_rows:
+            return
+
+
+def _kb_chunks(conn: sqlite3.Connection, model: str, chunk_rows: int) -> Iterator[List[tuple]]:
+    # The embedding only for rows embedded by `model`; keyset-paginated by id
+    columns = ", ".join(KB_COLUMNS[:-1])
+    query = (f"SELECT {columns}, CASE WHEN embedding_model = ? THEN embedding END FROM knowledge_base "
+             "WHERE canonical_id IS NULL AND id > ? ORDER BY id LIMIT ?")
+    after = 0
+    while True:
+        rows = conn.execute(query, (model, after, chunk_rows)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1][0]
+
+
+def load_state(output_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(output_dir: str, state: Dict[str, Any]) -> None:
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export_tickets(output_dir: str, file_format: str = "parquet", chunk_rows: int = EXPORT_CHUNK_ROWS,
+                   full: bool = False) -> ExportStats:
+    """
+    Writes tickets changed since the last export (all of them with full=True, which also resets the watermark)
+    to <output_dir>/tickets/part-<time>.<ext>; no file when nothing changed.
+    """
+    pa, pc = _pyarrow()
+    stats, started = ExportStats(), time.perf_counter()
+    state = {} if full else load_state(output_dir)
+    watermark = state.get("tickets", {"updated_at": "", "id": 0})
+    schema = ticket_schema(pa)
+    path = os.path.join(output_dir, "tickets", f"part-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}{FORMATS[file_format]}")
+    writer = None
+    with closing(_read_connection()) as conn:
+        for rows in _ticket_chunks(conn, (watermark["updated_at"], watermark["id"]), chunk_rows):
+            if writer is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                writer = _PartWriter(pa, path, schema, file_format)
+            writer.write(_ticket_batch(pa, pc, schema, rows))
+            last = rows[-1]
+            watermark = {"updated_at": last[TICKET_COLUMNS.index("updated_at")], "id": last[0]}
+    if writer is not None:
+        writer.close() # Before the watermark moves: a failed run is simply repeated
+        stats.tickets, stats.files = writer.rows, [path]
+        state["tickets"] = watermark
+        _save_state(output_dir, state)
+    stats.seconds = time.perf_counter() - started
+    log.info(f"Exported {stats.tickets} tickets to {output_dir} in {stats.seconds:.1f}s (watermark {watermark}).")
+    return stats
+
+
+def export_kb(output_dir: str, file_format: str = "parquet", model: str = EMBEDDING_MODEL,
+              chunk_rows: int = EXPORT_CHUNK_ROWS, full: bool = False) -> ExportStats:
+    """
+    Writes all canonical KB rows, with `model`'s embeddings as a fixed-size list column, to
+    <output_dir>/kb/<model>.<ext>; skipped unless the KB changed since the last export (or full=True).
+    """
+    pa, pc = _pyarrow()
+    stats, started = ExportStats(), time.perf_counter()
+    state = load_state(output_dir)
+    kb_seq = db.get_change_seq("kb")
+    exported = state.get("kb", {})
+    if "model" in exported: # Older state files kept a single model's entry
+        exported = {exported["model"]: exported}
+    if not full and exported.get(model, {}).get("change_seq") == kb_seq:
+        log.info(f"KB unchanged since the last export for model '{model}'; skipped.")
+        return stats
+    with closing(_read_connection()) as conn:
+        row = conn.execute(
+            "SELECT embedding_dim FROM knowledge_base WHERE embedding_model = ? AND canonical_id IS NULL AND embedding_dim IS NOT NULL "
+            "GROUP BY embedding_dim ORDER BY COUNT(*) DESC LIMIT 1", (model,)).fetchone()
+        dim = row[0] if row else 0
+        schema = kb_schema(pa, dim)
+        path = os.path.join(output_dir, "kb", f"{model.replace(':', '_').replace('/', '_')}{FORMATS[file_format]}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writer = _PartWriter(pa, path, schema, file_format)
+        for rows in _kb_chunks(conn, model, chunk_rows):
+            writer.write(_kb_batch(pa, pc, schema, rows, dim))
+        writer.close()
+    stats.kb_entries, stats.files = writer.rows, [path]
+    exported[model] = {"change_seq": kb_seq, "dim": dim}
+    state["kb"] = exported
+    _save_state(output_dir, state)
+    stats.seconds = time.perf_counter() - started
+    log.info(f"Exported {stats.kb_entries} KB entries ({model}, dim {dim}) to {path} in {stats.seconds:.1f}s.")
+    return stats
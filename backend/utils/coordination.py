@@ -0,0 +1,158 @@
+# backend/utils/coordination.py
+"""
+Coordination between server worker processes (scripts/run_server.py) sharing one SQLite database.
+
+Each worker keeps its own caches (read caches, KB indexes, event subscribers). Writes made through
+database_manager append change_log rows; ChangeFeed polls them and runs the handlers registered for each topic
+for changes made by *other* processes, so a worker drops or refreshes what another worker's writes made stale.
+file_lock / acquire_singleton keep once-per-host work (building a KB snapshot, background re-embedding) to one
+worker at a time.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError: # Windows: single-process deployments only, locks are no-ops
+    fcntl = None
+
+from backend.database import database_manager as db
+from backend.utils.metrics import CHANGE_FEED_APPLIED
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", "0.5")) # Upper bound on cross-worker staleness
+CHANGE_FEED_BATCH_SIZE = int(os.getenv("CHANGE_FEED_BATCH_SIZE", "1000"))
+CHANGE_LOG_KEEP_ROWS = int(os.getenv("CHANGE_LOG_KEEP_ROWS", "10000"))
+CHANGE_LOG_PRUNE_SECONDS = float(os.getenv("CHANGE_LOG_PRUNE_SECONDS", "300"))
+# --- End Configuration ---
+
+ChangeHandler = Callable[[Dict[str, Any]], Any] # Receives the change_log row; may be a coroutine function
+
+
+def lock_path(name: str) -> str:
+    """Lock files live next to the database, which is what the workers share."""
+    return os.path.join(os.path.dirname(os.path.abspath(db.DATABASE_PATH)), f".{name}.lock")
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Exclusive advisory lock across processes on this host (blocking)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+_singleton_handles: Dict[str, Any] = {}
+
+
+def acquire_singleton(name: str) -> bool:
+    """
+    True in exactly one process per host for `name` (held until the process exits), e.g. so only one worker
+    runs background re-embedding. Always True without fcntl.
+    """
+    if fcntl is None or name in _singleton_handles:
+        return True
+    handle = open(lock_path(name), "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _singleton_handles[name] = handle
+    return True
+
+
+class ChangeFeed:
+    """
+    Polls change_log and dispatches other processes' changes to handlers by topic. Changes to the same entity
+    within one poll are dispatched once (handlers re-read current state anyway). Handler errors are logged and
+    do not stop the feed.
+    """
+    def __init__(self, poll_seconds: float = CHANGE_FEED_POLL_SECONDS, batch_size: int = CHANGE_FEED_BATCH_SIZE):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.last_seq: Optional[int] = None
+        self._handlers: Dict[str, List[ChangeHandler]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+
+    def on(self, topic: str, handler: ChangeHandler) -> None:
+        if handler not in self._handlers[topic]:
+            self._handlers[topic].append(handler)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def poll_once(self) -> int:
+        """Dispatches changes since the last poll; returns how many were dispatched. The first call only sets the start."""
+        if self.last_seq is None:
+            self.last_seq = await asyncio.to_thread(db.get_change_seq) # Caches start empty: nothing older matters
+            return 0
+        changes = await asyncio.to_thread(db.get_changes_since, self.last_seq, self.batch_size)
+        if not changes:
+            return 0
+        self.last_seq = changes[-1]['seq']
+        origin = db.change_origin()
+        seen = set()
+        dispatched = 0
+        for change in changes:
+            key = (change['topic'], change['entity_id'])
+            if change['origin'] == origin or key in seen:
+                continue
+            seen.add(key)
+            await self.dispatch(change)
+            dispatched += 1
+        return dispatched
+
+    async def dispatch(self, change: Dict[str, Any]) -> None:
+        """
+        Runs the handlers for one change made elsewhere: a change_log row, or a change pushed by another source
+        (PostgreSQL notifications; see postgres_storage.py) with the same topic/entity_id/kind keys.
+        """
+        for handler in self._handlers.get(change['topic'], ()):
+            try:
+                result = handler(change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.error(f"Change feed handler for topic '{change['topic']}' failed: {e}", exc_info=True)
+        CHANGE_FEED_APPLIED.inc(topic=change['topic'])
+
+    async def _run(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            try:
+                if await self.poll_once() == 0:
+                    await asyncio.sleep(self.poll_seconds)
+                if time.monotonic() - last_prune >= CHANGE_LOG_PRUNE_SECONDS:
+                    last_prune = time.monotonic()
+                    await asyncio.to_thread(db.prune_change_log, CHANGE_LOG_KEEP_ROWS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e: # e.g. database locked: retry on the next tick
+                log.error(f"Change feed poll failed: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_seconds)
+
+
+change_feed = ChangeFeed()
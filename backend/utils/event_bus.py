@@ -0,0 +1,84 @@
+# backend/utils/event_bus.py
+"""
+In-process publish/subscribe for change notifications (ticket events pushed to WebSocket clients).
+Publishing never blocks: each subscriber has a bounded queue, and a subscriber that falls behind gets its
+backlog replaced by a single RESYNC marker, telling it to refetch instead of replaying every change.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Optional, Set
+
+from backend.utils.metrics import EVENTS_PUBLISHED, EVENT_RESYNCS
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256")) # Per subscriber
+# --- End Configuration ---
+
+RESYNC = object() # Queued in place of a dropped backlog
+
+
+class Subscription:
+    """One consumer's queue. `accepts` decides which events are queued; it can be replaced while subscribed."""
+    def __init__(self, bus: "EventBus", accepts: Optional[Callable[[Any], bool]] = None, max_queued: int = EVENT_QUEUE_SIZE):
+        self.bus = bus
+        self.accepts = accepts
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    def offer(self, event: Any) -> None:
+        if self.accepts is not None and not self.accepts(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            EVENT_RESYNCS.inc(topic=self.bus.topic)
+
+    async def get(self) -> Any:
+        """Next event, or RESYNC after events were dropped."""
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EventBus:
+    """
+    Fan-out of events to subscriptions. Events are delivered as published (callers encode them once, not per
+    subscriber). Not thread-safe: publish and subscribe from the event loop thread.
+    """
+    def __init__(self, topic: str):
+        self.topic = topic
+        self._subscriptions: Set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, accepts: Optional[Callable[[Any], bool]] = None, max_queued: int = EVENT_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription(self, accepts, max_queued)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: Any, kind: str = "event") -> int:
+        """Queues `event` for every subscription that accepts it; returns the number of subscriptions offered it."""
+        EVENTS_PUBLISHED.inc(topic=self.topic, kind=kind)
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.offer(event)
+            except Exception as e: # A broken filter must not stop delivery to everyone else
+                log.error(f"Event filter failed on topic '{self.topic}': {e}", exc_info=True)
+        return len(self._subscriptions)
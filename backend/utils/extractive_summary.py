@@ -0,0 +1,131 @@
+# backend/utils/extractive_summary.py
+"""
+CPU-only summarization tier: TextRank over TF-IDF sentence vectors for the summary and keyword rules over
+the action prompt's example catalogue for the troubleshooting steps. No model calls; a typical ticket
+takes well under a millisecond, a 50k-character transcript a few milliseconds.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Example bullets shown to the LLM in the action prompt; the rule-based extractor picks from the same list
+EXAMPLE_ACTIONS = [
+    "Ask for the specific error code/message.",
+    "When did the issue start? After any updates/changes?",
+    "What are the steps to reproduce the problem?",
+    "Which operating system/device/browser is used?",
+    "Ask user to restart the device/router.",
+    "Check user's subscription/account status.",
+    "Verify payment method details.",
+    "Check server logs for related errors around [time].",
+    "Ask for a screenshot of the problem area.",
+]
+VAGUE_PROBLEM_ACTIONS = ["Ask for specific error messages displayed.", "Ask for steps to reproduce the issue."]
+
+# Catalogue entry -> keywords that make it relevant (matched as word prefixes, case-insensitive)
+_ACTION_RULES: List[Tuple[str, str]] = [
+    (EXAMPLE_ACTIONS[0], r"error|fail|crash|exception|code|warning"),
+    (EXAMPLE_ACTIONS[1], r"update|upgrad|since|after|version|suddenly|started"),
+    (EXAMPLE_ACTIONS[2], r"crash|freez|stop|hang|stuck|bug|broken|not work|doesn't work|does not work|keeps"),
+    (EXAMPLE_ACTIONS[3], r"app|install|browser|windows|mac|android|ios|iphone|phone|tablet|laptop|device|chrome|firefox|safari"),
+    (EXAMPLE_ACTIONS[4], r"network|wifi|wi-fi|router|connect|offline|internet|sync|slow"),
+    (EXAMPLE_ACTIONS[5], r"account|subscription|login|log in|sign in|password|plan|locked|access"),
+    (EXAMPLE_ACTIONS[6], r"payment|card|charge|billing|invoice|refund|checkout|paid|pay"),
+    (EXAMPLE_ACTIONS[7].replace("[time]", "the reported time"), r"timeout|timed out|server|outage|gateway|5\d\d|down"),
+    (EXAMPLE_ACTIONS[8], r"display|screen|button|page|layout|shows|blank|missing"),
+]
+_COMPILED_RULES = [(action, re.compile(rf"\b(?:{pattern})")) for action, pattern in _ACTION_RULES] # Matched on lowercased text
+MIN_ACTIONS = 4
+MAX_ACTIONS = 6
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_LABEL = re.compile(r"^\s*(subject|body|customer|user|client)\s*:\s*", re.IGNORECASE | re.MULTILINE)
+_AGENT_TURN = re.compile(r"^\s*(agent|support|assistant)\s*:", re.IGNORECASE)
+_STOPWORDS = frozenset("""
+    a an and are as at be been but by can could did do does for from had has have hi hello i i'm im in is it it's its
+    me my of on or our please so that the their them then there this to too was we were what when which will with
+    would you your thanks thank just also am been get got
+""".split())
+# Bounds the cost on long transcripts: only the first and last MAX_SCAN_CHARS / 2 characters are read, and at
+# most MAX_SENTENCES of those are scored. The problem is stated at the start, the outcome at the end.
+MAX_SCAN_CHARS = 16000
+MAX_SENTENCES = 300
+DAMPING = 0.85
+
+
+def _scan_window(text: str) -> str:
+    if len(text) <= MAX_SCAN_CHARS:
+        return text
+    return text[:MAX_SCAN_CHARS // 2] + "\n" + text[-MAX_SCAN_CHARS // 2:]
+
+
+def _sentences(text: str) -> List[str]:
+    text = _LABEL.sub("", _scan_window(text))
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if len(s.strip()) > 3]
+    # The customer's problem is in the customer's turns; agent turns only help when there is nothing else
+    customer = [s for s in sentences if not _AGENT_TURN.match(s)]
+    sentences = customer or sentences
+    if len(sentences) > MAX_SENTENCES:
+        sentences = sentences[:MAX_SENTENCES // 2] + sentences[-MAX_SENTENCES // 2:]
+    return sentences
+
+
+def _tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            if word not in _STOPWORDS:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    matrix = np.zeros((len(sentences), max(1, len(vocabulary))), dtype=np.float32)
+    np.add.at(matrix, (rows, cols), 1.0)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(sentences)) / (1 + document_frequency)) + 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _terminated(sentence: str) -> str:
+    # Subject lines and chat turns often lack a full stop; without one, joined sentences run together
+    return sentence if sentence[-1] in ".!?" else sentence + "."
+
+
+def extractive_summary(text: str, max_sentences: int = 2, max_chars: int = 400) -> str:
+    """
+    The max_sentences most central sentences (TextRank over TF-IDF cosine similarity), in their original order.
+    Earlier sentences get a small boost: tickets and chats usually state the problem first.
+    """
+    sentences = _sentences(text or "")
+    if len(sentences) <= max_sentences:
+        return " ".join(map(_terminated, sentences))[:max_chars]
+    vectors = _tfidf_matrix(sentences)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.zeros_like(similarity), where=out_weight > 0)
+    count = len(sentences)
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(30):
+        updated = (1 - DAMPING) / count + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-4:
+            scores = updated
+            break
+        scores = updated
+    scores = scores * (1.0 + 0.5 / (1.0 + np.arange(count)))
+    chosen = sorted(np.argsort(-scores, kind="stable")[:max_sentences])
+    return " ".join(_terminated(sentences[i]) for i in chosen)[:max_chars]
+
+
+def rule_based_actions(text: str, max_actions: int = MAX_ACTIONS) -> List[str]:
+    """Catalogue actions whose keywords occur in text, in catalogue order, padded with the vague-problem defaults."""
+    window = _scan_window(text or "").lower()
+    actions = [action for action, pattern in _COMPILED_RULES if pattern.search(window)][:max_actions]
+    for default in VAGUE_PROBLEM_ACTIONS:
+        if len(actions) >= MIN_ACTIONS:
+            break
+        actions.append(default)
+    return actions
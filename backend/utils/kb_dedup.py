@@ -0,0 +1,191 @@
+# backend/utils/kb_dedup.py
+
+import hashlib
+import logging
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from backend.database import database_manager as db
+from backend.utils.ollama_integration import deserialize_embedding, EMBEDDING_MODEL
+
+log = logging.getLogger(__name__)
+
+# --- MinHash / LSH parameters ---
+# Signatures are stored in the database, so changing any of these requires a full re-sign (dedupe_kb.py --resign).
+NUM_PERM = 128
+LSH_BANDS = 16 # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket, pairs below ~0.4 rarely do
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3 # Word n-grams
+DEFAULT_JACCARD_THRESHOLD = 0.8 # Estimated Jaccard similarity at which two KB entries are merged
+
+_HASH_PRIME = (1 << 32) + 15
+_rng = np.random.default_rng(20240517) # Fixed seed: stored signatures must stay comparable across runs
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class DedupStats:
+    examined: int = 0   # Canonical rows whose signature was missing or stale
+    indexed: int = 0    # Rows kept as canonical entries and added to the LSH index
+    merged: int = 0     # Rows merged into a near-duplicate canonical entry
+    skipped: int = 0    # Rows with no usable text
+    failed: int = 0     # Rows in batches whose database write failed
+    candidates: int = 0 # Signature comparisons made (stays proportional to bucket sizes, not KB size)
+    started_at: float = field(default_factory=time.monotonic)
+
+
+def shingles(text: str) -> Set[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """NUM_PERM uint32 MinHash values of the text's word shingles, or None if it has no words."""
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    # (a * h + b) mod p with a, b < 2^31 and h < 2^32 cannot overflow uint64
+    values = (np.outer(hashes, _PERM_A) + _PERM_B) % _HASH_PRIME
+    return (values.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def lsh_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket id per band; the band number is part of the hash so buckets never collide across bands."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        digest = hashlib.blake2b(
+            band.to_bytes(2, 'little') + signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _dedup_text(row: Dict[str, Any]) -> str:
+    return f"{row.get('title') or ''}\n{row.get('content') or ''}"
+
+
+def _unit_vector(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    vector = deserialize_embedding(blob)
+    if not vector:
+        return None
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else None
+
+
+def dedupe_kb_rows(
+    rows: List[Dict[str, Any]],
+    stats: Optional[DedupStats] = None,
+    threshold: float = DEFAULT_JACCARD_THRESHOLD,
+    embedding_threshold: Optional[float] = None,
+    model: str = EMBEDDING_MODEL,
+) -> DedupStats:
+    """
+    Deduplicates a batch of canonical KB rows (as returned by db.get_kb_dedup_rows_*) against the LSH index
+    and against each other, then writes signatures and merges in one transaction.
+
+    Each row only looks up its LSH_BANDS buckets, so the cost per row depends on bucket sizes, not on KB size.
+    A candidate is a near-duplicate when its estimated Jaccard similarity reaches `threshold`. With
+    `embedding_threshold` set, candidates below that but whose current `model` embeddings have at least this
+    cosine similarity are merged too (paraphrases that share some wording but not most of it).
+    Rows whose signature is already up to date are ignored.
+    """
+    stats = stats or DedupStats()
+    pending = []
+    for row in rows:
+        content_hash = db.kb_content_hash(row.get('title'), row.get('content'))
+        if row.get('minhash_content_hash') == content_hash:
+            continue
+        stats.examined += 1
+        signature = minhash_signature(_dedup_text(row))
+        if signature is None:
+            stats.skipped += 1
+            continue
+        embedding = None
+        if embedding_threshold is not None and row.get('embedding_content_hash') == content_hash:
+            embedding = _unit_vector(row.get('embedding'))
+        pending.append((row['id'], content_hash, signature, lsh_buckets(signature), embedding))
+    if not pending:
+        return stats
+
+    pending_ids = {kb_id for kb_id, *_ in pending}
+    bucket_members: Dict[int, List[int]] = {}
+    signatures: Dict[int, np.ndarray] = {}
+    embeddings: Dict[int, Optional[np.ndarray]] = {}
+    all_buckets = list({bucket for *_, buckets, _ in pending for bucket in buckets})
+    for candidate in db.get_kb_lsh_candidates(all_buckets, embedding_model=model if embedding_threshold is not None else None):
+        if candidate['kb_id'] in pending_ids: # Its stored signature is stale; it is re-indexed below if it stays canonical
+            continue
+        bucket_members.setdefault(candidate['bucket'], []).append(candidate['kb_id'])
+        if candidate['kb_id'] not in signatures:
+            signatures[candidate['kb_id']] = np.frombuffer(candidate['signature'], dtype=np.uint32)
+            embeddings[candidate['kb_id']] = _unit_vector(candidate['embedding']) if embedding_threshold is not None else None
+
+    indexed, merges = [], []
+    for kb_id, content_hash, signature, buckets, embedding in pending:
+        candidate_ids = {other for bucket in buckets for other in bucket_members.get(bucket, ())}
+        stats.candidates += len(candidate_ids)
+        best_id, best_similarity = None, 0.0
+        for other in candidate_ids:
+            similarity = estimate_jaccard(signature, signatures[other])
+            if similarity >= threshold and similarity > best_similarity:
+                best_id, best_similarity = other, similarity
+        if best_id is None and embedding is not None:
+            for other in candidate_ids:
+                other_embedding = embeddings.get(other)
+                if other_embedding is not None and other_embedding.shape == embedding.shape:
+                    cosine = float(other_embedding @ embedding)
+                    if cosine >= embedding_threshold and cosine > best_similarity:
+                        best_id, best_similarity = other, cosine
+
+        if best_id is not None:
+            merges.append((kb_id, best_id))
+            continue
+        # Stays canonical: later rows in this batch can merge into it
+        indexed.append((kb_id, content_hash, signature.tobytes(), buckets))
+        signatures[kb_id] = signature
+        embeddings[kb_id] = embedding
+        for bucket in buckets:
+            bucket_members.setdefault(bucket, []).append(kb_id)
+
+    if db.apply_kb_dedup(indexed, merges):
+        stats.indexed += len(indexed)
+        stats.merged += len(merges)
+    else:
+        stats.failed += len(indexed) + len(merges)
+    return stats
+
+
+def dedupe_kb(
+    threshold: float = DEFAULT_JACCARD_THRESHOLD,
+    embedding_threshold: Optional[float] = None,
+    model: str = EMBEDDING_MODEL,
+    page_size: int = 1000,
+) -> DedupStats:
+    """Full pass over the KB in id order: signs every canonical entry that has no current signature and merges near-duplicates."""
+    stats = DedupStats()
+    after_id = 0
+    while True:
+        rows = db.get_kb_dedup_rows_page(after_id, page_size, embedding_model=model if embedding_threshold is not None else None)
+        if not rows:
+            break
+        dedupe_kb_rows(rows, stats, threshold=threshold, embedding_threshold=embedding_threshold, model=model)
+        after_id = rows[-1]['id']
+        log.info(f"Dedup progress: {stats.examined} examined, {stats.merged} merged, {stats.indexed} indexed (up to KB ID {after_id})")
+    log.info(f"KB dedup finished in {time.monotonic() - stats.started_at:.1f}s: {stats.merged} merged into "
+             f"near-duplicates, {stats.indexed} indexed, {stats.skipped} skipped, {stats.failed} failed.")
+    return stats
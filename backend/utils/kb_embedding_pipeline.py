@@ -0,0 +1,314 @@
+# backend/utils/kb_embedding_pipeline.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.database import database_manager as db
+from backend.utils.llm_gateway import llm_lane, Lane
+from backend.utils.ollama_integration import get_ollama_embeddings_batch, EMBEDDING_MODEL
+from backend.utils.kb_index import invalidate_kb_index
+
+log = logging.getLogger(__name__)
+
+# Checkpoint lives next to the database file so it follows whichever DB is in use
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(db.DATABASE_PATH), 'kb_embeddings.checkpoint.json')
+
+
+class EmbeddingPipelineAborted(RuntimeError):
+    """Raised when the embedding backend keeps failing and the run is stopped (checkpoint is kept)."""
+
+
+def build_kb_embedding_text(entry: Dict[str, Any]) -> str:
+    """Text sent to the embedding model for a KB row (title + content for better context)."""
+    return f"Title: {entry.get('title') or ''}\nContent: {entry.get('content') or ''}"
+
+
+def needs_embedding(entry: Dict[str, Any], model: str) -> bool:
+    """A row needs (re-)embedding if it has no vector, its vector came from another model, or its text changed."""
+    if not entry.get('has_embedding') or entry.get('embedding_model') != model:
+        return True
+    return entry.get('content_hash') != db.kb_content_hash(entry.get('title'), entry.get('content'))
+
+
+@dataclass
+class EmbeddingRunStats:
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    up_to_date: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def embeddings_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class AdaptiveBatchSizer:
+    """
+    Picks the next embedding batch size from observed batch latency.
+    Grows by ~25% while batches finish under the target, shrinks on slow batches and halves on failures.
+    """
+    def __init__(self, initial: int = 16, minimum: int = 1, maximum: int = 256, target_seconds: float = 2.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.size = min(max(initial, self.minimum), self.maximum)
+        self.target_seconds = target_seconds
+
+    def record(self, batch_len: int, duration: float, ok: bool) -> None:
+        if not ok:
+            self.size = max(self.minimum, self.size // 2)
+        elif duration > self.target_seconds:
+            self.size = max(self.minimum, int(self.size * 0.75))
+        elif batch_len >= self.size:
+            # Only grow when the batch was actually full, otherwise we learn nothing about larger sizes
+            self.size = min(self.maximum, self.size + max(1, self.size // 4))
+
+
+class EmbeddingCheckpoint:
+    """Persists the highest KB id below which every row has been handled, per embedding model."""
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+
+    def load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"Ignoring unreadable embedding checkpoint {self.path}: {e}")
+            return 0
+        if data.get('model') != self.model:
+            log.info(f"Checkpoint was written for model '{data.get('model')}', not '{self.model}'. Starting from the beginning.")
+            return 0
+        return int(data.get('last_id', 0))
+
+    def save(self, last_id: int) -> None:
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'model': self.model, 'last_id': last_id, 'saved_at': time.time()}, f)
+            os.replace(tmp_path, self.path) # Atomic swap so an interrupted write never corrupts the checkpoint
+        except OSError as e:
+            log.warning(f"Could not save embedding checkpoint to {self.path}: {e}")
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"Could not remove embedding checkpoint {self.path}: {e}")
+
+
+class _Watermark:
+    """Tracks the contiguous prefix of dispatched ids that are finished, so batches may complete out of order."""
+    def __init__(self, start: int):
+        self.value = start
+        self._pending: deque = deque()
+        self._done: Set[int] = set()
+
+    def dispatched(self, kb_id: int) -> None:
+        self._pending.append(kb_id)
+
+    def finished(self, ids: List[int]) -> None:
+        self._done.update(ids)
+        while self._pending and self._pending[0] in self._done:
+            kb_id = self._pending.popleft()
+            self._done.discard(kb_id)
+            self.value = kb_id
+
+
+async def run_embedding_pipeline(
+    model: str = EMBEDDING_MODEL,
+    *,
+    resume: bool = True,
+    checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+    read_chunk_size: int = 500,
+    queue_size: int = 256,
+    workers: int = 2,
+    initial_batch_size: int = 16,
+    max_batch_size: int = 256,
+    target_batch_seconds: float = 2.0,
+    max_consecutive_failures: int = 5,
+) -> EmbeddingRunStats:
+    """
+    Streams KB rows that need an embedding through a producer -> embedder(s) -> writer pipeline.
+
+    - The producer walks knowledge_base with a keyset cursor (id > last_id) and only queues rows that
+      `needs_embedding` for `model`: missing vectors, vectors from another model, or edited content.
+      When the embedders fall behind, `put` blocks and reading pauses (backpressure, no fixed sleeps).
+    - Embedders drain up to the adaptive batch size and call Ollama's batched embed endpoint.
+    - A single writer commits each batch in one transaction and advances the checkpoint.
+
+    The checkpoint is removed after a complete run, so rows that failed are retried on the next run.
+    """
+    stats = EmbeddingRunStats()
+    checkpoint = EmbeddingCheckpoint(checkpoint_path, model)
+    if resume:
+        start_id = checkpoint.load()
+        if start_id:
+            log.info(f"Resuming embedding run after KB ID {start_id} (checkpoint: {checkpoint_path})")
+    else:
+        checkpoint.clear()
+        start_id = 0
+
+    watermark = _Watermark(start_id)
+    sizer = AdaptiveBatchSizer(initial=initial_batch_size, maximum=max_batch_size, target_seconds=target_batch_seconds)
+    row_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=max(2, workers * 2))
+    consecutive_failures = 0
+
+    async def produce() -> None:
+        after_id = start_id
+        while True:
+            rows = await asyncio.to_thread(db.get_kb_entries_page, after_id, read_chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                after_id = row['id']
+                if not needs_embedding(row, model):
+                    stats.up_to_date += 1
+                    continue
+                watermark.dispatched(row['id'])
+                if not (row.get('title') or '').strip() and not (row.get('content') or '').strip():
+                    log.warning(f"Skipping KB ID {row['id']} due to empty title/content.")
+                    stats.skipped += 1
+                    watermark.finished([row['id']])
+                    continue
+                await row_queue.put(row)
+        for _ in range(workers):
+            await row_queue.put(None)
+
+    async def embed_rows(rows: List[Dict[str, Any]]) -> Tuple[List[Tuple[int, List[float], str]], List[int]]:
+        """Embeds a batch, splitting it in halves on failure so one bad row cannot sink its neighbours."""
+        nonlocal consecutive_failures
+        start = time.monotonic()
+        vectors = await get_ollama_embeddings_batch([build_kb_embedding_text(r) for r in rows], model=model)
+        sizer.record(len(rows), time.monotonic() - start, ok=vectors is not None)
+        if vectors is not None:
+            consecutive_failures = 0
+            return [(r['id'], v, db.kb_content_hash(r.get('title'), r.get('content'))) for r, v in zip(rows, vectors)], []
+        consecutive_failures += 1
+        if consecutive_failures >= max_consecutive_failures:
+            raise EmbeddingPipelineAborted(f"{consecutive_failures} consecutive embedding failures; stopping run.")
+        if len(rows) == 1:
+            log.error(f"Failed to generate embedding for KB ID {rows[0]['id']}")
+            return [], [rows[0]['id']]
+        mid = len(rows) // 2
+        left_ok, left_failed = await embed_rows(rows[:mid])
+        right_ok, right_failed = await embed_rows(rows[mid:])
+        return left_ok + right_ok, left_failed + right_failed
+
+    async def embed_worker() -> None:
+        done = False
+        while not done:
+            first = await row_queue.get()
+            if first is None:
+                break
+            batch = [first]
+            while len(batch) < sizer.size:
+                try:
+                    item = row_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            embedded, failed_ids = await embed_rows(batch)
+            await write_queue.put((embedded, failed_ids))
+
+    async def write_results() -> None:
+        last_report = time.monotonic()
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                break
+            embedded, failed_ids = item
+            written = await asyncio.to_thread(db.update_kb_embeddings_batch, embedded, model) if embedded else 0
+            stats.processed += written
+            stats.failed += len(failed_ids) + (len(embedded) - written)
+            watermark.finished([kb_id for kb_id, _, _ in embedded] + failed_ids)
+            checkpoint.save(watermark.value)
+            if time.monotonic() - last_report >= 5.0:
+                last_report = time.monotonic()
+                log.info(f"Embedded {stats.processed} rows ({stats.embeddings_per_second:.1f} embeddings/s, batch size {sizer.size}, checkpoint ID {watermark.value})")
+
+    async def run_embedders() -> None:
+        await asyncio.gather(*(embed_worker() for _ in range(workers)))
+        await write_queue.put(None)
+
+    tasks = [asyncio.ensure_future(produce()), asyncio.ensure_future(run_embedders()), asyncio.ensure_future(write_results())]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        checkpoint.save(watermark.value)
+        raise
+
+    checkpoint.clear()
+    return stats
+
+
+async def embed_kb_rows(rows: List[Dict[str, Any]], model: str = EMBEDDING_MODEL, sizer: Optional[AdaptiveBatchSizer] = None) -> Tuple[int, int]:
+    """
+    Embeds and stores the given KB rows that `needs_embedding`, in adaptive batches (one transaction each).
+    Used by ingestion to embed in the same pass; rows that fail stay stale and are picked up by the next pipeline run.
+    Returns (embedded, failed).
+    """
+    sizer = sizer or AdaptiveBatchSizer()
+    pending = [r for r in rows if needs_embedding(r, model)]
+    embedded = failed = 0
+    position = 0
+    while position < len(pending):
+        batch = pending[position:position + sizer.size]
+        position += len(batch)
+        start = time.monotonic()
+        vectors = await get_ollama_embeddings_batch([build_kb_embedding_text(r) for r in batch], model=model)
+        sizer.record(len(batch), time.monotonic() - start, ok=vectors is not None)
+        if vectors is None:
+            failed += len(batch)
+            continue
+        updates = [(r['id'], v, db.kb_content_hash(r.get('title'), r.get('content'))) for r, v in zip(batch, vectors)]
+        written = await asyncio.to_thread(db.update_kb_embeddings_batch, updates, model)
+        embedded += written
+        failed += len(batch) - written
+    return embedded, failed
+
+
+async def reembed_in_background(model: str = EMBEDDING_MODEL) -> None:
+    """
+    API startup job: brings KB vectors up to date for `model` at low concurrency while requests are served.
+    After an EMBEDDING_MODEL change the retriever serves the already re-embedded subset and grows as this runs.
+    """
+    coverage = await asyncio.to_thread(db.get_kb_embedding_coverage, model)
+    log.info(f"Background KB embedding check for model '{model}': {coverage['embedded']}/{coverage['total']} entries embedded.")
+    try:
+        with llm_lane(Lane.BACKGROUND): # Yields Ollama slots to interactive requests
+            stats = await run_embedding_pipeline(model, workers=1, initial_batch_size=8, max_batch_size=64)
+        if stats.processed or stats.failed:
+            log.info(f"Background KB embedding finished: {stats.processed} embedded, {stats.failed} failed ({stats.embeddings_per_second:.1f} embeddings/s).")
+    except EmbeddingPipelineAborted as e:
+        log.warning(f"Background KB embedding stopped: {e} It resumes from its checkpoint on next startup.")
+    except asyncio.CancelledError:
+        log.info("Background KB embedding cancelled; progress is checkpointed.")
+        raise
+    except Exception as e:
+        log.error(f"Background KB embedding failed: {e}", exc_info=True)
+    finally:
+        invalidate_kb_index(model)
@@ -0,0 +1,118 @@
+# backend/utils/kb_feedback.py
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from backend.database.storage import get_storage
+from backend.utils.kb_index import KBIndex, add_index_load_hook, loaded_kb_indexes
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+FLUSH_INTERVAL_SECONDS = float(os.getenv("KB_FEEDBACK_FLUSH_SECONDS", "5"))
+MAX_BUFFERED_ENTRIES = 500 # Flush early once this many KB entries have pending feedback
+# Beta prior on a KB entry's success rate: behaves like PRIOR_STRENGTH earlier uses at PRIOR_SUCCESS_RATE,
+# so a couple of clicks move a fresh entry only part of the way
+PRIOR_SUCCESS_RATE = 0.5
+PRIOR_STRENGTH = 4.0
+PRIOR_HELPFUL = PRIOR_SUCCESS_RATE * PRIOR_STRENGTH
+PRIOR_UNHELPFUL = (1.0 - PRIOR_SUCCESS_RATE) * PRIOR_STRENGTH
+# --- End Configuration ---
+
+
+def smoothed_success_rate(helpful_count: float, usage_count: float) -> float:
+    """Posterior mean of the Beta(PRIOR_HELPFUL, PRIOR_UNHELPFUL) prior after the observed feedback."""
+    return (helpful_count + PRIOR_HELPFUL) / (usage_count + PRIOR_HELPFUL + PRIOR_UNHELPFUL)
+
+
+class FeedbackAggregator:
+    """
+    Buffers recommendation feedback in memory and writes it as one batched update every
+    FLUSH_INTERVAL_SECONDS (or sooner when the buffer fills), instead of one UPDATE per click.
+    Loaded KB indexes get the new priors immediately, so ranking reflects feedback before it is written.
+    """
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS, max_buffered: int = MAX_BUFFERED_ENTRIES):
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._pending: Dict[int, List[int]] = {} # kb_id -> [uses, helpful uses]
+        self._writing: Dict[int, List[int]] = {} # Batch currently being written
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        add_index_load_hook(self._apply_unwritten)
+
+    def record(self, kb_id: int, was_helpful: bool) -> None:
+        delta = self._pending.setdefault(kb_id, [0, 0])
+        delta[0] += 1
+        delta[1] += int(was_helpful)
+        for index in loaded_kb_indexes():
+            self._apply_to_index(index, kb_id, 1, int(was_helpful))
+        if len(self._pending) >= self.max_buffered and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    @staticmethod
+    def _apply_to_index(index: KBIndex, kb_id: int, uses: int, helpful: int) -> None:
+        pos = index.position(kb_id)
+        if pos is None:
+            return
+        index.usage_counts[pos] += uses
+        index.helpful_counts[pos] += helpful
+        index.success_rates[pos] = smoothed_success_rate(index.helpful_counts[pos], index.usage_counts[pos])
+        index.mark_changed()
+
+    def _apply_unwritten(self, index: KBIndex) -> None:
+        # A freshly loaded index may predate the buffered (or in-flight) feedback; priors are approximate
+        # until the next reload, which reads the written totals
+        for buffer in (self._writing, self._pending):
+            for kb_id, (uses, helpful) in buffer.items():
+                self._apply_to_index(index, kb_id, uses, helpful)
+
+    async def flush(self) -> int:
+        """Writes buffered feedback; returns the number of KB entries updated. Failed batches are kept for the next flush."""
+        if not self._pending or self._writing:
+            return 0
+        self._writing, self._pending = self._pending, {}
+        deltas = [(kb_id, uses, helpful) for kb_id, (uses, helpful) in self._writing.items()]
+        try:
+            ok = await (await get_storage()).apply_kb_feedback(deltas, PRIOR_HELPFUL, PRIOR_UNHELPFUL)
+        except Exception as e:
+            log.error(f"Unexpected error writing KB feedback batch: {e}", exc_info=True)
+            ok = False
+        if not ok:
+            for kb_id, (uses, helpful) in self._writing.items():
+                delta = self._pending.setdefault(kb_id, [0, 0])
+                delta[0] += uses
+                delta[1] += helpful
+        self._writing = {}
+        if ok:
+            log.debug("Wrote feedback for %d KB entries.", len(deltas))
+        return len(deltas) if ok else 0
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the periodic flush (letting an in-progress write finish) and writes whatever is still buffered."""
+        if self._task is not None:
+            self._stopping = True
+            self._flush_requested.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+feedback_aggregator = FeedbackAggregator()
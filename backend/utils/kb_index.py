@@ -0,0 +1,277 @@
+# backend/utils/kb_index.py
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.database import database_manager as db
+from backend.utils.ollama_integration import deserialize_embedding, EMBEDDING_MODEL
+from backend.utils.coordination import file_lock
+from backend.utils.metrics import record_cache_lookup
+
+log = logging.getLogger(__name__)
+
+# How long a loaded index is served before it is rebuilt from the database (picks up background re-embedding)
+KB_INDEX_TTL_SECONDS = float(os.getenv("KB_INDEX_TTL_SECONDS", "300"))
+# When set (scripts/run_server.py does), built indexes are saved here and worker processes memory-map the same
+# embedding matrix instead of each building and holding a private copy
+KB_SNAPSHOT_DIR = os.getenv("KB_SNAPSHOT_DIR", "")
+# Every loaded index, and every in-place change to one, gets a new snapshot version
+_snapshot_versions = itertools.count(1)
+
+
+class KBIndex:
+    """
+    In-memory retrieval index over the KB embeddings of exactly one embedding model.
+    Rows are L2-normalized once at load time so a query is a single matrix-vector product.
+    success_rates/usage_counts/helpful_counts are the ranking priors; feedback updates them in place.
+    `version` identifies the snapshot: results computed from the index (e.g. cached recommendations) key on it.
+    """
+    def __init__(self, model: str, ids: np.ndarray, matrix: np.ndarray, titles: List[str], contents: List[str],
+                 success_rates: np.ndarray, usage_counts: np.ndarray, helpful_counts: Optional[np.ndarray] = None):
+        self.model = model
+        self.ids = ids
+        self.matrix = matrix
+        self.titles = titles
+        self.contents = contents
+        self.success_rates = success_rates
+        self.usage_counts = usage_counts
+        self.helpful_counts = helpful_counts if helpful_counts is not None else np.zeros(len(ids), dtype=np.int64)
+        self._positions: Optional[Dict[int, int]] = None
+        self.dim = int(matrix.shape[1]) if matrix.ndim == 2 and len(ids) else 0
+        self.loaded_at = time.monotonic()
+        self.version = next(_snapshot_versions)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mark_changed(self) -> None:
+        """Starts a new snapshot version; call after changing the priors in place."""
+        self.version = next(_snapshot_versions)
+
+    def position(self, kb_id: int) -> Optional[int]:
+        """Row position of a KB id in this index, or None if it is not part of it."""
+        if self._positions is None:
+            self._positions = {int(kb_id): pos for pos, kb_id in enumerate(self.ids)}
+        return self._positions.get(kb_id)
+
+    @classmethod
+    def load(cls, model: str) -> "KBIndex":
+        """The index for `model`: from the shared snapshot when KB_SNAPSHOT_DIR is set, otherwise built from the database."""
+        if not KB_SNAPSHOT_DIR:
+            return cls.build(model)
+        os.makedirs(KB_SNAPSHOT_DIR, exist_ok=True)
+        # Snapshots are named by the latest KB change (change_log), so any KB write makes the old one unusable
+        prefix = os.path.join(KB_SNAPSHOT_DIR, _snapshot_name(model))
+        base = f"{prefix}-{db.get_change_seq('kb')}"
+        index = cls.open_snapshot(model, base)
+        if index is not None:
+            return index
+        with file_lock(prefix + ".lock"): # One worker builds, the others wait and map its result
+            index = cls.open_snapshot(model, base)
+            if index is None:
+                index = cls.build(model)
+                if len(index):
+                    index.save_snapshot(base)
+                    index = cls.open_snapshot(model, base) or index
+        return index
+
+    def save_snapshot(self, base: str) -> None:
+        """
+        Writes <base>-<ns>.npy (the matrix) and then <base>.json (ids, texts, priors, matrix file name), each
+        through a temporary file and os.replace, so readers see either the previous snapshot or the complete new
+        one. Superseded files for the same model are removed; workers that still map them keep their copy.
+        """
+        matrix_path = f"{base}-{time.time_ns()}.npy"
+        with open(matrix_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(matrix_path + ".tmp", matrix_path)
+        meta = {
+            "model": self.model, "matrix": os.path.basename(matrix_path), "built_at": time.time(),
+            "ids": self.ids.tolist(), "titles": self.titles, "contents": self.contents,
+            "success_rates": self.success_rates.tolist(), "usage_counts": self.usage_counts.tolist(),
+            "helpful_counts": self.helpful_counts.tolist(),
+        }
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(base + ".json.tmp", base + ".json")
+
+        directory = os.path.dirname(base)
+        superseded = re.compile(rf"{re.escape(_snapshot_name(self.model))}-\d+(-\d+\.npy|\.json)")
+        for name in os.listdir(directory):
+            if superseded.fullmatch(name) and name not in (meta["matrix"], os.path.basename(base) + ".json"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def open_snapshot(cls, model: str, base: str) -> Optional["KBIndex"]:
+        """Maps a snapshot saved by save_snapshot read-only; None if missing, unreadable or older than KB_INDEX_TTL_SECONDS."""
+        try:
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            age = time.time() - meta["built_at"]
+            if meta["model"] != model or not 0 <= age < KB_INDEX_TTL_SECONDS:
+                return None
+            matrix = np.load(os.path.join(os.path.dirname(base), meta["matrix"]), mmap_mode="r")
+        except (OSError, ValueError, KeyError) as e:
+            log.debug("No usable KB snapshot at %s: %r", base, e)
+            return None
+        if matrix.ndim != 2 or matrix.shape[0] != len(meta["ids"]):
+            return None
+        # Priors are copied: feedback updates them in place per process
+        index = cls(
+            model, np.asarray(meta["ids"], dtype=np.int64), matrix, meta["titles"], meta["contents"],
+            np.asarray(meta["success_rates"], dtype=np.float32), np.asarray(meta["usage_counts"], dtype=np.int64),
+            np.asarray(meta["helpful_counts"], dtype=np.int64),
+        )
+        index.loaded_at -= age # Expires when the snapshot does, in every worker
+        log.info(f"KB index for model '{model}' mapped from snapshot: {len(index)} entries, dim {index.dim}.")
+        return index
+
+    @classmethod
+    def build(cls, model: str) -> "KBIndex":
+        """Builds the index from rows embedded with `model`; vectors of any other length are skipped, never mixed."""
+        rows = db.get_kb_embeddings_for_model(model)
+        parsed = []
+        for row in rows:
+            vector = deserialize_embedding(row['embedding'])
+            if vector:
+                parsed.append((row, vector))
+
+        dim = Counter(len(vector) for _, vector in parsed).most_common(1)[0][0] if parsed else 0
+        kept = [(row, vector) for row, vector in parsed if len(vector) == dim]
+        if len(kept) != len(rows):
+            log.warning(f"KB index for model '{model}': skipped {len(rows) - len(kept)} rows with unreadable or non-{dim}-dim embeddings.")
+
+        if not kept:
+            return cls(model, np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), [], [],
+                       np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+        matrix = np.asarray([vector for _, vector in kept], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+        nonzero = norms > 0
+        matrix = matrix[nonzero] / norms[nonzero][:, None]
+        kept = [item for item, keep in zip(kept, nonzero) if keep]
+
+        index = cls(
+            model,
+            ids=np.asarray([row['id'] for row, _ in kept], dtype=np.int64),
+            matrix=matrix,
+            titles=[row['title'] for row, _ in kept],
+            contents=[row['content'] for row, _ in kept],
+            success_rates=np.asarray([row['success_rate'] if row['success_rate'] is not None else 0.5 for row, _ in kept], dtype=np.float32),
+            usage_counts=np.asarray([row['usage_count'] or 0 for row, _ in kept], dtype=np.int64),
+            helpful_counts=np.asarray([row.get('helpful_count') or 0 for row, _ in kept], dtype=np.int64),
+        )
+        log.info(f"KB index loaded for model '{model}': {len(index)} entries, dim {index.dim}.")
+        return index
+
+    def search(self, query_embedding: List[float], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (row positions, cosine similarities) of the top_k rows, best first.
+        Raises ValueError if the query vector does not come from a model with this index's dimension.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != self.dim:
+            raise ValueError(f"Query embedding has dimension {query.shape}, KB index for model '{self.model}' has {self.dim}.")
+        norm = np.linalg.norm(query)
+        if norm == 0 or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        similarities = self.matrix @ (query / norm)
+        k = min(top_k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return top, np.clip(similarities[top], -1.0, 1.0)
+
+    def mmr(self, rows: np.ndarray, relevance: np.ndarray, top_n: int, lambda_: float) -> np.ndarray:
+        """mmr_select over candidate `rows` (as returned by search); returns indices into `rows`, in pick order."""
+        return mmr_select(self.matrix[rows], relevance, top_n, lambda_)
+
+
+def mmr_select(vectors: np.ndarray, relevance: np.ndarray, top_n: int, lambda_: float) -> np.ndarray:
+    """
+    Maximal Marginal Relevance selection among candidates with L2-normalized `vectors` (one row each).
+    Greedily picks the candidate maximizing lambda * relevance - (1 - lambda) * (max cosine similarity to
+    the entries already picked). lambda 1.0 is plain relevance order, lower values favour diversity.
+    Returns candidate indices, in pick order.
+    """
+    k = min(top_n, len(relevance))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if lambda_ >= 1.0 or k == 1:
+        return np.argsort(-relevance, kind='stable')[:k]
+
+    candidates = np.asarray(vectors, dtype=np.float32)
+    pairwise = candidates @ candidates.T # All candidate-to-candidate similarities in one product
+    weighted_relevance = lambda_ * relevance.astype(np.float32)
+    max_similarity = np.full(len(relevance), -np.inf, dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    picked = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        if step == 0:
+            marginal = weighted_relevance.copy()
+        else:
+            marginal = weighted_relevance - (1.0 - lambda_) * max_similarity
+        marginal[~available] = -np.inf
+        choice = int(np.argmax(marginal))
+        picked[step] = choice
+        available[choice] = False
+        np.maximum(max_similarity, pairwise[choice], out=max_similarity)
+    return picked
+
+
+def _snapshot_name(model: str) -> str:
+    # No '-': it separates the name from the change sequence. The hash keeps e.g. 'a-b' and 'a_b' apart
+    digest = hashlib.sha1(model.encode("utf-8")).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9_.]', '_', model)}_{digest}"
+
+
+_indexes: Dict[str, KBIndex] = {}
+_load_lock = asyncio.Lock()
+# Called with every freshly loaded index, e.g. to re-apply feedback not yet written to the database
+_load_hooks: List[Callable[[KBIndex], None]] = []
+
+
+def add_index_load_hook(hook: Callable[[KBIndex], None]) -> None:
+    if hook not in _load_hooks:
+        _load_hooks.append(hook)
+
+
+def loaded_kb_indexes() -> List[KBIndex]:
+    return list(_indexes.values())
+
+
+async def get_kb_index(model: str = EMBEDDING_MODEL) -> KBIndex:
+    """Returns the cached index for `model`, (re)loading it off the event loop when missing or expired."""
+    index = _indexes.get(model)
+    if index is not None and time.monotonic() - index.loaded_at < KB_INDEX_TTL_SECONDS:
+        record_cache_lookup("kb_index", hit=True)
+        return index
+    record_cache_lookup("kb_index", hit=False)
+    async with _load_lock:
+        index = _indexes.get(model)
+        if index is None or time.monotonic() - index.loaded_at >= KB_INDEX_TTL_SECONDS:
+            index = await asyncio.to_thread(KBIndex.load, model)
+            for hook in _load_hooks:
+                hook(index)
+            _indexes[model] = index
+    return index
+
+
+def invalidate_kb_index(model: Optional[str] = None) -> None:
+    """Drops cached indexes (all models, or just `model`) so the next lookup reloads from the database."""
+    if model is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(model, None)
@@ -0,0 +1,275 @@
+# backend/utils/kb_ingest.py
+
+import asyncio
+import csv
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from backend.database import database_manager as db
+from backend.utils.kb_dedup import DEFAULT_JACCARD_THRESHOLD, DedupStats, dedupe_kb_rows
+from backend.utils.kb_embedding_pipeline import AdaptiveBatchSizer, embed_kb_rows
+from backend.utils.text_parsing import (
+    TRANSCRIPT_AGENT_MESSAGE,
+    TRANSCRIPT_CATEGORY,
+    TRANSCRIPT_CONVERSATION_ID,
+    TRANSCRIPT_FIRST_CUSTOMER,
+)
+from backend.utils.ollama_integration import EMBEDDING_MODEL
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000 # Records per upsert transaction
+MAX_PENDING_EMBED_CHUNKS = 2 # Chunks allowed to be embedding while the next ones are read/upserted
+
+
+@dataclass
+class IngestStats:
+    read: int = 0            # Valid records produced by the reader
+    skipped: int = 0         # Source rows rejected by the reader (not resolved, missing fields, ...)
+    duplicates: int = 0      # Records dropped because a later record in the same chunk had the same key
+    changed: int = 0         # Rows inserted or updated in the DB
+    unchanged: int = 0       # Rows whose stored content already matched
+    failed: int = 0          # Records in chunks whose upsert failed
+    merged: int = 0          # Rows merged into a near-duplicate canonical entry (dedupe=True)
+    embedded: int = 0
+    embed_failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+
+def _fallback_key(prefix: str, *parts: str) -> str:
+    return f"{prefix}:" + hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+# --- Readers (generators; one record dict at a time) ---
+
+def iter_csv_kb_records(csv_path: str, stats: Optional[IngestStats] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streams KB records from a historical ticket CSV export. Only 'Resolved' rows with an issue and
+    solution are produced; the natural key is the CSV's Ticket ID.
+    """
+    stats = stats or IngestStats()
+    # Open CSV file with specific encoding, handling potential BOM
+    with open(csv_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+        # Exports pad headers with spaces after commas; clean them before using them as field names
+        header_line = csvfile.readline()
+        if not header_line:
+            log.error("CSV file is empty or header row is missing.")
+            return
+        headers = [h.strip() for h in header_line.strip().split(',')]
+        log.info(f"Detected and cleaned CSV Headers: {headers}")
+
+        required_cols = ['Issue Category', 'Solution', 'Resolution Status']
+        if not all(col in headers for col in required_cols):
+            log.error(f"CSV file missing required columns after cleaning headers. Need: {required_cols}. Found: {headers}")
+            return
+
+        reader = csv.DictReader(csvfile, fieldnames=headers)
+        for row_num, row in enumerate(reader, start=2): # Start row count from 2 (after header)
+            resolution_status = (row.get('Resolution Status') or '').strip()
+            issue = (row.get('Issue Category') or '').strip()
+            solution = (row.get('Solution') or '').strip()
+            sentiment = (row.get('Sentiment') or '').strip() # Optional context
+            ticket_ref = (row.get('Ticket ID') or '').strip()
+
+            # Process only 'Resolved' tickets for successful solutions
+            if resolution_status.lower() != 'resolved' or not issue or not solution:
+                stats.skipped += 1
+                continue
+
+            content = f"Issue Type: {issue}\n"
+            if sentiment:
+                content += f"User Sentiment Hint: {sentiment}\n"
+            content += f"\nSuccessful Solution:\n{solution}"
+
+            stats.read += 1
+            yield {
+                'source_key': f"csv:{ticket_ref}" if ticket_ref else _fallback_key('csv', issue, solution),
+                'title': issue,
+                'content': content,
+                # Basic keywords derived from category and first word of solution
+                'keywords': f"{issue.lower().replace(' ', '')},{solution.split(' ')[0].lower().rstrip(':.,')}",
+                'source_ticket_id': None, # CSV ticket refs are not ticket table IDs
+            }
+
+
+# Matched as substrings of the lowercased message (plain `in` checks beat a regex alternation here)
+_SOLUTION_KEYWORDS = ("upgrading", "update", "disable", "retry", "download", "check", "clear cache", "reinstall", "rollback",
+                      "offer", "discount", "reset sync", "force full sync", "verify", "use different", "fixed", "worked", "resolved")
+_CLOSING_PHRASES = ("goodbye", "cheers", "have a great day")
+
+
+def extract_info_from_transcript(content: str) -> dict:
+    """Parses transcript content to extract key info."""
+    info = {'category': None, 'problem': None, 'solution': None, 'keywords': set()}
+
+    # Simple Regex examples (these might need refinement based on actual file consistency)
+    category_match = TRANSCRIPT_CATEGORY.search(content)
+    if category_match:
+        info['category'] = category_match.group(1).strip()
+        info['keywords'].add(info['category'].lower().replace(' ',''))
+
+    # Try to find first customer message as problem description
+    # Look for "Customer:" and capture text until the next "Agent:" or end of section
+    problem_match = TRANSCRIPT_FIRST_CUSTOMER.search(content)
+    if problem_match:
+        # Summarize problem slightly (e.g., first 150 chars) or use LLM later for better summary
+        problem_desc = problem_match.group(1).strip().replace('\n', ' ')
+        info['problem'] = problem_desc[:150] + ('...' if len(problem_desc) > 150 else '')
+        # Add keywords from problem
+        for word in problem_desc.lower().split()[:15]: # Limit keyword extraction
+             if len(word) > 3 and word.isalnum(): info['keywords'].add(word)
+
+
+    # Try to find the *last* agent message that seems like a solution or closing statement
+    # This is heuristic - finding the exact "solution" line programmatically is hard
+    solution = None
+    agent_messages = TRANSCRIPT_AGENT_MESSAGE.findall(content)
+    if agent_messages:
+        last_message = agent_messages[-1].strip()
+        # Look for keywords indicating resolution or next steps provided *by the agent*
+        # Find the *first* agent message containing a likely solution keyword
+        for msg in agent_messages:
+            msg_lower = msg.lower()
+            if any(keyword in msg_lower for keyword in _SOLUTION_KEYWORDS):
+                # Use a snippet of this message as the likely solution
+                solution_snippet = msg.strip().replace('\n', ' ')
+                solution = solution_snippet[:200] + ('...' if len(solution_snippet) > 200 else '')
+                # Add keywords from solution
+                for word in solution.lower().split()[:10]:
+                     if len(word) > 3 and word.isalnum(): info['keywords'].add(word)
+                break # Found a likely solution message
+
+        # Fallback if no keyword match: Use last agent message if it doesn't sound like just a greeting/closing
+        if not solution and last_message and not any(close in last_message.lower() for close in _CLOSING_PHRASES):
+             solution = last_message[:200] + ('...' if len(last_message) > 200 else '')
+             for word in solution.lower().split()[:10]:
+                     if len(word) > 3 and word.isalnum(): info['keywords'].add(word)
+
+
+    info['solution'] = solution or "Solution details not clearly identified in transcript."
+
+    return info
+
+
+def transcript_source_key(content: str, filename: str) -> str:
+    """Natural key for a transcript: its Conversation ID, or the file name when the header is missing."""
+    match = TRANSCRIPT_CONVERSATION_ID.search(content)
+    return f"transcript:{match.group(1)}" if match else f"transcript-file:{filename}"
+
+
+def transcript_info_to_record(info: dict, source_key: str) -> Dict[str, Any]:
+    return {
+        'source_key': source_key,
+        'title': info['category'],
+        'content': f"Problem Summary:\n{info['problem']}\n\nSuccessful Solution:\n{info['solution']}",
+        'keywords': ",".join(sorted(info['keywords'])), # Comma-separated sorted keywords
+        'source_ticket_id': None, # Extracting this reliably is hard
+    }
+
+
+def iter_transcript_files(transcript_dir: str) -> Iterator[str]:
+    """Streams .txt file paths from a directory without listing it all up front."""
+    with os.scandir(transcript_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(".txt"):
+                yield entry.path
+
+
+def iter_transcript_kb_records(transcript_dir: str, stats: Optional[IngestStats] = None) -> Iterator[Dict[str, Any]]:
+    """Streams KB records parsed from chat transcript .txt files, one file at a time."""
+    stats = stats or IngestStats()
+    for filepath in iter_transcript_files(transcript_dir):
+        filename = os.path.basename(filepath)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            log.error(f"Error reading transcript {filename}: {e}")
+            stats.skipped += 1
+            continue
+
+        info = extract_info_from_transcript(content)
+        if not info.get('category') or not info.get('solution') or not info.get('problem'):
+            log.warning(f"Could not extract sufficient info from {filename}. Skipping.")
+            stats.skipped += 1
+            continue
+        stats.read += 1
+        yield transcript_info_to_record(info, transcript_source_key(content, filename))
+
+
+# --- Loader ---
+
+def chunked(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def ingest_kb_records(
+    records: Iterable[Dict[str, Any]],
+    stats: Optional[IngestStats] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    embed: bool = False,
+    model: str = EMBEDDING_MODEL,
+    dedupe: bool = False,
+    dedupe_threshold: float = DEFAULT_JACCARD_THRESHOLD,
+) -> IngestStats:
+    """
+    Upserts a stream of KB records in chunked executemany transactions, deduplicating on source_key.
+
+    With dedupe=True, each committed chunk also goes through MinHash/LSH near-duplicate detection
+    (backend/utils/kb_dedup.py); rows merged into a canonical entry are not embedded.
+    With embed=True, each committed chunk is embedded while the following chunks are read and upserted;
+    at most MAX_PENDING_EMBED_CHUNKS embedding jobs are outstanding, so a slow model throttles reading.
+    """
+    stats = stats or IngestStats()
+    sizer = AdaptiveBatchSizer()
+    pending_embeds: List[asyncio.Task] = []
+    dedup_stats = DedupStats()
+
+    async def embed_chunk(source_keys: List[str]) -> None:
+        rows = await asyncio.to_thread(db.get_kb_entries_by_source_keys, source_keys)
+        rows = [row for row in rows if row['canonical_id'] is None]
+        embedded, failed = await embed_kb_rows(rows, model=model, sizer=sizer)
+        stats.embedded += embedded
+        stats.embed_failed += failed
+
+    for chunk in chunked(records, chunk_size):
+        # Later records win within a chunk; across chunks the upsert makes the load idempotent
+        unique = {record['source_key']: record for record in chunk}
+        stats.duplicates += len(chunk) - len(unique)
+
+        changed = await asyncio.to_thread(db.upsert_kb_entries, list(unique.values()))
+        if changed is None:
+            stats.failed += len(unique)
+            continue
+        stats.changed += changed
+        stats.unchanged += len(unique) - changed
+        log.info(f"Upserted chunk of {len(unique)} records ({stats.read} read so far, {stats.rows_per_second:.0f} rows/s)")
+
+        if dedupe:
+            dedup_rows = await asyncio.to_thread(db.get_kb_dedup_rows_by_source_keys, list(unique))
+            await asyncio.to_thread(dedupe_kb_rows, dedup_rows, dedup_stats, dedupe_threshold)
+            stats.merged = dedup_stats.merged
+
+        if embed:
+            pending_embeds.append(asyncio.ensure_future(embed_chunk(list(unique))))
+            if len(pending_embeds) >= MAX_PENDING_EMBED_CHUNKS:
+                await pending_embeds.pop(0)
+
+    if pending_embeds:
+        await asyncio.gather(*pending_embeds)
+    return stats
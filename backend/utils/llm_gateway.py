@@ -0,0 +1,516 @@
+# backend/utils/llm_gateway.py
+
+import asyncio
+import enum
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+import httpx
+import ollama
+
+from backend.utils.metrics import LLM_COALESCED_REQUESTS, LLM_HEDGED_REQUESTS, LLM_HOST_FAILURES, LLM_QUEUE_WAIT_SECONDS
+
+log = logging.getLogger(__name__)
+
+# --- Configuration (environment) ---
+# Comma-separated Ollama base URLs; defaults to OLLAMA_HOST (what ollama.Client() itself would use)
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")).split(",") if h.strip()]
+# Concurrent requests sent to each host; match the server's OLLAMA_NUM_PARALLEL
+MAX_PARALLEL_PER_HOST = int(os.getenv("OLLAMA_MAX_PARALLEL_PER_HOST", "2"))
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_CHECK_SECONDS", "15"))
+HEALTH_CHECK_TIMEOUT_SECONDS = 3.0
+# Upper bound for any single Ollama call, even without a request deadline (httpx timeout of the clients)
+CALL_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_CALL_TIMEOUT_SECONDS", "120"))
+# Circuit breaker per host: open after this many consecutive failures (errors, stalls past the deadline),
+# fail fast while open, then let one trial request through after the cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("OLLAMA_BREAKER_COOLDOWN_SECONDS", "15"))
+# Hedging: if a call has not answered after this long, send a duplicate to another host and take the first
+# answer (0 disables). Set it around the observed p95 so only the slow tail is duplicated.
+HEDGE_AFTER_SECONDS = float(os.getenv("OLLAMA_HEDGE_AFTER_MS", "0")) / 1000
+# --- End Configuration ---
+
+
+class Lane(enum.IntEnum):
+    """Scheduling lanes, highest priority first. URGENT is always served before the weighted lanes."""
+    URGENT = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+    BATCH = 3
+
+
+# Share of free slots each lane gets while several are backlogged (stride scheduling)
+LANE_WEIGHTS = {Lane.INTERACTIVE: 8, Lane.BACKGROUND: 2, Lane.BATCH: 1}
+
+_current_lane: ContextVar[Lane] = ContextVar("llm_lane", default=Lane.INTERACTIVE)
+_current_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None) # time.monotonic() value
+
+
+@contextmanager
+def llm_lane(lane: Lane) -> Iterator[None]:
+    """
+    Runs the enclosed LLM calls (including tasks and threads started inside) in `lane`:
+
+        with llm_lane(Lane.BATCH):
+            await run_embedding_pipeline(...)
+    """
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> Lane:
+    return _current_lane.get()
+
+
+@contextmanager
+def llm_deadline(seconds: float) -> Iterator[None]:
+    """
+    Gives the enclosed LLM calls a shared time budget: each call may only use what is left of it (queueing
+    included). An enclosing deadline that is earlier wins, so nested budgets only ever shrink.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _current_deadline.get()
+    token = _current_deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the active LLM deadline (None without one)."""
+    deadline = _current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class LLMUnavailableError(ConnectionError):
+    """The gateway failed fast instead of calling Ollama (no usable host, open circuit, or no time left)."""
+
+
+class NoHealthyHostError(LLMUnavailableError):
+    pass
+
+
+class LLMDeadlineExceeded(LLMUnavailableError):
+    pass
+
+
+# Errors meaning "this host is unreachable or stalled", as opposed to an error answer from a working server
+HOST_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open -> half-open once `cooldown` has
+    passed, admitting a single trial call; the trial's outcome closes or re-opens the circuit.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allows(self) -> bool:
+        """Whether a call may be sent now (does not reserve the half-open trial)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.cooldown
+        return not self._trial_in_flight
+
+    def acquire(self) -> None:
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self) -> bool:
+        """Returns True if this closed a circuit that was not closed."""
+        reclosed = self.state != self.CLOSED
+        self.state, self.failures, self._trial_in_flight = self.CLOSED, 0, False
+        return reclosed
+
+    def record_failure(self) -> bool:
+        """Returns True if this opened the circuit."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state, self.opened_at = self.OPEN, time.monotonic()
+            return True
+        return False
+
+    def release(self) -> None:
+        """An admitted call ended without a verdict (e.g. cancelled as a losing hedge)."""
+        self._trial_in_flight = False
+
+
+class _Backend:
+    __slots__ = ("host", "breaker", "probe_client", "max_parallel", "in_flight", "latency_ewma", "_async_client", "_loop")
+
+    def __init__(self, host: str, max_parallel: int, breaker: CircuitBreaker):
+        self.host = host
+        self.breaker = breaker
+        self.probe_client = ollama.Client(host=host, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        self.max_parallel = max_parallel
+        self.in_flight = 0
+        self.latency_ewma = 0.0
+        self._async_client: Optional[ollama.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        # An async client (unlike a worker thread) can be cancelled mid-request, which frees the slot.
+        # httpx pools belong to one event loop, and scripts may run several asyncio.run() calls in a row.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._loop is not loop:
+            self._async_client = ollama.AsyncClient(host=self.host, timeout=CALL_TIMEOUT_SECONDS)
+            self._loop = loop
+        return self._async_client
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    @property
+    def selectable(self) -> bool:
+        return self.breaker.allows()
+
+    def has_slot(self) -> bool:
+        return self.in_flight < self.max_parallel and self.breaker.allows()
+
+    def mark_up(self, latency: Optional[float] = None) -> None:
+        if self.breaker.record_success():
+            log.info("Ollama host %s is healthy again (circuit closed).", self.host)
+        if latency is not None:
+            self.latency_ewma = latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+
+    def mark_down(self, error: BaseException) -> None:
+        LLM_HOST_FAILURES.inc(host=self.host)
+        # One log line per circuit opening, not one traceback per failed call
+        if self.breaker.record_failure():
+            log.warning("Ollama host %s circuit opened for %.0fs after: %s", self.host, self.breaker.cooldown, str(error) or type(error).__name__)
+
+
+class _Job:
+    __slots__ = ("key", "method", "kwargs", "lane", "future", "waiters", "queued", "enqueued_at", "tried", "running", "task", "stalled")
+
+    def __init__(self, key: Hashable, method: str, kwargs: Dict[str, Any], lane: Lane):
+        self.key = key
+        self.method = method
+        self.kwargs = kwargs
+        self.lane = lane
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+        self.queued = True
+        self.enqueued_at = time.perf_counter()
+        self.tried: List[_Backend] = []
+        self.running: List[_Backend] = [] # Hosts currently working on it (two while hedged)
+        self.task: Optional[asyncio.Task] = None
+        self.stalled = False # Abandoned because every waiter's deadline passed while the host was working on it
+
+
+class LLMGateway:
+    """
+    Single entry point for Ollama traffic:
+
+    - Identical in-flight requests (same method, model and payload) are coalesced into one call.
+    - Requests wait in per-lane queues and are dispatched as host slots free up: URGENT first, then
+      INTERACTIVE / BACKGROUND / BATCH by weighted fair (stride) scheduling, so a backfill can't starve
+      interactive work yet still progresses.
+    - Calls go to the host with the fewest in-flight requests whose circuit breaker admits traffic;
+      connection errors retry on another host. When every circuit is open, calls fail immediately.
+    - Each caller waits at most until its llm_deadline(); when no caller is left waiting the HTTP call is
+      cancelled and its slot freed. A host still busy with a call when the deadline passes is charged a failure.
+    - With hedging enabled, a call still running after `hedge_after` seconds is duplicated on another host.
+    """
+    def __init__(self, hosts: List[str] = OLLAMA_HOSTS, max_parallel_per_host: int = MAX_PARALLEL_PER_HOST,
+                 lane_weights: Dict[Lane, int] = LANE_WEIGHTS, health_check_interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+                 hedge_after: float = HEDGE_AFTER_SECONDS, breaker_failures: int = BREAKER_FAILURE_THRESHOLD,
+                 breaker_cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.backends = [_Backend(host, max_parallel_per_host, CircuitBreaker(breaker_failures, breaker_cooldown)) for host in hosts]
+        self.lane_weights = dict(lane_weights)
+        self.health_check_interval = health_check_interval
+        self.hedge_after = hedge_after
+        self._queues: Dict[Lane, Deque[_Job]] = {lane: deque() for lane in Lane}
+        self._pass: Dict[Lane, float] = {lane: 0.0 for lane in Lane}
+        self._virtual_time = 0.0
+        self._in_flight: Dict[Hashable, _Job] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    # --- Public API (return the same objects as the matching ollama.Client methods) ---
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], format: Optional[str] = None,
+                   options: Optional[Dict[str, Any]] = None, keep_alive: Optional[Any] = None, lane: Optional[Lane] = None) -> Any:
+        key = ("chat", model, json.dumps(messages, sort_keys=True), format, json.dumps(options, sort_keys=True), keep_alive)
+        return await self._submit(key, "chat", dict(model=model, messages=messages, format=format, options=options, keep_alive=keep_alive), lane)
+
+    async def embed(self, model: str, input: List[str], lane: Optional[Lane] = None) -> Any:
+        return await self._submit(("embed", model, tuple(input)), "embed", dict(model=model, input=list(input)), lane)
+
+    async def embeddings(self, model: str, prompt: str, lane: Optional[Lane] = None) -> Any:
+        return await self._submit(("embeddings", model, prompt), "embeddings", dict(model=model, prompt=prompt), lane)
+
+    async def show(self, model: str, lane: Optional[Lane] = None) -> Any:
+        return await self._submit(("show", model), "show", dict(model=model), lane)
+
+    def available(self) -> bool:
+        """True if at least one host's circuit admits calls (closed, or open long enough for a trial)."""
+        return any(backend.selectable for backend in self.backends)
+
+    def check_health_sync(self) -> bool:
+        """Probes every host once (blocking); used at import time, before an event loop exists."""
+        for backend in self.backends:
+            try:
+                backend.probe_client.list()
+                backend.mark_up()
+            except Exception as e:
+                # A host that is unreachable at startup starts with its circuit open
+                backend.breaker.failures = backend.breaker.failure_threshold - 1
+                backend.mark_down(e)
+        return any(backend.healthy for backend in self.backends)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {lane.name.lower(): len(queue) for lane, queue in self._queues.items()}
+
+    # --- Queueing ---
+
+    async def _submit(self, key: Hashable, method: str, kwargs: Dict[str, Any], lane: Optional[Lane]) -> Any:
+        lane = current_lane() if lane is None else lane
+        deadline = _current_deadline.get()
+        if deadline is not None and deadline <= time.monotonic():
+            raise LLMDeadlineExceeded(f"No time left in the request budget for Ollama {method}.")
+        if not self.available():
+            raise NoHealthyHostError("No Ollama host is available (all circuits open).")
+        job = self._in_flight.get(key)
+        if job is not None:
+            LLM_COALESCED_REQUESTS.inc(method=method)
+            if job.queued and lane < job.lane: # e.g. an urgent ticket asking for what a batch job already queued
+                self._queues[job.lane].remove(job)
+                self._enqueue(job, lane)
+        else:
+            job = _Job(key, method, kwargs, lane)
+            self._in_flight[key] = job
+            self._enqueue(job, lane)
+            self._dispatch()
+        job.waiters += 1
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            self._leave(job, deadline_passed=True)
+            raise LLMDeadlineExceeded(f"Ollama {method} did not finish within the request deadline.") from None
+        except asyncio.CancelledError:
+            self._leave(job, deadline_passed=False)
+            raise
+
+    def _leave(self, job: _Job, deadline_passed: bool) -> None:
+        job.waiters -= 1
+        if job.waiters > 0 or job.future.done():
+            return
+        # Nobody wants the answer any more: drop it from its queue, or cancel the HTTP call to free the slot.
+        # It is forgotten right away so an identical request arriving meanwhile starts a fresh call.
+        self._forget(job)
+        job.future.cancel()
+        if job.queued:
+            self._queues[job.lane].remove(job)
+        elif job.task is not None:
+            if deadline_passed:
+                # Charged now rather than when the cancellation lands, so the very next call sees an opened circuit
+                job.stalled = True
+                for backend in job.running:
+                    backend.mark_down(TimeoutError(f"{job.method} still running when the request deadline passed"))
+            job.task.cancel()
+
+    def _forget(self, job: _Job) -> None:
+        if self._in_flight.get(job.key) is job:
+            del self._in_flight[job.key]
+
+    def _enqueue(self, job: _Job, lane: Lane, front: bool = False) -> None:
+        job.lane = lane
+        job.queued = True
+        queue = self._queues[lane]
+        if not queue and lane in self.lane_weights:
+            # A lane that was idle rejoins at the current virtual time instead of spending saved-up credit
+            self._pass[lane] = max(self._pass[lane], self._virtual_time)
+        queue.appendleft(job) if front else queue.append(job)
+
+    def _lane_order(self) -> List[Lane]:
+        # URGENT first, then the backlogged weighted lanes by stride pass
+        weighted = sorted((lane for lane in self.lane_weights if self._queues[lane]), key=lambda l: (self._pass[l], l))
+        return ([Lane.URGENT] if self._queues[Lane.URGENT] else []) + weighted
+
+    def _next_job(self) -> Optional[Tuple[_Job, _Backend]]:
+        """
+        The next job to send and its host: lanes in _lane_order, each in FIFO order. A job that may only retry on
+        hosts without a free slot keeps its place and is passed over; one with no usable untried host left fails.
+        A lane's stride pass only advances when one of its jobs is dispatched.
+        """
+        for lane in self._lane_order():
+            queue = self._queues[lane]
+            i = 0
+            while i < len(queue):
+                job = queue[i]
+                backend = self._pick_backend(job.tried)
+                if backend is not None:
+                    del queue[i]
+                    if lane in self.lane_weights:
+                        self._virtual_time = self._pass[lane]
+                        self._pass[lane] += 1.0 / self.lane_weights[lane]
+                    return job, backend
+                if not any(b.selectable for b in self.backends if b not in job.tried):
+                    del queue[i]
+                    job.queued = False
+                    self._finish(job, exc=NoHealthyHostError(f"Ollama hosts unreachable: {', '.join(b.host for b in job.tried)}"))
+                    continue
+                i += 1
+        return None
+
+    def _pick_backend(self, exclude: List[_Backend]) -> Optional[_Backend]:
+        candidates = [b for b in self.backends if b.has_slot() and b not in exclude]
+        return min(candidates, key=lambda b: (b.in_flight, not b.healthy, b.latency_ewma)) if candidates else None
+
+    def _start_attempt(self, job: _Job, backend: _Backend) -> asyncio.Task:
+        job.tried.append(backend)
+        job.running.append(backend)
+        backend.breaker.acquire()
+        backend.in_flight += 1 # Claimed before the task runs, so _dispatch sees the slot as taken
+        return asyncio.ensure_future(self._attempt(job, backend))
+
+    def _dispatch(self) -> None:
+        if not self.available():
+            self._fail_queued(NoHealthyHostError("No Ollama host is available (all circuits open)."))
+            return
+        while any(self._queues.values()):
+            if not any(b.has_slot() for b in self.backends):
+                return # Wait for a slot; every finished attempt dispatches again
+            picked = self._next_job()
+            if picked is None:
+                return # Only hosts the queued jobs already failed on have room
+            job, backend = picked
+            job.queued = False
+            LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - job.enqueued_at, lane=job.lane.name.lower())
+            job.task = asyncio.ensure_future(self._run(job, self._start_attempt(job, backend)))
+
+    def _fail_queued(self, exc: BaseException) -> None:
+        for queue in self._queues.values():
+            while queue:
+                job = queue.popleft()
+                job.queued = False
+                self._finish(job, exc=exc)
+
+    def _finish(self, job: _Job, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        self._forget(job)
+        if job.future.done():
+            return
+        if exc is not None:
+            job.future.set_exception(exc)
+        else:
+            job.future.set_result(result)
+
+    # --- Calls ---
+
+    async def _attempt(self, job: _Job, backend: _Backend) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await getattr(backend.client, job.method)(**job.kwargs)
+        except HOST_ERRORS as e:
+            backend.mark_down(e)
+            raise
+        except ollama.ResponseError as e:
+            # A server that answers is up, but 5xx (e.g. the model runner crashed) still counts against it
+            backend.mark_down(e) if e.status_code >= 500 else backend.mark_up()
+            raise
+        except asyncio.CancelledError:
+            if not job.stalled: # A stall was already charged to the host in _leave
+                backend.breaker.release()
+            raise
+        finally:
+            backend.in_flight -= 1
+            job.running.remove(backend)
+            self._dispatch()
+        backend.mark_up(time.perf_counter() - start)
+        return result
+
+    async def _run(self, job: _Job, first: asyncio.Task) -> None:
+        attempts: Set[asyncio.Task] = {first}
+        hedged = self.hedge_after <= 0
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=None if hedged else self.hedge_after,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done: # Slow answer: duplicate the call on another host, first answer wins
+                    hedged = True
+                    second = self._pick_backend(job.tried)
+                    if second is not None:
+                        LLM_HEDGED_REQUESTS.inc(method=job.method)
+                        attempts.add(self._start_attempt(job, second))
+                    continue
+                error: Optional[BaseException] = None
+                for task in done:
+                    attempts.discard(task)
+                    if task.exception() is None:
+                        self._finish(job, result=task.result())
+                        return
+                    error = task.exception()
+                if attempts:
+                    continue # The other (hedged) attempt may still answer
+                if isinstance(error, HOST_ERRORS) and any(b.selectable for b in self.backends if b not in job.tried):
+                    self._enqueue(job, job.lane, front=True) # Retry on another host without losing its place
+                    return
+                self._finish(job, exc=error)
+        except asyncio.CancelledError:
+            self._forget(job)
+            job.future.cancel()
+        finally:
+            for task in attempts:
+                task.cancel()
+            self._dispatch()
+
+    # --- Health checks ---
+
+    async def check_health(self) -> None:
+        async def probe(backend: _Backend) -> None:
+            if backend.healthy:
+                return # Traffic keeps closed circuits up to date; probes are for hosts that failed
+            try:
+                await asyncio.to_thread(backend.probe_client.list)
+                backend.mark_up()
+            except Exception as e:
+                log.debug("Health check for Ollama host %s failed: %s", backend.host, e)
+        await asyncio.gather(*(probe(backend) for backend in self.backends))
+        self._dispatch()
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_health()
+
+    def start(self) -> None:
+        """Starts periodic health checks (API startup)."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,155 @@
+# backend/utils/logging_config.py
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, TextIO
+
+from backend.utils.metrics import LOG_RECORDS_DROPPED
+from backend.utils.tracing import current_trace_id
+
+# --- Configuration (environment) ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower() # 'json' or 'text'
+# Per-logger overrides, e.g. "backend.database=DEBUG,httpx=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Share of DEBUG records kept per call site (logger + message template); the first one is always kept
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000")) # Records beyond this are dropped, never waited for
+TEXT_FORMAT = '%(asctime)s - %(levelname)s [%(name)s] %(message)s'
+# The Ollama client logs every HTTP request at INFO
+DEFAULT_LOGGER_LEVELS = {"httpx": "WARNING", "httpcore": "WARNING"}
+# --- End Configuration ---
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into the JSON object
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, trace_id (when inside a span), `extra` fields, exc_info."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keeps 1 in every round(1 / rate) DEBUG records per call site, keyed on the unformatted message template,
+    so a debug line inside a per-query loop costs a counter increment instead of a formatted write.
+    """
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._seen: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        return seen % self.every == 0
+
+
+class _TraceContextFilter(logging.Filter):
+    # Handler filters run in the thread that logged, where the active span is still visible
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; when the queue is full the record is dropped (and counted) instead of blocking."""
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated later) but leave formatting/serialization to the listener thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, debug_sample_rate: Optional[float] = None,
+                      stream: Optional[TextIO] = None, queue_size: int = LOG_QUEUE_SIZE) -> None:
+    """
+    Routes all logging through a bounded queue to a single writer thread, as JSON lines (LOG_FORMAT=json) or
+    plain text. Replaces any handlers already on the root logger; calling it again reconfigures.
+    Call sites should log with %-style arguments (log.debug("x=%s", x)) so disabled levels cost nothing.
+    """
+    global _handler, _listener
+    shutdown_logging()
+    fmt = (fmt or LOG_FORMAT).lower()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(DebugSamplingFilter(LOG_DEBUG_SAMPLE_RATE if debug_sample_rate is None else debug_sample_rate))
+    _handler.addFilter(_TraceContextFilter())
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel((level or LOG_LEVEL).upper())
+    for name, logger_level in {**DEFAULT_LOGGER_LEVELS, **_parse_levels(LOG_LEVELS)}.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+
+def shutdown_logging() -> None:
+    """Writes out queued records and stops the writer thread."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,218 @@
+# backend/utils/metrics.py
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) wide enough for both SQLite queries and multi-second LLM calls
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Configuration ---
+# Adds worker="<pid>" to every series. Each worker process has its own registry and a scrape reaches just one of
+# them, so with several workers (scripts/run_server.py sets this) unlabelled series would jump between workers' values
+METRICS_WORKER_LABEL = os.getenv("METRICS_WORKER_LABEL", "false").lower() == "true"
+# --- End Configuration ---
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        const_labels = (("worker", str(os.getpid())),) if METRICS_WORKER_LABEL else ()
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render(const_labels))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional[MetricsRegistry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock() # Observations also come from worker threads (asyncio.to_thread DB calls)
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self, const_labels: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        """Exposition lines; const_labels are appended to every series' own labels."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self, const_labels: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, key, const_labels)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, registry: Optional[MetricsRegistry] = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last slot = above the largest bucket), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels: str) -> "timed":
+        return timed(self, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self, const_labels: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        with self._lock:
+            items = sorted((key, [list(series[0]), series[1], series[2]]) for key, series in self._series.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (*const_labels, ('le', _format_value(bound))))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key, const_labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key, const_labels)} {count}")
+        return lines
+
+
+class timed:
+    """
+    Observes elapsed wall time into a histogram. Works as a context manager or as a decorator on
+    sync and async functions:
+
+        with timed(DB_QUERY_SECONDS, operation="get_ticket"): ...
+
+        @timed(AGENT_STAGE_SECONDS, stage="routing")
+        async def determine_route(...): ...
+    """
+    __slots__ = ("histogram", "labels", "_start")
+
+    def __init__(self, histogram: Histogram, **labels: str):
+        self.histogram = histogram
+        self.labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+
+    def __call__(self, func: Callable) -> Callable:
+        histogram, labels = self.histogram, self.labels
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# --- Application metrics ---
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"))
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "database_manager call latency.", ("operation",))
+AGENT_STAGE_SECONDS = Histogram("agent_stage_duration_seconds", "Latency of each AI agent stage.", ("stage",))
+OLLAMA_REQUEST_SECONDS = Histogram("ollama_request_duration_seconds", "Ollama call latency.", ("operation", "model"))
+OLLAMA_TOKENS_PER_SECOND = Histogram("ollama_generation_tokens_per_second", "Ollama generation speed (eval tokens / eval time).",
+                                     ("model",), buckets=TOKENS_PER_SECOND_BUCKETS)
+OLLAMA_PREFILL_SECONDS = Histogram("ollama_prefill_seconds", "Prompt evaluation time reported by Ollama chat calls (uncached prompt tokens).", ("model",))
+OLLAMA_TOKENS = Counter("ollama_tokens_total", "Tokens processed by Ollama chat calls.", ("model", "kind"))
+OLLAMA_ERRORS = Counter("ollama_errors_total", "Failed Ollama calls.", ("operation", "model"))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit rate = hit / (hit + miss)).", ("cache", "result"))
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the logging queue was full.")
+LLM_QUEUE_WAIT_SECONDS = Histogram("llm_queue_wait_seconds", "Time LLM gateway requests wait for a host slot, by lane.", ("lane",))
+LLM_COALESCED_REQUESTS = Counter("llm_coalesced_requests_total", "LLM requests served by an identical in-flight call.", ("method",))
+LLM_HOST_FAILURES = Counter("llm_host_failures_total", "Ollama host connection failures seen by the LLM gateway.", ("host",))
+LLM_HEDGED_REQUESTS = Counter("llm_hedged_requests_total", "Ollama calls duplicated to a second host because the first was slow.", ("method",))
+EVENTS_PUBLISHED = Counter("events_published_total", "Events published on the in-process event bus, by topic and kind.", ("topic", "kind"))
+EVENT_RESYNCS = Counter("event_resyncs_total", "Subscriber backlogs dropped (replaced by a resync) because the consumer fell behind.", ("topic",))
+CHANGE_FEED_APPLIED = Counter("change_feed_applied_total", "Changes made by other processes (change_log rows) applied to this process's caches.", ("topic",))
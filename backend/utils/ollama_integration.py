@@ -2,30 +2,44 @@
 
 import ollama
 import logging
+import os
 import time
 import random
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import numpy as np # Import numpy
 import json # Import json for embedding serialization
 
+from backend.utils.llm_gateway import llm_gateway, LLMUnavailableError, HOST_ERRORS
+from backend.utils.metrics import OLLAMA_ERRORS, OLLAMA_PREFILL_SECONDS, OLLAMA_REQUEST_SECONDS, OLLAMA_TOKENS, OLLAMA_TOKENS_PER_SECOND
+from backend.utils.tracing import traced, set_span_attributes
+
 log = logging.getLogger(__name__)
 
-# Configure Ollama client - assumes Ollama is running on http://localhost:11434
-# You can specify a different host if needed, e.g., client = ollama.Client(host='http://192.168.1.100:11434')
-try:
-    # Check connection on initialization
-    client = ollama.Client()
-    client.list() # Simple check to see if server is reachable
+# Embedding model for KB vectors and query embeddings. Changing it makes existing vectors stale;
+# they are re-embedded incrementally and never mixed with vectors from the new model.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+
+# All calls go through the LLM gateway (backend/utils/llm_gateway.py): hosts come from OLLAMA_HOSTS
+# (default: OLLAMA_HOST or http://127.0.0.1:11434), with queueing by lane and per-host health tracking.
+if llm_gateway.check_health_sync():
     log.info("Ollama client initialized and server connection verified.")
-except Exception as e:
-    log.error(f"Failed to initialize Ollama client or connect to server: {e}. Please ensure Ollama server is running.", exc_info=True)
-    # Depending on requirements, you might want to raise an error here or handle it gracefully later
-    client = None # Set client to None if initialization fails
+else:
+    log.error(f"Failed to connect to any Ollama server ({', '.join(b.host for b in llm_gateway.backends)}). Please ensure Ollama server is running.")
+
+# Embedding models confirmed present via /api/show, so the check runs once per model instead of per call
+_verified_embedding_models = set()
+
+
+def ollama_available() -> bool:
+    """True while at least one Ollama host is reachable (or due for a retry)."""
+    return llm_gateway.available()
 
 
 # --- Real Ollama Interaction Functions ---
 
-async def call_ollama_llm(prompt: str, model: str = "llama3:instruct", context: str = "", role: str = "user") -> str:
+@traced("ollama.chat")
+async def call_ollama_llm(prompt: str, model: str = "llama3:instruct", context: str = "", role: str = "user", format: Optional[str] = None,
+                          options: Optional[Dict[str, Any]] = None, keep_alive: Optional[Union[str, float]] = None) -> str:
     """
     Calls a specified Ollama LLM for chat-based generation tasks.
 
@@ -34,16 +48,24 @@ async def call_ollama_llm(prompt: str, model: str = "llama3:instruct", context:
         model: The Ollama model name (e.g., 'llama3:instruct', 'mistral').
         context: Optional preceding context or conversation history.
         role: The role for the current prompt (usually 'user').
+        format: Optional Ollama output format, e.g. 'json' to constrain the reply to valid JSON.
+        options: Optional Ollama model options, e.g. {'num_ctx': 4096}. Keep num_ctx fixed per model:
+                 a different value makes Ollama reload the model.
+        keep_alive: How long Ollama keeps the model (and its prompt cache) loaded after the call, e.g. '30m'.
+                    Put static instructions in `context` so consecutive calls share a cacheable prefix.
 
     Returns:
         The content of the LLM's response message, or an error string on failure.
     """
-    if client is None:
-        log.error("Ollama client is not available. Cannot call LLM.")
+    set_span_attributes(model=model, prompt_chars=len(prompt))
+    if not ollama_available():
+        # Every circuit is open; the gateway logged that once, so don't repeat it per call
+        log.debug("Ollama unavailable (circuits open). Skipping LLM call.")
+        OLLAMA_ERRORS.inc(operation="chat", model=model)
         return "[Error: Ollama client not initialized]"
 
-    log.info(f"Calling Ollama LLM (Model: {model})")
-    log.debug(f"Prompt: {prompt[:150]}...") # Log start of prompt
+    log.info("Calling Ollama LLM (Model: %s)", model)
+    log.debug("Prompt: %.150s...", prompt) # Log start of prompt (%.Ns truncates only if the record is emitted)
 
     messages = []
     if context:
@@ -53,15 +75,16 @@ async def call_ollama_llm(prompt: str, model: str = "llama3:instruct", context:
 
     try:
         start_time = time.time()
-        # Use ollama.chat for conversational models
-        response = client.chat(model=model, messages=messages)
+        # Queued by lane (Lane.URGENT / INTERACTIVE / BACKGROUND / BATCH from the caller's llm_lane context)
+        response = await llm_gateway.chat(model=model, messages=messages, format=format, options=options, keep_alive=keep_alive)
         duration = time.time() - start_time
-        log.info(f"Ollama call successful (Duration: {duration:.2f}s)")
+        log.info("Ollama call successful (Duration: %.2fs)", duration)
+        _record_chat_metrics(model, duration, response)
 
         # Extract the actual text content from the response
         if response and 'message' in response and 'content' in response['message']:
             response_content = response['message']['content']
-            log.debug(f"Ollama Response: {response_content[:150]}...")
+            log.debug("Ollama Response: %.150s...", response_content)
             return response_content.strip()
         else:
             log.warning(f"Ollama response format unexpected: {response}")
@@ -72,14 +95,46 @@ async def call_ollama_llm(prompt: str, model: str = "llama3:instruct", context:
         # Handle specific errors (e.g., model not found)
         if hasattr(e, 'error') and isinstance(e.error, str) and "model not found" in e.error.lower():
              log.error(f"Model '{model}' not found. Pull it using 'ollama pull {model}'")
+             OLLAMA_ERRORS.inc(operation="chat", model=model)
              return f"[Error: Model '{model}' not found on Ollama server]"
+        OLLAMA_ERRORS.inc(operation="chat", model=model)
         return f"[Error: Ollama API error - {e.status_code}]"
+    except LLMUnavailableError as e: # Failed fast: open circuit or request deadline
+        log.warning(f"Ollama LLM call skipped: {e}")
+        OLLAMA_ERRORS.inc(operation="chat", model=model)
+        return "[Error: Ollama unavailable]"
+    except HOST_ERRORS as e: # Expected when a host goes down; the circuit breaker tracks it, no traceback needed
+        log.warning(f"Ollama LLM call failed: {type(e).__name__}: {e}")
+        OLLAMA_ERRORS.inc(operation="chat", model=model)
+        return "[Error: Failed to communicate with Ollama]"
     except Exception as e:
         log.error(f"An unexpected error occurred during Ollama LLM call: {e}", exc_info=True)
+        OLLAMA_ERRORS.inc(operation="chat", model=model)
         return "[Error: Failed to communicate with Ollama]"
 
 
-async def get_ollama_embeddings(text: str, model: str = "nomic-embed-text") -> Optional[List[float]]:
+def _record_chat_metrics(model: str, duration: float, response: Any) -> None:
+    """Latency, token counts and generation speed from a chat response (Ollama reports durations in ns)."""
+    OLLAMA_REQUEST_SECONDS.observe(duration, operation="chat", model=model)
+    try:
+        prompt_tokens = response.get('prompt_eval_count') or 0
+        eval_tokens = response.get('eval_count') or 0
+        eval_duration_ns = response.get('eval_duration') or 0
+        prompt_eval_duration_ns = response.get('prompt_eval_duration') or 0
+    except AttributeError:
+        return
+    # Prefill time only covers prompt tokens missing from the KV cache, so it shows whether prefixes are reused
+    OLLAMA_PREFILL_SECONDS.observe(prompt_eval_duration_ns / 1e9, model=model)
+    OLLAMA_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    OLLAMA_TOKENS.inc(eval_tokens, model=model, kind="completion")
+    set_span_attributes(prompt_tokens=prompt_tokens, completion_tokens=eval_tokens,
+                        prefill_ms=round(prompt_eval_duration_ns / 1e6, 1), load_ms=round((response.get('load_duration') or 0) / 1e6, 1))
+    if eval_tokens and eval_duration_ns:
+        OLLAMA_TOKENS_PER_SECOND.observe(eval_tokens / (eval_duration_ns / 1e9), model=model)
+
+
+@traced("ollama.embeddings")
+async def get_ollama_embeddings(text: str, model: str = EMBEDDING_MODEL) -> Optional[List[float]]:
     """
     Gets text embeddings from a specified Ollama embedding model.
 
@@ -90,18 +145,24 @@ async def get_ollama_embeddings(text: str, model: str = "nomic-embed-text") -> O
     Returns:
         A list of floats representing the embedding, or None on error.
     """
-    if client is None:
+    if not ollama_available():
         log.error("Ollama client is not available. Cannot get embeddings.")
         return None
 
-    log.info(f"Getting Ollama Embeddings (Model: {model})")
-    log.debug(f"Text to embed: {text[:100]}...")
+    log.info("Getting Ollama Embeddings (Model: %s)", model)
+    set_span_attributes(model=model)
+    log.debug("Text to embed: %.100s...", text)
 
     # Ensure the embedding model is pulled (or handle error)
     try:
         # Use show to check - less overhead than list if checking one model
-        client.show(model)
-        log.debug(f"Embedding model '{model}' found locally.")
+        if model not in _verified_embedding_models:
+            await llm_gateway.show(model)
+            _verified_embedding_models.add(model)
+            log.debug("Embedding model '%s' found locally.", model)
+    except HOST_ERRORS as e: # Includes LLMUnavailableError (fail-fast)
+        log.warning(f"Ollama unavailable while checking embedding model '{model}': {e}")
+        return None
     except ollama.ResponseError as e:
          if hasattr(e, 'error') and isinstance(e.error, str) and "model not found" in str(e.error).lower():
               log.error(f"Embedding model '{model}' not found locally. Please pull it using 'ollama pull {model}'")
@@ -111,12 +172,13 @@ async def get_ollama_embeddings(text: str, model: str = "nomic-embed-text") -> O
 
     try:
         start_time = time.time()
-        response = client.embeddings(model=model, prompt=text)
+        response = await llm_gateway.embeddings(model=model, prompt=text)
         duration = time.time() - start_time
+        OLLAMA_REQUEST_SECONDS.observe(duration, operation="embeddings", model=model)
 
         if response and 'embedding' in response:
             embedding = response['embedding']
-            log.info(f"Ollama embeddings received (Size: {len(embedding)}, Duration: {duration:.2f}s)")
+            log.info("Ollama embeddings received (Size: %d, Duration: %.2fs)", len(embedding), duration)
             return embedding
         else:
             log.warning(f"Ollama embedding response format unexpected: {response}")
@@ -124,9 +186,64 @@ async def get_ollama_embeddings(text: str, model: str = "nomic-embed-text") -> O
 
     except ollama.ResponseError as e:
         log.error(f"Ollama API Response Error during embedding: {e.status_code} - {e.error}")
+        OLLAMA_ERRORS.inc(operation="embeddings", model=model)
+        return None
+    except HOST_ERRORS as e:
+        log.warning(f"Ollama embedding call failed: {type(e).__name__}: {e}")
+        OLLAMA_ERRORS.inc(operation="embeddings", model=model)
         return None
     except Exception as e:
         log.error(f"An unexpected error occurred during Ollama embedding call: {e}", exc_info=True)
+        OLLAMA_ERRORS.inc(operation="embeddings", model=model)
+        return None
+
+
+@traced("ollama.embed_batch")
+async def get_ollama_embeddings_batch(texts: List[str], model: str = EMBEDDING_MODEL) -> Optional[List[List[float]]]:
+    """
+    Gets embeddings for several texts in one request via Ollama's batched /api/embed endpoint.
+
+    The gateway's async client keeps the event loop free while Ollama computes the batch.
+
+    Args:
+        texts: The input texts to embed, in order.
+        model: The Ollama embedding model name.
+
+    Returns:
+        One embedding per input text (same order), or None if the batch failed.
+    """
+    if not ollama_available():
+        log.error("Ollama client is not available. Cannot get embeddings.")
+        return None
+    if not texts:
+        return []
+    set_span_attributes(model=model, batch_size=len(texts))
+
+    try:
+        start_time = time.time()
+        response = await llm_gateway.embed(model=model, input=list(texts))
+        duration = time.time() - start_time
+        OLLAMA_REQUEST_SECONDS.observe(duration, operation="embed_batch", model=model)
+
+        embeddings = response['embeddings'] if response and 'embeddings' in response else None
+        if not embeddings or len(embeddings) != len(texts):
+            log.warning(f"Ollama batch embedding response unexpected: expected {len(texts)} vectors, got {len(embeddings) if embeddings else 0}")
+            OLLAMA_ERRORS.inc(operation="embed_batch", model=model)
+            return None
+        log.debug("Ollama batch embeddings received (Count: %d, Duration: %.2fs)", len(embeddings), duration)
+        return [list(embedding) for embedding in embeddings]
+
+    except ollama.ResponseError as e:
+        log.error(f"Ollama API Response Error during batch embedding: {e.status_code} - {e.error}")
+        OLLAMA_ERRORS.inc(operation="embed_batch", model=model)
+        return None
+    except HOST_ERRORS as e:
+        log.warning(f"Ollama batch embedding call failed: {type(e).__name__}: {e}")
+        OLLAMA_ERRORS.inc(operation="embed_batch", model=model)
+        return None
+    except Exception as e:
+        log.error(f"An unexpected error occurred during Ollama batch embedding call: {e}")
+        OLLAMA_ERRORS.inc(operation="embed_batch", model=model)
         return None
 
 # --- Helper function for recommendation agent ---
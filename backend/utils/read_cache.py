@@ -0,0 +1,72 @@
+# backend/utils/read_cache.py
+"""
+Rendered-response caches for polled read endpoints. Each entry holds the response body as sent, its ETag
+(a hash of the body) and Last-Modified time, stamped with the version of the data it was rendered from
+(database_manager.ticket_version / tickets_list_version, KBIndex.version). A lookup with any other version is
+a miss, so writes through database_manager invalidate without any explicit eviction.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Hashable, NamedTuple, Optional
+
+from backend.utils.metrics import record_cache_lookup
+
+# --- Configuration ---
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "1000"))
+# Upper bound on staleness for writes the version counters cannot see (other processes, scripts)
+READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "60"))
+# --- End Configuration ---
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+class ReadCache:
+    """LRU of CachedBody entries keyed by request parameters. Not thread-safe: used from the event loop only."""
+    def __init__(self, name: str, max_entries: int = READ_CACHE_MAX_ENTRIES, ttl_seconds: float = READ_CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # key -> (version, stored_at, CachedBody)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        hit = entry is not None and entry[0] == version and time.monotonic() - entry[1] < self.ttl_seconds
+        record_cache_lookup(self.name, hit=hit)
+        if not hit:
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, key: Hashable, version: Hashable, body: bytes) -> CachedBody:
+        """
+        Stores a freshly rendered body. If it is identical to the previous entry's (e.g. re-rendered after the TTL,
+        or a write that changed nothing visible) the previous Last-Modified is kept, so clients still get a 304.
+        """
+        etag = body_etag(body)
+        previous = self._entries.pop(key, None)
+        if previous is not None and previous[2].etag == etag:
+            cached = previous[2]
+        else:
+            cached = CachedBody(body, etag, datetime.now(timezone.utc).replace(microsecond=0))
+        self._entries[key] = (version, time.monotonic(), cached)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,67 @@
+# backend/utils/text_chunking.py
+
+import math
+import re
+from typing import List
+
+# No tokenizer for the Ollama models is available in-process; ~4 characters per token holds for English
+# support chats with qwen/llama tokenizers and errs on the safe side for num_ctx budgeting.
+CHARS_PER_TOKEN = 4
+# Chunks aim at this share of the limit, leaving room to end each one at a line/sentence boundary
+CHUNK_FILL = 0.9
+
+_SENTENCE = re.compile(r".+?(?:[.!?]\s+|$)", re.DOTALL) # Keeps the trailing whitespace with each sentence
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    """Lines (conversation turns), split further at sentence ends and then hard-cut when still too long."""
+    pieces = []
+    for line in text.splitlines(keepends=True):
+        if len(line) <= max_chars:
+            pieces.append(line)
+            continue
+        for sentence in _SENTENCE.findall(line):
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits text into chunks of at most max_tokens (estimated), breaking at line, then sentence boundaries.
+    Chunks are balanced to roughly equal size, so map calls over them take about the same time; text of
+    n * max_tokens * CHUNK_FILL tokens gives n chunks.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    target_chars = len(text) / math.ceil(len(text) / (max_chars * CHUNK_FILL))
+    chunks, current, size, offset = [], [], 0, 0
+    for piece in _pieces(text, max_chars):
+        if current and size + len(piece) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece)
+        offset += len(piece)
+        # Cut at the first boundary past each multiple of the target size, so rounding never adds a chunk
+        if offset >= (len(chunks) + 1) * target_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """Keeps the start and end of text within max_tokens (estimated): a chat's opening and resolution matter most."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    marker = f"\n[... {len(text) - max_chars} characters omitted ...]\n"
+    keep = max(0, max_chars - len(marker))
+    head = keep // 2
+    return text[:head] + marker + text[len(text) - (keep - head):]
@@ -0,0 +1,92 @@
+# backend/utils/text_parsing.py
+"""
+Shared parsing for LLM replies and chat transcripts. Every pattern is compiled once at import; callers scan
+the text in place (finditer from an offset) instead of splitting and re-joining it.
+"""
+
+import re
+from typing import Iterable, List, Optional, Sequence
+
+# --- LLM replies ---
+# Bullet lines (*, -, •, "1." or "1)"); one findall from the header on, so the whole scan runs in C and only the
+# bullet contents become Python strings. The content ends at its last non-space character (backtracking only over
+# trailing whitespace): items come out stripped and empty bullets don't match
+_BULLET = re.compile(r"^[ \t]*(?:[*\-\u2022]|\d{1,2}[.)])[ \t]+(.*\S)", re.MULTILINE)
+_SUMMARY_PREAMBLE = re.compile(r"^(Here's|The customer's problem is|Summary:)\s*", re.IGNORECASE)
+_EMPHASIS = re.compile(r"^\*\*(.+?)\*\*:?\s*")
+
+# --- Transcripts (backend/data/*.txt: 'Customer: "..."' / 'Agent: "..."' turns under a small header) ---
+TRANSCRIPT_CATEGORY = re.compile(r"Category:\s*(.+)", re.IGNORECASE)
+TRANSCRIPT_FIRST_CUSTOMER = re.compile(r"Customer:\s*\"(.+?)\"(?:\s*Agent:|\s*$)", re.DOTALL | re.IGNORECASE)
+TRANSCRIPT_AGENT_MESSAGE = re.compile(r"Agent:\s*\"(.*?)\"", re.DOTALL | re.IGNORECASE)
+TRANSCRIPT_CONVERSATION_ID = re.compile(r"Conversation ID:\s*(\S+)", re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """Display form: surrounding whitespace stripped, internal runs of whitespace (incl. newlines) collapsed."""
+    return " ".join(text.split())
+
+
+_DEDUP_IGNORED_TRAILING = ".!?;: "
+
+
+def dedup_key(text: str) -> str:
+    """Comparison form: case-folded, trailing punctuation ignored ('Check logs.' == 'check logs')."""
+    return text.casefold().rstrip(_DEDUP_IGNORED_TRAILING)
+
+
+def dedup_ordered(items: Iterable[str], skip_phrases: Sequence[str] = ()) -> List[str]:
+    """
+    First occurrence of each item by dedup_key, in input order (a dict as ordered set: O(n), unlike `not in list`).
+    Items containing one of skip_phrases (given lowercase) are dropped.
+    """
+    unique = {}
+    for item in items:
+        key = item.casefold().rstrip(_DEDUP_IGNORED_TRAILING) # dedup_key, inlined: this loop is the parser's hot path
+        if key not in unique:
+            unique[key] = item
+    if skip_phrases:
+        keys = "\n".join(unique) # One search over all keys per phrase; only a hit looks at the keys one by one
+        for phrase in skip_phrases:
+            if phrase in keys:
+                for key in [key for key in unique if phrase in key]:
+                    del unique[key]
+    return list(unique.values())
+
+
+def _start_after(text: str, header: Optional[str]) -> int:
+    # Same as text.split(header)[-1], without building the pieces
+    if not header:
+        return 0
+    index = text.rfind(header)
+    return 0 if index < 0 else index + len(header)
+
+
+def clean_summary(response: str, header: Optional[str] = None) -> str:
+    """The text after the last echoed header, without a leading 'Here's' / 'Summary:' preamble."""
+    start = _start_after(response, header)
+    return _SUMMARY_PREAMBLE.sub("", response[start:].strip()).strip()
+
+
+def _unbold(item: str) -> str:
+    return normalize_text(_EMPHASIS.sub(r"\1: ", item))
+
+
+def parse_bullets(response: str, header: Optional[str] = None, skip_phrases: Sequence[str] = ()) -> Optional[List[str]]:
+    """
+    Bullet items after the last echoed `header`, in one pass: stripped, bold leading labels unwrapped
+    ('**Check logs**: now' -> 'Check logs: now'), de-duplicated in order by dedup_key, and items containing one of
+    skip_phrases (given lowercase) dropped. Returns None when the reply has no non-empty bullet lines at all.
+    """
+    start = _start_after(response, header)
+    matches = _BULLET.findall(response, start)
+    if not matches:
+        return None
+    if response.find("**", start) >= 0: # Bold labels are the exception: only then rewrite items
+        matches = [_unbold(item) if item[0] == "*" else item for item in matches]
+    return dedup_ordered(matches, skip_phrases)
+
+
+def reply_lines(response: str, header: Optional[str] = None) -> List[str]:
+    """Non-empty lines after the last echoed `header`, stripped: the fallback for replies without bullets."""
+    return [line for line in map(str.strip, response[_start_after(response, header):].splitlines()) if line]
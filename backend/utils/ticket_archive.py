@@ -0,0 +1,35 @@
+# backend/utils/ticket_archive.py
+"""
+Periodic ticket archival (database_manager.archive_tickets): keeps the hot tickets table, and every index on
+it, sized by recent and open tickets instead of growing with history. Run by the API (one worker) or on demand
+with backend/scripts/archive_tickets.py.
+"""
+
+import asyncio
+import logging
+import os
+
+from backend.database import database_manager as db
+
+log = logging.getLogger(__name__)
+
+# --- Configuration ---
+TICKET_ARCHIVE_AFTER_DAYS = float(os.getenv("TICKET_ARCHIVE_AFTER_DAYS", "90")) # Since resolution
+TICKET_ARCHIVE_INTERVAL_HOURS = float(os.getenv("TICKET_ARCHIVE_INTERVAL_HOURS", "24")) # 0 disables the background job
+TICKET_ARCHIVE_BATCH_SIZE = int(os.getenv("TICKET_ARCHIVE_BATCH_SIZE", "500")) # Tickets per write transaction
+# --- End Configuration ---
+
+
+async def archive_in_background(older_than_days: float = TICKET_ARCHIVE_AFTER_DAYS,
+                                interval_hours: float = TICKET_ARCHIVE_INTERVAL_HOURS) -> None:
+    """API startup job: archives old resolved tickets now and then every interval_hours."""
+    while True:
+        try:
+            moved = await asyncio.to_thread(db.archive_tickets, older_than_days, TICKET_ARCHIVE_BATCH_SIZE)
+            if moved is None:
+                log.warning("Ticket archival failed; retrying at the next interval.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Ticket archival failed: {e}", exc_info=True)
+        await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,276 @@
+# backend/utils/tracing.py
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# --- Configuration (environment) ---
+# TRACE_EXPORT: 'jsonl' (default), 'otlp' or 'none'
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "jsonl").lower()
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'traces.jsonl'))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1000")) # Traces at least this long are always kept
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.0")) # Fraction of the remaining (fast) traces kept
+MAX_SPANS_PER_TRACE = 1000 # Bounds memory for long-running traces (e.g. a full ingestion)
+SERVICE_NAME = "ai-support-backend"
+# --- End Configuration ---
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+    def add(self, span: "Span") -> None:
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(span) # list.append is atomic, so spans finishing in worker threads are safe
+        else:
+            self.dropped += 1
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace: _Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id, "span_id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+            "start_time_unix_nano": self.start_ns, "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes, "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace.trace_id if span else None
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Adds attributes to the active span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+class start_span:
+    """
+    Opens a span as a child of the active one (or as the root of a new trace). The active span follows the
+    context, so it propagates across awaits, into tasks and into asyncio.to_thread workers.
+
+        with start_span("routing.lookup", team=team) as span: ...
+    """
+    __slots__ = ("name", "attributes", "span", "_parent", "_token")
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self._parent = _current_span.get()
+        trace = self._parent.trace if self._parent is not None else _Trace()
+        self.span = Span(self.name, trace, self._parent.span_id if self._parent is not None else None, self.attributes)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        span.trace.add(span)
+        if self._parent is None:
+            _finish_trace(span)
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Decorator opening a span around each call of a sync or async function (default name: module.qualname)."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Sampling and export ---
+
+class SlowTraceSampler:
+    """Keeps complete traces for outliers only: slow or failed roots, plus an optional random share of the rest."""
+    def __init__(self, slow_ms: float = TRACE_SLOW_MS, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+
+    def keep(self, root: Span) -> bool:
+        if root.error is not None or root.duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+class JsonlSpanExporter:
+    """Appends one JSON object per span to a local file."""
+    def __init__(self, path: str = TRACE_JSONL_PATH):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Posts spans as OTLP/HTTP JSON (e.g. to an OpenTelemetry collector or scripts/otlp_collector_stub.py)."""
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [{
+                    "traceId": span.trace.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint, data=json.dumps(self.to_otlp(spans), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class _ExportWorker:
+    """Exports kept traces on a daemon thread so file/network I/O never runs on the event loop."""
+    def __init__(self, exporter: Any):
+        self.exporter = exporter
+        self._queue: "queue.SimpleQueue[Optional[List[Span]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: List[Span]) -> None:
+        self._queue.put(spans)
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                log.warning(f"Trace export failed ({type(self.exporter).__name__}): {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_sampler = SlowTraceSampler()
+_export_worker: Optional[_ExportWorker] = None
+
+
+def configure_tracing(exporter: Any = None, slow_ms: Optional[float] = None, sample_rate: Optional[float] = None) -> None:
+    """
+    Replaces the exporter and/or sampler settings. With no exporter given, it is built from TRACE_EXPORT.
+    Passing exporter=False disables export (spans are still created, which keeps call sites unconditional).
+    """
+    global _sampler, _export_worker
+    _sampler = SlowTraceSampler(
+        slow_ms if slow_ms is not None else _sampler.slow_ms,
+        sample_rate if sample_rate is not None else _sampler.sample_rate,
+    )
+    if exporter is None:
+        exporter = {"jsonl": JsonlSpanExporter, "otlp": OtlpHttpSpanExporter}.get(TRACE_EXPORT, lambda: False)()
+    if _export_worker is not None:
+        _export_worker.shutdown()
+    _export_worker = _ExportWorker(exporter) if exporter else None
+
+
+def shutdown_tracing() -> None:
+    """Flushes traces queued for export."""
+    global _export_worker
+    if _export_worker is not None:
+        _export_worker.shutdown()
+        _export_worker = None
+
+
+def _finish_trace(root: Span) -> None:
+    if _export_worker is None or not _sampler.keep(root):
+        return
+    trace = root.trace
+    if trace.dropped:
+        root.attributes["dropped_spans"] = trace.dropped
+    _export_worker.submit(list(trace.spans))
@@ -0,0 +1,284 @@
+# backend/utils/transcript_mining.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.database import database_manager as db
+from backend.utils.kb_ingest import (
+    extract_info_from_transcript,
+    iter_transcript_files,
+    transcript_info_to_record,
+    transcript_source_key,
+)
+from backend.utils.llm_gateway import llm_lane, Lane
+from backend.utils.ollama_integration import call_ollama_llm
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(db.DATABASE_PATH), 'transcript_mining.cache.json')
+MINING_MODEL = os.getenv("TRANSCRIPT_MINING_MODEL", "qwen:1.8b")
+MAX_TRANSCRIPT_CHARS = 6000 # Transcript text sent to the LLM; longer chats are cut to keep prefill bounded
+# Batch work: don't pin the model after a run. num_ctx matches SUMMARIZATION_NUM_CTX by default because both
+# use qwen:1.8b, and a different num_ctx for the same model makes Ollama reload it.
+MINING_KEEP_ALIVE = os.getenv("TRANSCRIPT_MINING_KEEP_ALIVE", "5m")
+MINING_NUM_CTX = int(os.getenv("TRANSCRIPT_MINING_NUM_CTX", "4096"))
+CACHE_VERSION = 1
+
+
+@dataclass
+class MiningStats:
+    files: int = 0
+    cache_hits: int = 0
+    parsed: int = 0
+    llm_extracted: int = 0
+    heuristic_fallbacks: int = 0
+    unusable: int = 0
+
+
+def parse_transcript_file(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Process-pool worker: reads one transcript, hashes it and runs the regex heuristics.
+    Returns plain picklable data, or None if the file cannot be read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        content = raw.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        log.error(f"Error reading transcript {path}: {e}")
+        return None
+    info = extract_info_from_transcript(content)
+    info['keywords'] = sorted(info['keywords'])
+    stat = os.stat(path)
+    return {
+        'path': path,
+        'file_hash': hashlib.sha256(raw).hexdigest(),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'source_key': transcript_source_key(content, os.path.basename(path)),
+        'heuristic': info,
+        'text': content[:MAX_TRANSCRIPT_CHARS],
+    }
+
+
+class MiningCache:
+    """
+    JSON cache of extracted records keyed by transcript content hash, plus a path -> (size, mtime, hash)
+    index so unchanged files are recognised without even being read.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> "MiningCache":
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('entries', {})
+                self.files = data.get('files', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"Ignoring unreadable transcript mining cache {self.path}: {e}")
+        return self
+
+    def save(self) -> None:
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': self.entries, 'files': self.files}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"Could not save transcript mining cache to {self.path}: {e}")
+
+    def lookup_unchanged(self, path: str, require_llm: bool) -> Optional[Dict[str, Any]]:
+        known = self.files.get(path)
+        if not known:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (known['size'], known['mtime_ns']):
+            return None
+        record = self.lookup_hash(known['hash'], require_llm)
+        # Entries are shared by identical transcripts; the source_key is this file's
+        return dict(record, source_key=known['source_key']) if record is not None and 'source_key' in known else record
+
+    def lookup_hash(self, file_hash: str, require_llm: bool) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(file_hash)
+        if entry is None or (require_llm and entry['method'] != 'llm'):
+            return None
+        return entry['record']
+
+    def method_of(self, file_hash: str) -> Optional[str]:
+        entry = self.entries.get(file_hash)
+        return entry['method'] if entry else None
+
+    def store(self, parsed: Dict[str, Any], record: Dict[str, Any], method: str) -> None:
+        self.entries[parsed['file_hash']] = {'record': record, 'method': method}
+        self.files[parsed['path']] = {'size': parsed['size'], 'mtime_ns': parsed['mtime_ns'], 'hash': parsed['file_hash'],
+                                      'source_key': record.get('source_key')}
+
+
+# Static system prefix (cached by Ollama across transcripts); only the transcript itself is prefilled per call
+EXTRACTION_SYSTEM_PROMPT = """Read the customer support chat transcript you are given and extract a knowledge base entry.
+Respond ONLY with a JSON object with these keys:
+"category": short issue category (e.g. "Network Connectivity Issue"),
+"problem": one or two sentences describing the customer's problem,
+"solution": the steps that actually resolved the issue, in one short paragraph,
+"keywords": list of 3-10 lowercase keywords."""
+
+
+def _build_extraction_prompt(transcript: str) -> str:
+    return f'Transcript:\n"""\n{transcript}\n"""'
+
+
+def _parse_extraction(response: str) -> Optional[Dict[str, Any]]:
+    """Validates the LLM's JSON reply; returns None if it is not usable."""
+    if not response or response.startswith("[Error:"):
+        return None
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    problem = str(data.get('problem') or '').strip()
+    solution = str(data.get('solution') or '').strip()
+    if not problem or not solution:
+        return None
+    keywords = data.get('keywords') or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    return {
+        'category': str(data.get('category') or '').strip() or None,
+        'problem': problem,
+        'solution': solution,
+        'keywords': {str(k).strip().lower() for k in keywords if str(k).strip()},
+    }
+
+
+def _merge_with_heuristics(extracted: Dict[str, Any], heuristic: Dict[str, Any]) -> Dict[str, Any]:
+    # The transcript's own "Category:" header is authoritative when present
+    category = heuristic.get('category') or extracted.get('category')
+    keywords = set(extracted['keywords']) | set(heuristic.get('keywords') or [])
+    return {'category': category, 'problem': extracted['problem'], 'solution': extracted['solution'], 'keywords': keywords}
+
+
+async def mine_transcripts(
+    transcript_dir: str,
+    cache_path: str = DEFAULT_CACHE_PATH,
+    model: str = MINING_MODEL,
+    use_llm: bool = True,
+    parse_workers: Optional[int] = None,
+    llm_concurrency: int = 4,
+    queue_size: int = 64,
+) -> Tuple[List[Dict[str, Any]], MiningStats]:
+    """
+    Turns a directory of chat transcripts into KB records.
+
+    Files unchanged since the last run (same size/mtime, or same content hash) come straight from the
+    cache. The rest are parsed in a process pool and fed through a bounded queue to `llm_concurrency`
+    extraction workers; when the queue is full, parsing waits. LLM failures fall back to the regex heuristics.
+    """
+    stats = MiningStats()
+    cache = MiningCache(cache_path).load()
+    records: List[Dict[str, Any]] = []
+    llm_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    # Copies of a transcript whose content is already queued for the LLM wait for that one result
+    awaiting_result: Dict[str, List[Dict[str, Any]]] = {}
+    loop = asyncio.get_running_loop()
+
+    def accept(parsed: Dict[str, Any], info: Dict[str, Any], method: str) -> None:
+        if not info.get('category') or not info.get('problem') or not info.get('solution'):
+            log.warning(f"Could not extract sufficient info from {os.path.basename(parsed['path'])}. Skipping.")
+            stats.unusable += 1
+            return
+        record = transcript_info_to_record(info, parsed['source_key'])
+        records.append(record)
+        # Heuristic results are only cached when the LLM was not requested, so a later LLM run upgrades them
+        if method == 'llm' or not use_llm:
+            cache.store(parsed, record, method)
+
+    async def produce(pool: ProcessPoolExecutor) -> None:
+        in_flight: List[asyncio.Future] = []
+
+        async def drain_one() -> None:
+            parsed = await in_flight.pop(0)
+            if parsed is None:
+                stats.unusable += 1
+                return
+            stats.parsed += 1
+            cached = cache.lookup_hash(parsed['file_hash'], require_llm=use_llm)
+            if cached is not None: # Content seen before under another name or with a new mtime
+                stats.cache_hits += 1
+                record = dict(cached, source_key=parsed['source_key'])
+                records.append(record)
+                # Keeps the entry's method: a --no-llm run must not downgrade an LLM extraction
+                cache.store(parsed, record, cache.method_of(parsed['file_hash']))
+            elif use_llm and parsed['file_hash'] in awaiting_result:
+                stats.cache_hits += 1
+                awaiting_result[parsed['file_hash']].append(parsed)
+            elif use_llm:
+                awaiting_result[parsed['file_hash']] = []
+                await llm_queue.put(parsed)
+            else:
+                accept(parsed, parsed['heuristic'], 'heuristic')
+
+        for path in iter_transcript_files(transcript_dir):
+            stats.files += 1
+            cached = cache.lookup_unchanged(path, require_llm=use_llm)
+            if cached is not None:
+                stats.cache_hits += 1
+                records.append(cached)
+                continue
+            in_flight.append(loop.run_in_executor(pool, parse_transcript_file, path))
+            if len(in_flight) >= queue_size:
+                await drain_one()
+        while in_flight:
+            await drain_one()
+        if use_llm:
+            for _ in range(llm_concurrency):
+                await llm_queue.put(None)
+
+    async def extract_worker() -> None:
+        while True:
+            parsed = await llm_queue.get()
+            if parsed is None:
+                return
+            with llm_lane(Lane.BATCH):
+                response = await call_ollama_llm(prompt=_build_extraction_prompt(parsed['text']), model=model, format='json',
+                                                 context=EXTRACTION_SYSTEM_PROMPT, options={'num_ctx': MINING_NUM_CTX},
+                                                 keep_alive=MINING_KEEP_ALIVE)
+            extracted = _parse_extraction(response)
+            if extracted is not None:
+                stats.llm_extracted += 1
+                info, method = _merge_with_heuristics(extracted, parsed['heuristic']), 'llm'
+            else:
+                stats.heuristic_fallbacks += 1
+                info, method = parsed['heuristic'], 'heuristic'
+            for same_content in [parsed] + awaiting_result.pop(parsed['file_hash'], []):
+                accept(same_content, info, method)
+
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        workers = [asyncio.ensure_future(extract_worker()) for _ in range(llm_concurrency if use_llm else 0)]
+        try:
+            await asyncio.gather(produce(pool), *workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            cache.save() # Keep whatever was extracted, even if the run is interrupted
+    log.info(f"Mined {stats.files} transcripts in {time.monotonic() - start:.1f}s "
+             f"({stats.cache_hits} cached, {stats.llm_extracted} via LLM, {stats.heuristic_fallbacks} heuristic fallbacks)")
+    return records, stats
@@ -34,7 +34,7 @@ import ErrorIcon from '@mui/icons-material/Error';
 // --- End Icon Imports ---
 import { useAuth } from '../context/AuthContext.js';
 import { Link as RouterLink } from 'react-router-dom';
-import { getTickets } from '../services/api.js';
+import { getTickets, subscribeTicketEvents } from '../services/api.js';
 
 
 // --- Mock Data Function ---
@@ -125,6 +125,20 @@ function DashboardPage() {
     loadData();
   }, []); // End useEffect
 
+  // Live overview of the 5 newest open tickets: pushed changes update it without refetching
+  useEffect(() => {
+    const subscription = subscribeTicketEvents({
+      filters: { status: ['Open'] },
+      onEvent: ({ ticket }) => setOverviewTickets(prev => {
+        const others = prev.filter(t => t.id !== ticket.id);
+        if (ticket.status !== 'Open') return others; // No longer open
+        return prev.some(t => t.id === ticket.id) ? prev.map(t => (t.id === ticket.id ? ticket : t)) : [ticket, ...others].slice(0, 5);
+      }),
+      onResync: () => getTickets({ status: 'Open', limit: 5 }).then(response => setOverviewTickets(response.data || [])).catch(err => console.error("Error resyncing tickets:", err)),
+    });
+    return () => subscription.close();
+  }, []);
+
   // --- Render Logic ---
   if (loading) { return <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '60vh' }}><CircularProgress /></Box>; }
   if (!metrics && overviewTickets.length === 0 && error) { return <Alert severity="error" sx={{m:2}}>Error loading dashboard: {error}</Alert>; }
@@ -8,7 +8,7 @@ import {
 } from '@mui/material';
 import ArrowBackIcon from '@mui/icons-material/ArrowBack';
 // API Imports
-import { getTicketById, getRecommendations, postRecommendationFeedback, updateTicketStatus, assignTicket } from '../services/api.js';
+import { getTicketById, getRecommendations, postRecommendationFeedback, updateTicketStatus, assignTicket, subscribeTicketEvents } from '../services/api.js';
 // Icon Imports
 import InfoIcon from '@mui/icons-material/Info';
 import QuestionAnswerIcon from '@mui/icons-material/QuestionAnswer';
@@ -74,6 +74,17 @@ function TicketDetailPage() {
 
     useEffect(() => { loadTicketData(); }, [loadTicketData]); // Load data on mount/ID change
 
+    // Live updates (status changes, enrichment results) pushed for this ticket only
+    useEffect(() => {
+        if (!ticketId) return undefined;
+        const subscription = subscribeTicketEvents({
+            filters: { ticket_id: [ticketId] },
+            onEvent: ({ ticket: updated }) => setTicket(updated),
+            onResync: () => getTicketById(ticketId).then(response => setTicket(response.data)).catch(err => console.error(`Failed resync of ticket ${ticketId}:`, err)),
+        });
+        return () => subscription.close();
+    }, [ticketId]);
+
      // --- Feedback and Action Handlers ---
      const handleFeedback = async (recommendationId, wasHelpful) => { /* ... same as before ... */ console.log(`Feedback for Rec ID ${recommendationId}: Helpful = ${wasHelpful}`); setFeedbackStatus(prev => ({ ...prev, [recommendationId]: 'submitting' })); try { const feedbackData = { recommendation_id: recommendationId, was_helpful: wasHelpful, ticket_id: ticket.id }; await postRecommendationFeedback(feedbackData); setFeedbackStatus(prev => ({ ...prev, [recommendationId]: 'submitted' })); } catch (error) { console.error(`Failed feedback submit:`, error); setFeedbackStatus(prev => ({ ...prev, [recommendationId]: 'error' })); } };
      const handleDialogAction = async (action) => { /* ... same as before ... */
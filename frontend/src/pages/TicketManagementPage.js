@@ -5,7 +5,7 @@ import { Box, Typography, Paper, TextField, Button, Select, MenuItem, InputLabel
 import SearchIcon from '@mui/icons-material/Search';
 import FilterListIcon from '@mui/icons-material/FilterList';
 import TicketList from '../components/TicketList.js'; // Use .js or .jsx
-import { getTickets } from '../services/api.js';
+import { getTickets, subscribeTicketEvents } from '../services/api.js';
 // import debounce from 'lodash.debounce'; // Keep commented unless needed
 
 function TicketManagementPage() {
@@ -44,6 +44,20 @@ function TicketManagementPage() {
         loadTickets();
     }, [loadTickets]);
 
+    // Live updates: pushed changes are merged into the list instead of refetching it
+    useEffect(() => {
+        const statusFilter = activeFilters.status !== 'All' ? activeFilters.status : null;
+        const subscription = subscribeTicketEvents({
+            filters: statusFilter ? { status: [statusFilter] } : {},
+            onEvent: ({ ticket }) => setTickets(prev => {
+                if (statusFilter && ticket.status !== statusFilter) return prev.filter(t => t.id !== ticket.id); // Left this view
+                return prev.some(t => t.id === ticket.id) ? prev.map(t => (t.id === ticket.id ? ticket : t)) : [ticket, ...prev];
+            }),
+            onResync: loadTickets,
+        });
+        return () => subscription.close();
+    }, [activeFilters, loadTickets]);
+
     // Update intermediate filter state
     const handleFilterChange = (event) => {
         const { name, value } = event.target;
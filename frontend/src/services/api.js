@@ -74,6 +74,69 @@ export const routeTicket = (routingData) => apiClient.post('/route/', routingDat
 // == Prediction == (Example - assuming POST to /predict)
 export const predictResolutionTime = (predictionData) => apiClient.post('/predict/', predictionData);
 
+// == Live Ticket Events == (WebSocket push from /events/tickets, instead of polling getTickets)
+// filters: { status: [...], team: [...], ticket_id: [...] } (empty = everything).
+// onEvent({ type: 'ticket.created' | 'ticket.updated' | 'ticket.enriched', ticket }) gets each matching change;
+// onResync() means changes may have been missed (reconnect, or the server dropped a backlog): refetch once.
+// Other frames ('error' for a rejected filter update) are logged, never passed to onEvent.
+// Returns { setFilters, close }.
+const EVENTS_URL = `${API_BASE_URL.replace(/^http/, 'ws')}/events/tickets`;
+const MAX_RECONNECT_DELAY_MS = 30000;
+const TICKET_EVENT_TYPES = new Set(['ticket.created', 'ticket.updated', 'ticket.enriched']);
+
+export const subscribeTicketEvents = ({ filters = {}, onEvent, onResync } = {}) => {
+  let socket = null;
+  let currentFilters = filters;
+  let reconnectDelay = 1000;
+  let reconnectTimer = null;
+  let reconnecting = false;
+  let closed = false;
+
+  const connect = () => {
+    const query = new URLSearchParams();
+    Object.entries(currentFilters).forEach(([name, values]) => (values || []).forEach((value) => query.append(name, value)));
+    socket = new WebSocket(`${EVENTS_URL}?${query}`);
+    // Authenticate in the first message: browsers can't set headers on a WebSocket
+    socket.onopen = () => socket.send(JSON.stringify({ token: localStorage.getItem('authToken') }));
+    socket.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      if (event.type === 'subscribed') {
+        reconnectDelay = 1000;
+        if (reconnecting && onResync) onResync(); // Changes made while disconnected were not pushed
+        reconnecting = false;
+      } else if (event.type === 'resync') {
+        if (onResync) onResync();
+      } else if (event.type === 'error') {
+        console.warn('Ticket events:', event.detail); // e.g. a malformed filter update; the old filter stays
+      } else if (TICKET_EVENT_TYPES.has(event.type) && onEvent) {
+        onEvent(event);
+      }
+    };
+    socket.onclose = (closeEvent) => {
+      if (closed || closeEvent.code === 1008) { // 1008: rejected token, retrying won't help
+        if (!closed) console.warn('Ticket events: authentication rejected.');
+        return;
+      }
+      reconnecting = true;
+      reconnectTimer = setTimeout(connect, reconnectDelay);
+      reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_DELAY_MS);
+    };
+  };
+  connect();
+
+  return {
+    setFilters: (newFilters) => {
+      currentFilters = newFilters;
+      if (socket && socket.readyState === WebSocket.OPEN) socket.send(JSON.stringify(newFilters));
+    },
+    close: () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
+    },
+  };
+};
+
 // == Dashboard / Metrics == (Example - needs backend endpoint)
 // TODO: Create a GET /dashboard/metrics endpoint on the backend
 export const getDashboardMetrics = () => apiClient.get('/dashboard/metrics'); // Placeholder